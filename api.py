@@ -0,0 +1,441 @@
+import argparse
+import base64
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Integer, column, create_engine, event, func, select, table, text, tuple_
+from sqlalchemy.engine import Connection, Engine
+
+from models import AirdropOpportunity, OpportunitySource, SEARCH_TABLE, init_db
+
+# Results per page unless the request asks for another size, up to MAX_PAGE_SIZE
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Responses kept in memory; the cache is emptied whenever the database changes
+API_CACHE_SIZE = 1024
+# expiring_soon=1 means a deadline within this many days
+EXPIRING_SOON_DAYS = 7
+# newest: by id, descending. deadline: soonest first. confidence: highest
+# first. Opportunities without a deadline or score come after the rest.
+SORTS = ['newest', 'deadline', 'confidence']
+
+opportunities = AirdropOpportunity.__table__
+search_index = table(SEARCH_TABLE, column('rowid', Integer))
+
+def _parse_datetime(name: str, value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime, got {value!r}")
+
+def _parse_float(name: str, value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
+
+def _search_terms(search: str) -> str:
+    """FTS5 query matching every word of search, so user input can't be a syntax error."""
+    words = search.split()
+    if not words:
+        raise ValueError("q must contain at least one word")
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in words)
+
+def _to_json(row) -> Dict[str, Any]:
+    return {key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in row._mapping.items()}
+
+class OpportunityQuery:
+    """Filters, sort order and keyset position of one page of opportunities.
+    
+    Pages are keyset-paginated: the cursor holds the sort key of the last
+    row returned, and the next page starts strictly after it, so a page
+    costs the same however deep it is and rows inserted meanwhile don't
+    shift the pages.
+    """
+    
+    def __init__(self, project: Optional[str] = None, token: Optional[str] = None,
+                 min_confidence: Optional[float] = None, max_confidence: Optional[float] = None,
+                 deadline_after: Optional[datetime] = None, deadline_before: Optional[datetime] = None,
+                 search: Optional[str] = None, sort: Optional[str] = None,
+                 cursor: Optional[str] = None, limit: int = PAGE_SIZE):
+        self.project = project.lower() if project else None
+        self.token = token.lower().lstrip('$') if token else None
+        self.min_confidence = min_confidence
+        self.max_confidence = max_confidence
+        self.deadline_after = deadline_after
+        self.deadline_before = deadline_before
+        self.search = _search_terms(search) if search else None
+        # A deadline filter reads best soonest first
+        if sort is None:
+            sort = 'deadline' if deadline_after or deadline_before else 'newest'
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        if self.search and sort != 'newest':
+            raise ValueError("search results are only sorted by newest")
+        self.sort = sort
+        self.after = self._decode_cursor(cursor) if cursor else None
+        self.limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    @classmethod
+    def from_args(cls, args) -> 'OpportunityQuery':
+        """Build a query from request arguments; raises ValueError on bad ones."""
+        deadline_after = deadline_before = None
+        if args.get('deadline_after'):
+            deadline_after = _parse_datetime('deadline_after', args['deadline_after'])
+        if args.get('deadline_before'):
+            deadline_before = _parse_datetime('deadline_before', args['deadline_before'])
+        expiring_within = args.get('expiring_within_days')
+        if args.get('expiring_soon', '').lower() in ('1', 'true', 'yes') and not expiring_within:
+            expiring_within = str(EXPIRING_SOON_DAYS)
+        if expiring_within:
+            # To the minute, so repeated requests share a cache entry
+            now = datetime.utcnow().replace(second=0, microsecond=0)
+            deadline_after = max(deadline_after or now, now)
+            until = now + timedelta(days=_parse_float('expiring_within_days', expiring_within))
+            deadline_before = min(deadline_before or until, until)
+        return cls(
+            project=args.get('project') or None,
+            token=args.get('token') or None,
+            min_confidence=_parse_float('min_confidence', args['min_confidence'])
+            if args.get('min_confidence') else None,
+            max_confidence=_parse_float('max_confidence', args['max_confidence'])
+            if args.get('max_confidence') else None,
+            deadline_after=deadline_after,
+            deadline_before=deadline_before,
+            search=args.get('q') or None,
+            sort=args.get('sort') or None,
+            cursor=args.get('cursor') or None,
+            limit=int(_parse_float('limit', args['limit'])) if args.get('limit') else PAGE_SIZE
+        )
+    
+    def cache_key(self) -> Tuple:
+        return (self.project, self.token, self.min_confidence, self.max_confidence, self.deadline_after,
+                self.deadline_before, self.search, self.sort, self.after, self.limit)
+    
+    def _decode_cursor(self, cursor: str) -> Tuple:
+        """(sort key, id) of the last row returned; the key is None past the rows that have one."""
+        try:
+            sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if value is not None:
+                value = datetime.fromisoformat(value) if sort == 'deadline' else float(value)
+            last_id = int(last_id)
+        except (ValueError, TypeError):
+            raise ValueError("cursor is not valid")
+        if sort != self.sort:
+            raise ValueError("cursor belongs to a different sort order")
+        return value, last_id
+    
+    def _encode_cursor(self, row) -> str:
+        value = {'newest': None, 'deadline': row.deadline, 'confidence': row.confidence_score}[self.sort]
+        if value is not None and self.sort == 'deadline':
+            value = value.isoformat()
+        raw = json.dumps([self.sort, value, row.id])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+    
+    def _past_keyed_rows(self) -> bool:
+        return self.sort != 'newest' and self.after is not None and self.after[0] is None
+    
+    def _may_have_unkeyed_rows(self) -> bool:
+        if self.sort == 'deadline':
+            return self.deadline_after is None and self.deadline_before is None
+        if self.sort == 'confidence':
+            return self.min_confidence is None and self.max_confidence is None
+        return False
+    
+    def statement(self, unkeyed: bool = False):
+        """The SELECT for one page, one row more than the limit to tell if there is a next one.
+        
+        For the deadline and confidence sorts it selects the rows that have
+        that key, or with unkeyed=True those that don't, which follow them
+        by id. Each part is then one range of its index.
+        """
+        statement = select(opportunities)
+        c = opportunities.c
+        if self.search:
+            # FTS5 hands back matches in rowid order, so the newest page
+            # comes straight off the index without sorting every match
+            statement = (statement.join(search_index, search_index.c.rowid == c.id)
+                         .where(text(f"{SEARCH_TABLE} MATCH :terms").bindparams(terms=self.search)))
+        if self.project:
+            statement = statement.where(func.lower(c.project_name) == self.project)
+        if self.token:
+            statement = statement.where(func.lower(c.token_symbol) == self.token)
+        if self.min_confidence is not None:
+            statement = statement.where(c.confidence_score >= self.min_confidence)
+        if self.max_confidence is not None:
+            statement = statement.where(c.confidence_score <= self.max_confidence)
+        if self.deadline_after is not None:
+            statement = statement.where(c.deadline >= self.deadline_after)
+        if self.deadline_before is not None:
+            statement = statement.where(c.deadline <= self.deadline_before)
+        
+        if self.sort == 'newest':
+            # The same order as c.id, but in terms SQLite can read off the search index
+            key = search_index.c.rowid if self.search else c.id
+            if self.after is not None:
+                statement = statement.where(key < self.after[1])
+            statement = statement.order_by(key.desc())
+        else:
+            key = c.deadline if self.sort == 'deadline' else c.confidence_score
+            descending = self.sort == 'confidence'
+            if unkeyed:
+                statement = statement.where(key.is_(None))
+                if self._past_keyed_rows():
+                    statement = statement.where(c.id < self.after[1] if descending else c.id > self.after[1])
+                statement = statement.order_by(c.id.desc() if descending else c.id)
+            else:
+                statement = statement.where(key.isnot(None))
+                if self.after is not None:
+                    position, after = tuple_(key, c.id), tuple_(*self.after)
+                    statement = statement.where(position < after if descending else position > after)
+                statement = statement.order_by(*([key.desc(), c.id.desc()] if descending else [key, c.id]))
+        return statement.limit(self.limit + 1)
+    
+    def page(self, conn: Connection) -> Dict[str, Any]:
+        """Run the query; returns the opportunities and the cursor of the next page, if any."""
+        rows = [] if self._past_keyed_rows() else conn.execute(self.statement()).all()
+        if len(rows) <= self.limit and self._may_have_unkeyed_rows():
+            rows += conn.execute(self.statement(unkeyed=True).limit(self.limit + 1 - len(rows))).all()
+        next_cursor = self._encode_cursor(rows[self.limit - 1]) if len(rows) > self.limit else None
+        return {
+            'opportunities': [_to_json(row) for row in rows[:self.limit]],
+            'next_cursor': next_cursor,
+        }
+
+def get_opportunity(conn: Connection, opportunity_id: int) -> Optional[Dict[str, Any]]:
+    """One opportunity with the IDs of every tweet merged into it, or None."""
+    row = conn.execute(select(opportunities).where(opportunities.c.id == opportunity_id)).first()
+    if row is None:
+        return None
+    opportunity = _to_json(row)
+    opportunity['source_tweet_ids'] = conn.execute(
+        select(OpportunitySource.tweet_id)
+        .where(OpportunitySource.opportunity_id == opportunity_id)
+        .order_by(OpportunitySource.id)
+    ).scalars().all()
+    return opportunity
+
+class ResponseCache:
+    """LRU of API responses, emptied whenever the database has changed.
+    
+    On SQLite the check is PRAGMA data_version on a connection kept for
+    it, which changes when any other connection commits and costs a few
+    microseconds. Other databases fall back to the highest opportunity
+    id, which catches inserts but not updates.
+    """
+    
+    def __init__(self, engine: Engine, max_entries: int = API_CACHE_SIZE):
+        self.engine = engine
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = engine.raw_connection() if engine.dialect.name == 'sqlite' else None
+        self._version = None
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _current_version(self):
+        if self._connection is not None:
+            cursor = self._connection.cursor()
+            try:
+                return cursor.execute('PRAGMA data_version').fetchone()[0]
+            finally:
+                cursor.close()
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(opportunities.c.id))).scalar()
+    
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            version = self._current_version()
+            if version != self._version:
+                if self._entries:
+                    self.stats['invalidations'] += 1
+                self._entries.clear()
+                self._version = version
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+    
+    def put(self, key: Tuple, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+def read_only_engine(db_url: str, cache_size_mb: int = 64, mmap_size_mb: int = 256) -> Engine:
+    """Engine for the API; its SQLite connections refuse writes (PRAGMA query_only)."""
+    engine = create_engine(db_url)
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA query_only=ON')
+            cursor.execute(f'PRAGMA cache_size={-cache_size_mb * 1024}')
+            cursor.execute(f'PRAGMA mmap_size={mmap_size_mb * 1024 * 1024}')
+            cursor.close()
+    return engine
+
+DASHBOARD_TEMPLATE = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Airdrop opportunities</title>
+<style>
+body { font-family: sans-serif; margin: 1.5em; }
+form { margin-bottom: 1em; }
+input { width: 9em; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: left; vertical-align: top; }
+td.description { max-width: 40em; }
+.error { color: #b00; }
+</style>
+</head>
+<body>
+<h1>Airdrop opportunities</h1>
+<form method="get">
+  <input name="q" placeholder="search" value="{{ args.get('q', '') }}">
+  <input name="project" placeholder="project" value="{{ args.get('project', '') }}">
+  <input name="token" placeholder="token" value="{{ args.get('token', '') }}">
+  <input name="min_confidence" placeholder="min confidence" value="{{ args.get('min_confidence', '') }}">
+  <input name="max_confidence" placeholder="max confidence" value="{{ args.get('max_confidence', '') }}">
+  <input name="expiring_within_days" placeholder="expiring within days"
+         value="{{ args.get('expiring_within_days', '') }}">
+  <select name="sort">
+    {% for sort in sorts %}
+    <option value="{{ sort }}" {% if args.get('sort') == sort %}selected{% endif %}>{{ sort }}</option>
+    {% endfor %}
+  </select>
+  <button type="submit">Filter</button>
+</form>
+{% if error %}<p class="error">{{ error }}</p>{% endif %}
+<table>
+  <tr><th>Project</th><th>Token</th><th>Confidence</th><th>Deadline</th><th>Description</th><th>Found</th></tr>
+  {% for opportunity in page.opportunities %}
+  <tr>
+    <td>{% if opportunity.project_name %}<a href="{{ url_for('dashboard', project=opportunity.project_name) }}">
+      {{- opportunity.project_name }}</a>{% endif %}</td>
+    <td>{{ opportunity.token_symbol or '' }}</td>
+    <td>{{ '%.0f' % opportunity.confidence_score if opportunity.confidence_score is not none else '' }}</td>
+    <td>{{ (opportunity.deadline or '')[:10] }}</td>
+    <td class="description">{{ opportunity.description or '' }}
+      {% if opportunity.tweet_url %}<a href="{{ opportunity.tweet_url }}">tweet</a>{% endif %}</td>
+    <td>{{ (opportunity.created_at or '')[:16] }}</td>
+  </tr>
+  {% endfor %}
+</table>
+{% if page.next_cursor %}<p><a href="?{{ next_args }}">Next page</a></p>{% endif %}
+</body>
+</html>
+"""
+
+def create_app(engine: Engine, cache_size: int = API_CACHE_SIZE):
+    """Flask app serving the read-only opportunity API and dashboard.
+    
+    GET /api/opportunities takes project, token, min_confidence,
+    max_confidence, deadline_after, deadline_before, expiring_within_days
+    or expiring_soon, q (full-text search), sort, limit and cursor.
+    GET /api/opportunities/<id> returns one opportunity and its source
+    tweets, and / is an HTML dashboard over the same queries.
+    """
+    # Imported here so importing this module (e.g. for OpportunityQuery) doesn't load Flask
+    from urllib.parse import urlencode
+    from flask import Flask, jsonify, render_template_string, request
+    
+    app = Flask(__name__)
+    cache = ResponseCache(engine, cache_size) if cache_size > 0 else None
+    app.extensions['response_cache'] = cache
+    
+    def cached(key: Tuple, load):
+        value = cache.get(key) if cache is not None else None
+        if value is None:
+            with engine.connect() as conn:
+                value = load(conn)
+            if cache is not None:
+                cache.put(key, value)
+        return value
+    
+    def find_page(args) -> Dict[str, Any]:
+        query = OpportunityQuery.from_args(args)
+        return cached(('page',) + query.cache_key(), query.page)
+    
+    @app.route('/api/opportunities')
+    def list_opportunities():
+        try:
+            return jsonify(find_page(request.args))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    @app.route('/api/opportunities/<int:opportunity_id>')
+    def show_opportunity(opportunity_id: int):
+        # Missing opportunities aren't cached, since None means a cache miss
+        opportunity = cached(('opportunity', opportunity_id),
+                             lambda conn: get_opportunity(conn, opportunity_id))
+        if opportunity is None:
+            return jsonify({'error': f"no opportunity {opportunity_id}"}), 404
+        return jsonify(opportunity)
+    
+    @app.route('/')
+    def dashboard():
+        error = None
+        try:
+            page = find_page(request.args)
+        except ValueError as e:
+            page, error = {'opportunities': [], 'next_cursor': None}, str(e)
+        next_args = ''
+        if page['next_cursor']:
+            next_args = urlencode({**request.args.to_dict(), 'cursor': page['next_cursor']})
+        return render_template_string(DASHBOARD_TEMPLATE, page=page, args=request.args, sorts=SORTS,
+                                      error=error, next_args=next_args)
+    
+    return app
+
+def start_api_server(host: str, port: int, db_url: str, cache_size: int = API_CACHE_SIZE):
+    """Serve create_app from a daemon thread on a read-only engine; returns the server."""
+    from werkzeug.serving import make_server
+    
+    server = make_server(host, port, create_app(read_only_engine(db_url), cache_size), threaded=True)
+    threading.Thread(target=server.serve_forever, name='api-http', daemon=True).start()
+    return server
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Serve the read-only opportunity API and dashboard.'
+    )
+    arg_parser.add_argument('--database', default='sqlite:///airdrops.db')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8080)
+    arg_parser.add_argument('--cache-size', type=int, default=API_CACHE_SIZE,
+                            help='responses to cache, 0 to disable')
+    args = arg_parser.parse_args()
+    
+    # Adds any missing indexes and the search index, which takes a while
+    # the first time on a large database
+    init_db(args.database).dispose()
+    
+    from werkzeug.serving import make_server
+    
+    server = make_server(args.host, args.port, create_app(read_only_engine(args.database), args.cache_size),
+                         threaded=True)
+    print(f"Serving the opportunity API and dashboard on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+from oauthlib import oauth1
+from sqlalchemy.orm import Session
+from tweepy.models import Status
+
+from models import TweetRecord
+from metrics import METRICS
+from rate_limit import TokenBucket
+from fetch_tweets import (SeenTweetCache, advance_cursor, filter_tweets,
+                          get_cursor, get_sources, load_cursors)
+
+API_BASE_URL = 'https://api.twitter.com/1.1'
+
+# Requests allowed per 15 minute window for each endpoint family (user auth)
+RATE_LIMITS = {
+    'user_timeline': 900,
+    'search': 180,
+}
+RATE_LIMIT_WINDOW = 15 * 60
+
+class AsyncTwitterFetcher:
+    """Fetch timelines and searches concurrently with per-endpoint rate limiting."""
+    
+    def __init__(self, api_key: str, api_secret: str, access_token: str,
+                 access_token_secret: str, base_url: str = API_BASE_URL,
+                 max_concurrency: int = 8, max_retries: int = 3, timeout: float = 30.0,
+                 rate_limit_share: float = 1.0):
+        self.oauth = oauth1.Client(api_key, client_secret=api_secret,
+                                   resource_owner_key=access_token,
+                                   resource_owner_secret=access_token_secret)
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.http = httpx.AsyncClient(timeout=timeout)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Processes sharing the same credentials each get rate_limit_share of every quota
+        self.buckets = {family: TokenBucket(max(1, int(limit * rate_limit_share)), RATE_LIMIT_WINDOW)
+                        for family, limit in RATE_LIMITS.items()}
+    
+    async def aclose(self):
+        await self.http.aclose()
+    
+    async def _get(self, family: str, path: str, params: Dict) -> Optional[object]:
+        """GET an API endpoint, retrying on 429 once the quota allows."""
+        bucket = self.buckets[family]
+        url = f"{self.base_url}/{path}.json?{urlencode(params)}"
+        
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            async with self.semaphore:
+                uri, headers, _ = self.oauth.sign(url)
+                try:
+                    response = await self.http.get(uri, headers=headers)
+                except httpx.HTTPError as e:
+                    print(f"Error requesting {path}: {str(e)}")
+                    return None
+            
+            bucket.update_from_headers(response.headers)
+            if response.status_code == 429:
+                retry_after = response.headers.get('retry-after')
+                if retry_after is not None:
+                    bucket.exhaust(float(retry_after))
+                elif 'x-rate-limit-reset' not in response.headers:
+                    bucket.exhaust(60.0)
+                else:
+                    bucket.tokens = 0.0
+                continue
+            if response.status_code != 200:
+                print(f"Error requesting {path}: HTTP {response.status_code}")
+                return None
+            return response.json()
+        
+        print(f"Giving up on {path} after {self.max_retries} rate-limited retries")
+        return None
+    
+    async def get_user_tweets(self, username: str, since_id: Optional[str] = None,
+                              max_results: int = 100) -> List[Status]:
+        """Fetch recent tweets from a specific user."""
+        params = {'screen_name': username, 'count': max_results, 'tweet_mode': 'extended'}
+        if since_id:
+            params['since_id'] = since_id
+        with METRICS.timer('airdrop_fetch_seconds', source_type='account'):
+            data = await self._get('user_timeline', 'statuses/user_timeline', params)
+        tweets = [Status.parse(None, item) for item in data or []]
+        METRICS.inc('airdrop_tweets_total', len(tweets), stage='fetched')
+        return tweets
+    
+    async def search_tweets(self, query: str, since_id: Optional[str] = None,
+                            max_results: int = 100) -> List[Status]:
+        """Search for tweets matching the query."""
+        params = {'q': query, 'count': max_results, 'tweet_mode': 'extended'}
+        if since_id:
+            params['since_id'] = since_id
+        with METRICS.timer('airdrop_fetch_seconds', source_type='query'):
+            data = await self._get('search', 'search/tweets', params)
+        tweets = [Status.parse(None, item) for item in (data or {}).get('statuses', [])]
+        METRICS.inc('airdrop_tweets_total', len(tweets), stage='fetched')
+        return tweets
+    
+    async def fetch_source(self, source_type: str, source: str,
+                           since_id: Optional[str] = None) -> Tuple[str, str, List[Status]]:
+        """Fetch one account timeline or search query."""
+        if source_type == 'account':
+            tweets = await self.get_user_tweets(source, since_id=since_id)
+        else:
+            tweets = await self.search_tweets(source, since_id=since_id)
+        return source_type, source, tweets
+
+async def stream_new_tweets(fetcher: AsyncTwitterFetcher, db: Session,
+                            seen_cache: Optional[SeenTweetCache] = None,
+                            reputation=None) -> AsyncIterator[List[TweetRecord]]:
+    """Fetch every source concurrently and yield filtered tweets per source as it completes.
+    
+    Cursors are advanced in the session without committing, as in
+    fetch_new_tweets.
+    """
+    cursors = load_cursors(db)
+    tasks = []
+    for source_type, source in get_sources(db):
+        cursor = get_cursor(db, cursors, source_type, source)
+        tasks.append(asyncio.create_task(
+            fetcher.fetch_source(source_type, source, since_id=cursor.since_id)
+        ))
+    
+    # A tweet can appear in several sources; only filter it once
+    yielded_ids = set()
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            source_type, source, tweets = await next_result
+            advance_cursor(cursors[(source_type, source)], tweets)
+            
+            tweets = [tweet for tweet in tweets if str(tweet.id) not in yielded_ids]
+            yielded_ids.update(str(tweet.id) for tweet in tweets)
+            filtered = filter_tweets(tweets, db, seen_cache=seen_cache, reputation=reputation)
+            if filtered:
+                yield filtered
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def fetch_new_tweets_async(fetcher: AsyncTwitterFetcher, db: Session,
+                                 seen_cache: Optional[SeenTweetCache] = None,
+                                 reputation=None) -> List[TweetRecord]:
+    """Async counterpart of fetch_new_tweets."""
+    new_tweets = []
+    async for batch in stream_new_tweets(fetcher, db, seen_cache=seen_cache, reputation=reputation):
+        new_tweets.extend(batch)
+    return new_tweets
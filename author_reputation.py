@@ -0,0 +1,234 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import (AirdropOpportunity, AuthorStats, OpportunityRecord, ProcessedTweet, TweetRecord,
+                    TwitterAccount, after_commit)
+from text_scan import count_spam
+
+# Reputation is the share of an author's tweets without spam keywords,
+# smoothed towards PRIOR_SPAM_RATE as if every author had already posted
+# PRIOR_TWEETS tweets, so one spammy tweet doesn't sink a new author.
+PRIOR_TWEETS = 10
+PRIOR_SPAM_RATE = 0.1
+DEFAULT_REPUTATION = 1.0 - PRIOR_SPAM_RATE
+
+# Authors are only dropped for low reputation once this many of their
+# tweets have been seen
+MIN_AUTHOR_TWEETS = 20
+
+BACKFILL_CHUNK_SIZE = 5000
+
+class AuthorRecord:
+    """In-memory copy of one author_stats row."""
+    
+    def __init__(self, author_id: str, username: Optional[str] = None, tweets_seen: int = 0,
+                 opportunities: int = 0, confidence_total: float = 0.0, spam_hits: int = 0):
+        self.author_id = author_id
+        self.username = username
+        self.tweets_seen = tweets_seen
+        self.opportunities = opportunities
+        self.confidence_total = confidence_total
+        self.spam_hits = spam_hits
+        self.reputation = self.compute_reputation()
+    
+    @property
+    def average_confidence(self) -> float:
+        return self.confidence_total / self.opportunities if self.opportunities else 0.0
+    
+    @property
+    def spam_rate(self) -> float:
+        return self.spam_hits / self.tweets_seen if self.tweets_seen else 0.0
+    
+    def compute_reputation(self) -> float:
+        spam = self.spam_hits + PRIOR_SPAM_RATE * PRIOR_TWEETS
+        return 1.0 - spam / (self.tweets_seen + PRIOR_TWEETS)
+
+class _Delta:
+    """Changes to one author's stats from a batch."""
+    
+    def __init__(self):
+        self.username = None
+        self.tweets = 0
+        self.opportunities = 0
+        self.confidence = 0.0
+        self.spam_hits = 0
+
+class AuthorReputation:
+    """Per-author stats and reputation, kept in memory for O(1) lookups.
+    
+    The author_stats table is only ever changed by increments written in
+    the same transaction as the tweets they count (record_batch), so it is
+    never rebuilt with aggregate queries after the one-time backfill in
+    warm(). Trusted and blacklisted flags come from twitter_accounts.
+    """
+    
+    def __init__(self, min_reputation: float = 0.0, min_tweets: int = MIN_AUTHOR_TWEETS):
+        self.min_reputation = min_reputation
+        self.min_tweets = min_tweets
+        self.authors: Dict[str, AuthorRecord] = {}
+        self.trusted: Set[str] = set()  # lowercased usernames
+        self.blacklisted: Set[str] = set()  # lowercased usernames
+        self.stats = {'passed': 0, 'rejected_blacklisted': 0, 'rejected_reputation': 0}
+    
+    def __len__(self) -> int:
+        return len(self.authors)
+    
+    def warm(self, session: Session):
+        """Load account flags and every author's stats, backfilling an empty table."""
+        self.refresh_accounts(session)
+        if session.query(AuthorStats.id).first() is None:
+            self.backfill(session)
+        self.authors = {}
+        for row in session.query(AuthorStats).yield_per(BACKFILL_CHUNK_SIZE):
+            self.authors[row.author_id] = AuthorRecord(
+                row.author_id, row.author_username, row.tweets_seen or 0, row.opportunities or 0,
+                row.confidence_total or 0.0, row.spam_hits or 0
+            )
+    
+    def refresh_accounts(self, session: Session):
+        """Reload the trusted and blacklisted usernames (one small query)."""
+        self.trusted = set()
+        self.blacklisted = set()
+        rows = session.query(TwitterAccount.username, TwitterAccount.is_trusted,
+                             TwitterAccount.is_blacklisted)
+        for username, is_trusted, is_blacklisted in rows:
+            if is_blacklisted:
+                self.blacklisted.add(username.lower())
+            elif is_trusted:
+                self.trusted.add(username.lower())
+    
+    def backfill(self, session: Session):
+        """Build author_stats from the tweets and opportunities already stored.
+        
+        Only needed once, for databases created before author_stats existed.
+        Tweets whose text was archived count as seen but not as spam hits.
+        """
+        deltas = defaultdict(_Delta)
+        tweets = session.execute(select(ProcessedTweet.author_id, ProcessedTweet.author_username,
+                                        ProcessedTweet.processed_text))
+        for author_id, username, text in tweets:
+            delta = deltas[author_id]
+            delta.username = username or delta.username
+            delta.tweets += 1
+            if text and count_spam(text):
+                delta.spam_hits += 1
+        opportunities = session.execute(
+            select(ProcessedTweet.author_id, AirdropOpportunity.confidence_score)
+            .join(ProcessedTweet, ProcessedTweet.tweet_id == AirdropOpportunity.tweet_id)
+        )
+        for author_id, confidence_score in opportunities:
+            delta = deltas[author_id]
+            delta.opportunities += 1
+            delta.confidence += confidence_score or 0.0
+        self._write(session, {}, deltas)
+        session.commit()
+    
+    def reputation(self, author_id: str, username: Optional[str] = None) -> float:
+        """Reputation between 0 and 1: 1 for trusted accounts, 0 for blacklisted ones."""
+        if username:
+            username = username.lower()
+            if username in self.blacklisted:
+                return 0.0
+            if username in self.trusted:
+                return 1.0
+        record = self.authors.get(author_id)
+        return record.reputation if record is not None else DEFAULT_REPUTATION
+    
+    def allows(self, author_id: str, username: Optional[str] = None) -> bool:
+        """Whether an author's tweets are worth extracting at all."""
+        if username and username.lower() in self.blacklisted:
+            self.stats['rejected_blacklisted'] += 1
+            return False
+        if self.min_reputation > 0 and not (username and username.lower() in self.trusted):
+            record = self.authors.get(author_id)
+            if (record is not None and record.tweets_seen >= self.min_tweets
+                    and record.reputation < self.min_reputation):
+                self.stats['rejected_reputation'] += 1
+                return False
+        self.stats['passed'] += 1
+        return True
+    
+    def record_batch(self, session: Session, tweets: List[TweetRecord],
+                     opportunities: Iterable[OpportunityRecord]):
+        """Count a batch of new tweets and the opportunities extracted from them.
+        
+        Writes increments to author_stats in the session without
+        committing, so the stats are committed together with the tweets.
+        The in-memory stats only change once that commit succeeds.
+        """
+        author_ids = {}
+        deltas = defaultdict(_Delta)
+        for tweet in tweets:
+            author_ids[tweet.tweet_id] = tweet.author_id
+            delta = deltas[tweet.author_id]
+            delta.username = tweet.author_username or delta.username
+            delta.tweets += 1
+            if count_spam(tweet.processed_text or ''):
+                delta.spam_hits += 1
+        for opportunity in opportunities:
+            author_id = author_ids.get(opportunity.tweet_id)
+            if author_id is not None:
+                delta = deltas[author_id]
+                delta.opportunities += 1
+                delta.confidence += opportunity.confidence_score or 0.0
+        if deltas:
+            self._write(session, self.authors, deltas)
+            after_commit(session, apply=lambda: self._apply(deltas))
+    
+    def _apply(self, deltas: Dict[str, _Delta]):
+        for author_id, delta in deltas.items():
+            record = self.authors.get(author_id)
+            if record is None:
+                self.authors[author_id] = AuthorRecord(
+                    author_id, delta.username, delta.tweets, delta.opportunities,
+                    delta.confidence, delta.spam_hits
+                )
+                continue
+            record.username = delta.username or record.username
+            record.tweets_seen += delta.tweets
+            record.opportunities += delta.opportunities
+            record.confidence_total += delta.confidence
+            record.spam_hits += delta.spam_hits
+            record.reputation = record.compute_reputation()
+    
+    def _write(self, session: Session, known: Dict[str, AuthorRecord], deltas: Dict[str, _Delta]):
+        now = datetime.utcnow()
+        new_rows, increments = [], []
+        for author_id, delta in deltas.items():
+            record = known.get(author_id)
+            if record is None:
+                new_rows.append({
+                    'author_id': author_id, 'author_username': delta.username,
+                    'tweets_seen': delta.tweets, 'opportunities': delta.opportunities,
+                    'confidence_total': delta.confidence, 'spam_hits': delta.spam_hits,
+                    'updated_at': now,
+                })
+                continue
+            increments.append({
+                'key': author_id, 'username': delta.username or record.username,
+                'tweets': delta.tweets, 'opportunities': delta.opportunities,
+                'confidence': delta.confidence, 'spam_hits': delta.spam_hits, 'now': now,
+            })
+        
+        if new_rows:
+            session.execute(insert(AuthorStats), new_rows)
+        if increments:
+            # Relative updates, so the row stays right whatever else wrote to it
+            table = AuthorStats.__table__
+            session.execute(
+                update(table)
+                .where(table.c.author_id == bindparam('key'))
+                .values(
+                    author_username=bindparam('username'),
+                    tweets_seen=table.c.tweets_seen + bindparam('tweets'),
+                    opportunities=table.c.opportunities + bindparam('opportunities'),
+                    confidence_total=table.c.confidence_total + bindparam('confidence'),
+                    spam_hits=table.c.spam_hits + bindparam('spam_hits'),
+                    updated_at=bindparam('now'),
+                ),
+                increments
+            )
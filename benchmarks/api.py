@@ -0,0 +1,134 @@
+"""Latency of the opportunity API's queries on a large database.
+
+Fills a fresh SQLite file with --count opportunities and their tweets
+(text from the synthetic corpus, through the same triggers that keep the
+search index current), then times each kind of query through the Flask
+test client: uncached, cached, and 20 pages deep by following cursors.
+It also checks that an insert by another connection empties the cache.
+
+    python -m benchmarks.api [--count 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from models import AirdropOpportunity, ProcessedTweet, init_db
+from api import create_app, read_only_engine
+from benchmarks.synthetic_corpus import PROJECTS, generate
+
+CHUNK_SIZE = 50000
+
+QUERIES = {
+    'newest': {},
+    'project': {'project': 'zksync7'},
+    'token': {'token': 'ZKS7'},
+    'confidence 90-100': {'min_confidence': '90', 'max_confidence': '100'},
+    'confidence sort': {'min_confidence': '40', 'max_confidence': '45', 'sort': 'confidence'},
+    'deadline window': {'deadline_after': '{soon}', 'deadline_before': '{later}'},
+    'expiring soon': {'expiring_soon': '1'},
+    'search common': {'q': 'airdrop'},
+    'search rare': {'q': 'sequencers'},
+    'search + project': {'q': 'testnet', 'project': 'scroll3'},
+    'project + confidence': {'project': 'linea1', 'min_confidence': '80'},
+}
+
+def populate(engine, count: int, seed: int):
+    rng = random.Random(seed)
+    texts = [status['full_text'] for status in generate(20000, seed=seed)]
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, count, CHUNK_SIZE):
+            tweets, opportunities = [], []
+            for i in range(start, min(start + CHUNK_SIZE, count)):
+                text = texts[i % len(texts)]
+                project = rng.choice(PROJECTS)
+                variant = rng.randrange(10)
+                tweets.append({'tweet_id': str(i), 'author_id': str(i % 5000), 'text': text,
+                               'processed_text': text.lower(), 'created_at': now, 'processed_at': now,
+                               'is_retweet': False, 'is_reply': False})
+                opportunities.append({
+                    'tweet_id': str(i),
+                    'project_name': f"{project}{variant}",
+                    'token_symbol': f"{project[:3].upper()}{variant}" if rng.random() < 0.7 else None,
+                    'description': text[:200],
+                    'deadline': now + timedelta(hours=rng.uniform(-24 * 60, 24 * 60))
+                    if rng.random() < 0.6 else None,
+                    'participation_steps': None,
+                    'tweet_url': f"https://twitter.com/i/web/status/{i}",
+                    'confidence_score': round(rng.uniform(0, 100), 1),
+                    'created_at': now - timedelta(seconds=count - i),
+                    'notified': True,
+                    'cluster_size': 1,
+                    'source_count': 1,
+                })
+            conn.execute(insert(ProcessedTweet), tweets)
+            conn.execute(insert(AirdropOpportunity), opportunities)
+
+def timed(client, params, repeat: int):
+    timings, body = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get('/api/opportunities', query_string=params)
+        timings.append((time.perf_counter() - start) * 1000)
+        body = response.get_json()
+        assert response.status_code == 200, body
+    return timings, body
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=1000000)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    args = arg_parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        url = f"sqlite:///{os.path.join(workdir, 'api.db')}"
+        engine = init_db(url)
+        start = time.perf_counter()
+        populate(engine, args.count, args.seed)
+        print(f"Inserted {args.count} opportunities and tweets, with the search index, "
+              f"in {time.perf_counter() - start:.1f}s")
+        
+        now = datetime.utcnow()
+        uncached = create_app(read_only_engine(url), cache_size=0).test_client()
+        cached_app = create_app(read_only_engine(url))
+        cached = cached_app.test_client()
+        print(f"{'query':>22} {'rows':>5} {'p50 ms':>8} {'p95 ms':>8} {'cached ms':>10} {'page 20 ms':>11}")
+        for name, params in QUERIES.items():
+            params = {key: value.format(soon=(now + timedelta(days=1)).isoformat(),
+                                        later=(now + timedelta(days=15)).isoformat())
+                      for key, value in params.items()}
+            timings, body = timed(uncached, params, args.repeat)
+            rows = len(body['opportunities'])
+            hits, _ = timed(cached, params, args.repeat + 1)
+            # Follow cursors to the 20th page and time that one
+            deep = dict(params)
+            page_ms = None
+            for _ in range(19):
+                cursor = body['next_cursor']
+                if cursor is None:
+                    break
+                deep['cursor'] = cursor
+                page_timings, body = timed(uncached, deep, 1)
+                page_ms = page_timings[0]
+            timings.sort()
+            print(f"{name:>22} {rows:>5} {statistics.median(timings):>8.2f} "
+                  f"{timings[int(len(timings) * 0.95) - 1]:>8.2f} {statistics.median(hits[1:]):>10.3f} "
+                  f"{page_ms if page_ms is not None else float('nan'):>11.2f}")
+        
+        with engine.begin() as conn:
+            conn.execute(insert(ProcessedTweet), {'tweet_id': 'new', 'author_id': '1', 'text': 'new airdrop'})
+            conn.execute(insert(AirdropOpportunity), {'tweet_id': 'new', 'project_name': 'Fresh'})
+        newest = cached.get('/api/opportunities', query_string={'limit': '1'}).get_json()
+        print(f"After an insert: newest is {newest['opportunities'][0]['project_name']!r}, "
+              f"cache {cached_app.extensions['response_cache'].stats}")
+        engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Accuracy and per-call latency of deadline extraction on a labelled corpus.
+
+"before" is extract_deadline as it was before deadlines.py: the old
+deadline patterns, each candidate handed to dateutil's fuzzy parser.
+"after" is extract_info.extract_deadline. Each corpus line has the
+processed tweet text, the time it was posted ("now") and the deadline a
+reader would take from it, or null.
+
+    python -m benchmarks.deadlines [corpus.jsonl] [--repeat 200] [--verbose]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+from dateutil import parser
+
+import deadlines
+from extract_info import extract_deadline
+from text_scan import DEADLINE_PATTERNS
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), 'deadline_corpus.jsonl')
+
+REFERENCE_PATTERNS = [
+    r'deadline:?\s*(.+?)(?:\.|$)',
+    r'ends?(?:\son)?:?\s*(.+?)(?:\.|$)',
+    r'until:?\s*(.+?)(?:\.|$)',
+    r'closes?(?:\son)?:?\s*(.+?)(?:\.|$)'
+]
+
+def reference_extract_deadline(text: str, now: datetime):
+    # dateutil fills missing fields from default, which pins "today" to now
+    default = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for pattern in REFERENCE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                parsed = parser.parse(match.group(1), fuzzy=True, default=default)
+            except (ValueError, OverflowError):
+                continue
+            # Compare in naive UTC like everything else
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+    return None
+
+def score(function, corpus, verbose: bool = False, label: str = ''):
+    counts = {'correct': 0, 'wrong': 0, 'missed': 0, 'false': 0}
+    for text, now, expected in corpus:
+        found = function(text, now)
+        if found == expected:
+            counts['correct'] += 1
+            continue
+        if found is None:
+            counts['missed'] += 1
+        elif expected is None:
+            counts['false'] += 1
+        else:
+            counts['wrong'] += 1
+        if verbose:
+            print(f"  {label}: {text!r}: got {found}, expected {expected}")
+    return counts
+
+def per_call_us(function, corpus, repeat: int, before_each=None) -> float:
+    elapsed = 0.0
+    for _ in range(repeat):
+        if before_each is not None:
+            before_each()
+        start = time.perf_counter()
+        for text, now, _ in corpus:
+            function(text, now)
+        elapsed += time.perf_counter() - start
+    return elapsed / (repeat * len(corpus)) * 1e6
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    arg_parser.add_argument('--repeat', type=int, default=200)
+    arg_parser.add_argument('--verbose', action='store_true', help='print every miss')
+    args = arg_parser.parse_args()
+    
+    corpus = []
+    with open(args.corpus) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                expected = record['deadline']
+                corpus.append((record['text'], datetime.fromisoformat(record['now']),
+                               datetime.fromisoformat(expected) if expected else None))
+    
+    print(f"{len(corpus)} labelled tweets")
+    rows = [
+        ('before', reference_extract_deadline, None),
+        ('after', extract_deadline, None),
+        # Without the memoized dateutil fallback, as for text never seen before
+        ('after, cold', extract_deadline, deadlines._fuzzy_parse.cache_clear),
+    ]
+    for name, function, before_each in rows:
+        counts = score(function, corpus, args.verbose and before_each is None, name)
+        latency = per_call_us(function, corpus, args.repeat, before_each)
+        print(f"{name:>12}: {counts['correct']}/{len(corpus)} correct, {counts['wrong']} wrong date, "
+              f"{counts['missed']} missed, {counts['false']} false positives, {latency:.1f}us per call")
+    
+    fallbacks = sum(1 for text, now, _ in corpus
+                    if extract_deadline(text, now) is not None
+                    and all(deadlines.match_deadline(candidate, now) is None
+                            for candidate in _candidates(text)))
+    print(f"{fallbacks} tweets needed the dateutil fallback")
+    return 0
+
+def _candidates(text: str):
+    matches = (pattern.search(text) for pattern in DEADLINE_PATTERNS)
+    return [match.group(1) for match in matches if match]
+
+if __name__ == '__main__':
+    sys.exit(main())
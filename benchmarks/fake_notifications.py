@@ -0,0 +1,155 @@
+"""Local fakes of an SMTP server and the Telegram Bot API.
+
+Both add a configurable latency to every message. The Telegram fake
+answers every Nth sendMessage with a 429 and retry_after, like Telegram's
+flood control, so retries and rate limiting can be exercised without
+network access.
+"""
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeSMTPServer:
+    """Accepts AUTH and any message, without STARTTLS."""
+    
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(f"{line}\r\n".encode())
+            
+            def handle(self):
+                with server._lock:
+                    server.connections += 1
+                self.reply('220 fake ESMTP')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors='replace').strip().upper()
+                    if command.startswith(('EHLO', 'HELO')):
+                        self.reply('250-fake')
+                        self.reply('250 AUTH PLAIN LOGIN')
+                    elif command.startswith('AUTH'):
+                        self.reply('235 2.7.0 Authentication successful')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        data = []
+                        for data_line in self.rfile:
+                            if data_line in (b'.\r\n', b'.\n'):
+                                break
+                            data.append(data_line)
+                        time.sleep(server.latency)
+                        with server._lock:
+                            server.messages.append(b''.join(data))
+                        self.reply('250 OK')
+                    elif command.startswith('QUIT'):
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        # MAIL, RCPT, RSET, NOOP
+                        self.reply('250 OK')
+        
+        return Handler
+
+class FakeTelegramServer:
+    """Bot API getMe and sendMessage for any token."""
+    
+    def __init__(self, latency: float = 0.05, rate_limit_every: int = 0, retry_after: int = 1):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.messages = []
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/bot"
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def respond(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                method = self.path.rsplit('/', 1)[-1]
+                if method == 'getMe':
+                    self.respond(200, {'ok': True, 'result': {
+                        'id': 1, 'is_bot': True, 'first_name': 'fake', 'username': 'fake_bot'
+                    }})
+                    return
+                if method != 'sendMessage':
+                    self.respond(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                    return
+                
+                time.sleep(server.latency)
+                with server._lock:
+                    server.requests += 1
+                    limited = server.rate_limit_every and server.requests % server.rate_limit_every == 0
+                    if limited:
+                        server.rate_limited += 1
+                    else:
+                        server.messages.append(body)
+                        message_id = len(server.messages)
+                if limited:
+                    self.respond(429, {
+                        'ok': False, 'error_code': 429,
+                        'description': f"Too Many Requests: retry after {server.retry_after}",
+                        'parameters': {'retry_after': server.retry_after},
+                    })
+                    return
+                self.respond(200, {'ok': True, 'result': {
+                    'message_id': message_id, 'date': int(time.time()),
+                    'chat': {'id': 1, 'type': 'group', 'title': 'fake'}, 'text': 'ok',
+                }})
+        
+        return Handler
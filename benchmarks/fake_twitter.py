@@ -0,0 +1,106 @@
+"""Local fake of the Twitter v1.1 timeline and search endpoints.
+
+Serves synthetic tweets with configurable latency and answers every
+Nth request per endpoint with a 429 and a short rate-limit window, so
+AsyncTwitterFetcher can be exercised without network access. Tweet text
+comes from `texts` when given (e.g. a synthetic corpus), otherwise every
+tweet says the same thing.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+class FakeTwitterServer:
+    def __init__(self, latency: float = 0.05, rate_limit_every: int = 0,
+                 rate_limit_reset: float = 1.0, tweets_per_page: int = 20,
+                 texts: Optional[Iterator[str]] = None):
+        self.latency = latency
+        self.texts = texts
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_reset = rate_limit_reset
+        self.tweets_per_page = tweets_per_page
+        self.requests = {}
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/1.1"
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def _make_tweets(self, source: str):
+        created_at = datetime.now(timezone.utc).strftime('%a %b %d %H:%M:%S +0000 %Y')
+        tweets = []
+        with self._lock:
+            for _ in range(self.tweets_per_page):
+                self._next_id += 1
+                tweets.append({
+                    'id': self._next_id,
+                    'id_str': str(self._next_id),
+                    'full_text': (next(self.texts) if self.texts is not None
+                                  else f"{source} airdrop! claim $TEST token. deadline: oct 20"),
+                    'created_at': created_at,
+                    'user': {'id': 42, 'screen_name': 'fake'},
+                    'in_reply_to_status_id': None,
+                })
+        return tweets
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                if url.path.endswith('/statuses/user_timeline.json'):
+                    endpoint, source = 'user_timeline', params.get('screen_name', [''])[0]
+                elif url.path.endswith('/search/tweets.json'):
+                    endpoint, source = 'search', params.get('q', [''])[0]
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                
+                time.sleep(server.latency)
+                with server._lock:
+                    count = server.requests.get(endpoint, 0) + 1
+                    server.requests[endpoint] = count
+                    limited = server.rate_limit_every and count % server.rate_limit_every == 0
+                    if limited:
+                        server.rate_limited += 1
+                
+                if limited:
+                    self.send_response(429)
+                    self.send_header('x-rate-limit-remaining', '0')
+                    self.send_header('x-rate-limit-reset', str(int(time.time() + server.rate_limit_reset)))
+                    self.end_headers()
+                    return
+                
+                tweets = server._make_tweets(source)
+                body = json.dumps(tweets if endpoint == 'user_timeline' else {'statuses': tweets})
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('x-rate-limit-remaining', '100')
+                self.send_header('x-rate-limit-reset', str(int(time.time() + 900)))
+                self.end_headers()
+                self.wfile.write(body.encode())
+        
+        return Handler
@@ -0,0 +1,58 @@
+"""Compare cycle wall-time of sequential and concurrent fetching.
+
+Runs fetch_new_tweets_async against a local FakeTwitterServer, first
+with max_concurrency=1 (one request at a time, like fetch_new_tweets)
+and then with the requested concurrency. Every run uses a fresh in-memory
+database so both start from empty cursors.
+
+    python -m benchmarks.fetch_compare [--accounts 20] [--latency 0.1]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from models import init_db, bulk_save, TwitterAccount
+from async_fetch import AsyncTwitterFetcher, fetch_new_tweets_async
+from benchmarks.fake_twitter import FakeTwitterServer
+
+async def run_cycle(base_url: str, accounts: int, concurrency: int):
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    session.add_all(TwitterAccount(username=f'account{i}', is_trusted=True)
+                    for i in range(accounts))
+    session.commit()
+    
+    fetcher = AsyncTwitterFetcher('key', 'secret', 'token', 'token_secret',
+                                  base_url=base_url, max_concurrency=concurrency)
+    start = time.perf_counter()
+    try:
+        tweets = await fetch_new_tweets_async(fetcher, session)
+        bulk_save(session, tweets, [])
+        session.commit()
+    finally:
+        await fetcher.aclose()
+        session.close()
+    return time.perf_counter() - start, len(tweets)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--accounts', type=int, default=20)
+    arg_parser.add_argument('--latency', type=float, default=0.1)
+    arg_parser.add_argument('--concurrency', type=int, default=8)
+    arg_parser.add_argument('--rate-limit-every', type=int, default=15,
+                            help='answer every Nth request per endpoint with a 429')
+    args = arg_parser.parse_args()
+    
+    for concurrency in (1, args.concurrency):
+        server = FakeTwitterServer(latency=args.latency,
+                                   rate_limit_every=args.rate_limit_every).start()
+        try:
+            elapsed, count = asyncio.run(run_cycle(server.base_url, args.accounts, concurrency))
+        finally:
+            server.stop()
+        print(f"concurrency={concurrency:>2}: {elapsed:.2f}s for {count} tweets, "
+              f"{sum(server.requests.values())} requests, {server.rate_limited} rate limited")
+
+if __name__ == '__main__':
+    main()
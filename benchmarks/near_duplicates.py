@@ -0,0 +1,88 @@
+"""Near-duplicate index throughput and lookup latency at scale.
+
+Fills a NearDuplicateIndex with N cluster heads (1M by default) with
+random MinHash signatures and three entities each, then times lookups
+of near-duplicates (a stored signature with a few values changed, as a
+reworded tweet would have, and the head's entities) and of unseen
+signatures. Also times MinHash and entity_keys on tweet-sized text.
+
+    python -m benchmarks.near_duplicates [--count 1000000] [--lookups 100000]
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from array import array
+
+from near_duplicates import NearDuplicateIndex, NUM_PERM, entity_keys, minhash
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+def random_signature():
+    return array('I', (random.getrandbits(32) for _ in range(NUM_PERM)))
+
+def random_entities():
+    return tuple(sorted(random.getrandbits(63) for _ in range(3)))
+
+def reworded(index, position, changed):
+    offset = position * NUM_PERM
+    signature = index.signatures[offset:offset + NUM_PERM]
+    for i in random.sample(range(NUM_PERM), changed):
+        signature[i] = random.getrandbits(32)
+    entities = index.entities[index.entity_offsets[position]:index.entity_offsets[position + 1]]
+    return signature, entities
+
+def time_lookups(index, lookups):
+    latencies = []
+    found = 0
+    for signature, entities in lookups:
+        start = time.perf_counter()
+        if index.find(signature, entities) is not None:
+            found += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, found
+
+def report(name, latencies, found):
+    print(f"{name:>14}: p50 {percentile(latencies, 0.5) * 1e6:.1f}us, "
+          f"p99 {percentile(latencies, 0.99) * 1e6:.1f}us, "
+          f"max {max(latencies) * 1e6:.1f}us, {found}/{len(latencies)} matched")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=1000000)
+    arg_parser.add_argument('--lookups', type=int, default=100000)
+    args = arg_parser.parse_args()
+    random.seed(42)
+    
+    texts = [f"Project{i % 500} airdrop is live! Claim $TOK{i % 97} at https://project{i % 500}.xyz "
+             f"before Oct {i % 28 + 1}. Steps: follow @project{i % 500}, retweet and tag {i % 7} friends "
+             f"to qualify" for i in range(10000)]
+    for name, function in (('minhash', minhash), ('entity_keys', entity_keys)):
+        start = time.perf_counter()
+        for text in texts:
+            function(text)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {len(texts) / elapsed:,.0f} tweets/s ({elapsed / len(texts) * 1e6:.1f}us each)")
+    
+    index = NearDuplicateIndex()
+    start = time.perf_counter()
+    for i in range(args.count):
+        index.add_signature(str(i), random_signature(), random_entities())
+    elapsed = time.perf_counter() - start
+    print(f"insert: {args.count:,} signatures in {elapsed:.1f}s ({args.count / elapsed:,.0f}/s), "
+          f"{index.stats['new_clusters']:,} clusters")
+    
+    # Up to 4 of 24 values changed is an estimated Jaccard similarity of 0.83 or more
+    positions = [random.randrange(len(index)) for _ in range(args.lookups)]
+    report('near-duplicate', *time_lookups(
+        index, [reworded(index, position, random.randint(0, 4)) for position in positions]))
+    report('unseen', *time_lookups(index, [(random_signature(), random_entities())
+                                           for _ in range(args.lookups)]))
+    
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"peak RSS: {rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024:.0f} MB")
+
+if __name__ == '__main__':
+    main()
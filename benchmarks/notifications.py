@@ -0,0 +1,146 @@
+"""Throughput and latency of notification delivery against local fake servers.
+
+"before" is NotificationManager.notify as it was before the outbox:
+email sent with blocking smtplib on the event loop, then one Telegram
+message per opportunity, serially, stopping at the first failure.
+"after" queues the same opportunities in the Outbox and drains it: email
+in a worker thread, Telegram as digests sent concurrently under the rate
+limit, and failed sends retried with backoff. Both runs share the fake
+servers' latency and rate limiting. "loop lag" is the longest the event
+loop went without running another task.
+
+    python -m benchmarks.notifications [--count 200] [--telegram-latency 0.05]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from models import NotificationDelivery, OpportunityRecord, bulk_save, init_db
+from notifications import EmailNotifier, NotificationManager, TelegramNotifier
+from outbox import Outbox
+from benchmarks.fake_notifications import FakeSMTPServer, FakeTelegramServer
+
+RECIPIENT = 'recipient@example.com'
+
+def synthetic(count: int):
+    return [OpportunityRecord(
+        tweet_id=str(i),
+        project_name=f"Project {i}",
+        token_symbol=f"TOK{i % 97}",
+        description=f"Project {i} testnet is live, claim points for the airdrop. " * 3,
+        participation_steps='follow, retweet and bridge to the testnet',
+        tweet_url=f"https://twitter.com/i/web/status/{i}",
+        confidence_score=85.0
+    ) for i in range(count)]
+
+async def watch_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+def make_manager(smtp: FakeSMTPServer, telegram_server: FakeTelegramServer, pool_size: int):
+    email = EmailNotifier('127.0.0.1', smtp.port, 'user', 'password', keep_alive=True, starttls=False)
+    telegram = TelegramNotifier('123:fake', '1', connection_pool_size=pool_size,
+                                messages_per_minute=600, base_url=telegram_server.base_url)
+    return NotificationManager(email_notifier=email, telegram_notifier=telegram, min_confidence=80.0)
+
+async def reference_notify(manager: NotificationManager, opportunities, started: float):
+    latencies = []
+    manager.email_notifier.send_notification(RECIPIENT, opportunities)
+    try:
+        for opp in opportunities:
+            await manager.telegram_notifier.bot.send_message(
+                chat_id=manager.telegram_notifier.chat_id,
+                text=manager.telegram_notifier.format_opportunity(opp),
+                parse_mode='Markdown',
+                disable_web_page_preview=True
+            )
+            latencies.append(time.perf_counter() - started)
+    except Exception as e:
+        print(f"  before: stopped at the first failure: {e}")
+    return latencies
+
+async def run_before(args, smtp, telegram_server):
+    manager = make_manager(smtp, telegram_server, pool_size=1)
+    await manager.telegram_notifier.initialize()
+    stop = asyncio.Event()
+    lag = asyncio.create_task(watch_loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    latencies = await reference_notify(manager, synthetic(args.count), started)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await manager.close()
+    return elapsed, len(latencies), latencies, await lag
+
+async def run_after(args, smtp, telegram_server):
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    bulk_save(session, [], synthetic(args.count))
+    session.commit()
+    
+    manager = make_manager(smtp, telegram_server, pool_size=args.concurrency)
+    await manager.telegram_notifier.initialize()
+    outbox = Outbox(manager, RECIPIENT, backoff_seconds=0.2)
+    stop = asyncio.Event()
+    lag = asyncio.create_task(watch_loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    outbox.enqueue(session)
+    session.commit()
+    await outbox.drain(session, timeout=60)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await manager.close()
+    telegram_sent = session.query(NotificationDelivery).filter_by(channel='telegram', status='sent').count()
+    session.close()
+    return elapsed, (outbox, telegram_sent), list(outbox.latencies), await lag
+
+def percentiles(latencies):
+    if not latencies:
+        return 'n/a'
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50 {statistics.median(ordered):.2f}s, p95 {p95:.2f}s"
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=200)
+    arg_parser.add_argument('--smtp-latency', type=float, default=0.2)
+    arg_parser.add_argument('--telegram-latency', type=float, default=0.05)
+    arg_parser.add_argument('--rate-limit-every', type=int, default=10,
+                            help='answer every Nth sendMessage with a 429')
+    arg_parser.add_argument('--concurrency', type=int, default=4, help='Telegram sends in flight')
+    args = arg_parser.parse_args()
+    
+    rate_limited = f"every {args.rate_limit_every}th send" if args.rate_limit_every else 'no sends'
+    print(f"{args.count} opportunities, SMTP latency {args.smtp_latency}s, "
+          f"Telegram latency {args.telegram_latency}s, {rate_limited} rate limited")
+    
+    for name, run in (('before', run_before), ('after', run_after)):
+        smtp = FakeSMTPServer(latency=args.smtp_latency).start()
+        telegram_server = FakeTelegramServer(latency=args.telegram_latency,
+                                             rate_limit_every=args.rate_limit_every).start()
+        try:
+            elapsed, outcome, latencies, lag = asyncio.run(run(args, smtp, telegram_server))
+        finally:
+            smtp.stop()
+            telegram_server.stop()
+        if name == 'before':
+            telegram_sent, retries = outcome, 0
+        else:
+            outbox, telegram_sent = outcome
+            retries = outbox.stats['retried']
+        print(f"{name:>7}: {elapsed:.2f}s, {telegram_sent} of {args.count} on Telegram in "
+              f"{len(telegram_server.messages)} messages ({telegram_server.rate_limited} rate limited, "
+              f"{retries} retries), {len(smtp.messages)} emails")
+        print(f"         latency {percentiles(latencies)}, {telegram_sent / elapsed:,.0f} "
+              f"opportunities/sec on Telegram, loop lag {lag * 1000:.0f}ms")
+
+if __name__ == '__main__':
+    main()
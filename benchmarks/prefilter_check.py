@@ -0,0 +1,66 @@
+"""Check that PreFilter never drops a tweet the full extraction path notifies on.
+
+Run from the repository root:
+
+    python -m benchmarks.prefilter_check [corpus.jsonl]
+"""
+import json
+import os
+import sys
+import time
+from typing import List
+
+from models import TweetRecord
+from extract_info import PreFilter, extract_airdrop_info
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), 'prefilter_corpus.jsonl')
+THRESHOLDS = [0.0, 20.0, 35.0, 50.0, 70.0, 80.0]
+
+def load_corpus(path: str) -> List[TweetRecord]:
+    """Load a JSONL corpus of tweet_id/author_id/processed_text records."""
+    tweets = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                tweets.append(TweetRecord(
+                    tweet_id=record['tweet_id'],
+                    author_id=record.get('author_id', '0'),
+                    processed_text=record['processed_text']
+                ))
+    return tweets
+
+def main(path: str) -> int:
+    tweets = load_corpus(path)
+    
+    # Full path scores, computed once
+    start = time.perf_counter()
+    scores = {}
+    for tweet in tweets:
+        opportunity = extract_airdrop_info(tweet)
+        scores[tweet.tweet_id] = opportunity.confidence_score if opportunity else None
+    full_elapsed = time.perf_counter() - start
+    
+    violations = 0
+    for threshold in THRESHOLDS:
+        prefilter = PreFilter(min_confidence=threshold)
+        start = time.perf_counter()
+        passed = {tweet.tweet_id for tweet in prefilter.filter(tweets)}
+        elapsed = time.perf_counter() - start
+        
+        for tweet in tweets:
+            score = scores[tweet.tweet_id]
+            if score is not None and score >= threshold and tweet.tweet_id not in passed:
+                violations += 1
+                print(f"  DROPPED {tweet.tweet_id} (score {score}): {tweet.processed_text!r}")
+        
+        print(f"min_confidence={threshold:>5}: {prefilter.stats} "
+              f"in {elapsed * 1000:.2f}ms")
+    
+    print(f"Full extraction: {len(tweets)} tweets in {full_elapsed * 1000:.2f}ms")
+    print("OK: no notifiable tweet was dropped" if not violations
+          else f"FAIL: {violations} notifiable tweets dropped")
+    return 1 if violations else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS))
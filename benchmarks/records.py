@@ -0,0 +1,110 @@
+"""Memory, allocations and time per tweet of pipeline records, before and after.
+
+"before" builds a ProcessedTweet per tweet and an AirdropOpportunity per
+announcement, as filter_tweets and extraction used to; "after" builds
+TweetRecord and OpportunityRecord. Field values come from a synthetic
+corpus and are prepared up front and shared by both modes, so the
+numbers are the cost of the objects themselves: retained bytes and
+memory blocks per object (tracemalloc), time to create them, time to
+read every field once (as scoring and merging do), and pickled bytes,
+which is what a shard worker sends to the coordinator.
+
+    python -m benchmarks.records [--count 200000]
+"""
+import argparse
+import gc
+import pickle
+import time
+import tracemalloc
+from datetime import datetime
+
+from models import AirdropOpportunity, OpportunityRecord, ProcessedTweet, TweetRecord
+from fetch_tweets import preprocess_tweet_text
+from benchmarks.synthetic_corpus import generate
+
+TWEET_FIELDS = ['tweet_id', 'author_id', 'author_username', 'text', 'processed_text', 'created_at',
+                'is_retweet', 'is_reply']
+OPPORTUNITY_FIELDS = ['tweet_id', 'project_name', 'token_symbol', 'description', 'deadline',
+                      'participation_steps', 'tweet_url', 'confidence_score']
+
+def corpus_fields(count: int, seed: int):
+    """Keyword arguments for every tweet, and for an opportunity from every announcement."""
+    tweets, opportunities = [], []
+    now = datetime.utcnow()
+    for status in generate(count, seed=seed):
+        tweet_id = status['id_str']
+        text = status['full_text']
+        tweets.append({
+            'tweet_id': tweet_id,
+            'author_id': status['user']['id_str'],
+            'author_username': status['user']['screen_name'],
+            'text': text,
+            'processed_text': preprocess_tweet_text(text),
+            'created_at': datetime.strptime(status['created_at'], '%a %b %d %H:%M:%S +0000 %Y'),
+            'is_retweet': False,
+            'is_reply': False,
+        })
+        if 'airdrop' in text.lower() or 'testnet' in text.lower():
+            words = text.split()
+            opportunities.append({
+                'tweet_id': tweet_id,
+                'project_name': words[0],
+                'token_symbol': words[1].upper()[:5],
+                'description': text[:200],
+                'deadline': now,
+                'participation_steps': text[-80:],
+                'tweet_url': f"https://twitter.com/i/web/status/{tweet_id}",
+                'confidence_score': 75.0,
+            })
+    return tweets, opportunities
+
+def measure(factory, fields, arguments):
+    gc.collect()
+    start = time.perf_counter()
+    objects = [factory(**kwargs) for kwargs in arguments]
+    create_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for obj in objects:
+        for field in fields:
+            getattr(obj, field)
+    read_seconds = time.perf_counter() - start
+    pickled = len(pickle.dumps(objects[:10000], protocol=pickle.HIGHEST_PROTOCOL))
+    del objects
+    
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(**kwargs) for kwargs in arguments]
+    retained = tracemalloc.take_snapshot().statistics('filename')
+    tracemalloc.stop()
+    count = len(objects)
+    return {
+        'bytes': sum(stat.size for stat in retained) / count,
+        'blocks': sum(stat.count for stat in retained) / count,
+        'create_us': create_seconds / count * 1e6,
+        'read_us': read_seconds / count * 1e6,
+        'pickled': pickled / min(count, 10000),
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=200000)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    args = arg_parser.parse_args()
+    
+    start = time.perf_counter()
+    tweets, opportunities = corpus_fields(args.count, args.seed)
+    print(f"Prepared {len(tweets)} tweets and {len(opportunities)} opportunities "
+          f"in {time.perf_counter() - start:.1f}s")
+    
+    for kind, fields, arguments, before, after in (
+            ('tweet', TWEET_FIELDS, tweets, ProcessedTweet, TweetRecord),
+            ('opportunity', OPPORTUNITY_FIELDS, opportunities, AirdropOpportunity, OpportunityRecord)):
+        for mode, factory in (('before', before), ('after', after)):
+            result = measure(factory, fields, arguments)
+            print(f"{kind:>11} {mode:>6} ({factory.__name__}): {result['bytes']:>6.0f} bytes, "
+                  f"{result['blocks']:>4.1f} blocks, create {result['create_us']:>5.2f}us, "
+                  f"read {result['read_us']:>5.2f}us, pickled {result['pickled']:>5.0f} bytes per object")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""End-to-end throughput, latency and memory of the monitor on a tweet corpus.
+
+Replays a corpus (a synthetic one from benchmarks.synthetic_corpus
+unless --corpus is given) into a fresh SQLite database file, through
+filter_tweets, the pre-filter, extraction, persistence and the outbox
+with stub notifiers, and prints replay.ReplayReport. With the same seed
+and count the corpus is the same every time, so runs before and after a
+change are comparable.
+
+The default weights top out at 70, so the threshold defaults to 50
+here; at the monitor's 80 the pre-filter would reject every tweet and
+extraction would not be measured at all. --blank-model swaps the spaCy
+model for a blank English pipeline, which measures everything except
+the model itself (and finds no project names).
+
+    python -m benchmarks.replay [--count 10000] [--trace-memory] [--blank-model]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+import extract_info
+from models import init_db
+from replay import REPLAY_CHUNK_SIZE, build_replay, read_corpus
+from benchmarks.synthetic_corpus import write_corpus
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=10000)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--corpus', help='replay this JSONL file instead of a synthetic corpus')
+    arg_parser.add_argument('--chunk-size', type=int, default=REPLAY_CHUNK_SIZE)
+    arg_parser.add_argument('--min-confidence', type=float, default=50.0)
+    arg_parser.add_argument('--near-duplicates', action='store_true')
+    arg_parser.add_argument('--no-cache', action='store_true', help='disable the extraction cache')
+    arg_parser.add_argument('--trace-memory', action='store_true')
+    arg_parser.add_argument('--blank-model', action='store_true')
+    args = arg_parser.parse_args()
+    
+    if args.blank_model:
+        import spacy
+        extract_info._nlp = spacy.blank('en')
+        extract_info._nlp.add_pipe('sentencizer')
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = os.path.join(workdir, 'corpus.jsonl')
+            start = time.perf_counter()
+            write_corpus(corpus, args.count, seed=args.seed)
+            print(f"Generated {args.count} tweets in {time.perf_counter() - start:.2f}s")
+        
+        engine = init_db(f"sqlite:///{os.path.join(workdir, 'replay.db')}")
+        session = sessionmaker(bind=engine)()
+        try:
+            replay = build_replay(
+                session,
+                stub_notifiers=True,
+                min_confidence=args.min_confidence,
+                near_duplicate_clustering=args.near_duplicates,
+                cache_size=0 if args.no_cache else 50000,
+                trace_memory=args.trace_memory
+            )
+            report = asyncio.run(replay.run(read_corpus(corpus, args.chunk_size)))
+            print(report.summary())
+            print(f"  outbox: {replay.outbox.stats}")
+        finally:
+            session.close()
+            engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Throughput of confidence scoring: per opportunity in Python vs ScoringEngine batches.
+
+"before" is the original hard-coded calculate_confidence_score, one
+opportunity at a time. "after" builds the feature matrix for a batch and
+scores it with one matrix-vector product; its time is split into
+building the matrix and the product itself. The last line times
+rescore_opportunities over a temporary SQLite database.
+
+    python -m benchmarks.scoring [--count 100000] [--batch 64]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from models import OpportunityRecord, TweetRecord, TwitterAccount, bulk_save, init_db
+from scoring import FEATURES, ScoringEngine, rescore_opportunities
+
+SPAM_KEYWORDS = ['fake', 'scam', 'hurry', '100x', 'guaranteed']
+WORDS = ['airdrop', 'testnet', 'claim', 'gm', 'follow', 'retweet', 'hurry', 'scam', 'wallet', 'points']
+
+def reference_score(tweet: TweetRecord, opportunity: OpportunityRecord) -> float:
+    score = 0.0
+    if opportunity.project_name:
+        score += 20
+    if opportunity.token_symbol:
+        score += 20
+    if opportunity.deadline:
+        score += 15
+    if opportunity.participation_steps:
+        score += 15
+    spam_count = sum(1 for keyword in SPAM_KEYWORDS if keyword in tweet.processed_text.lower())
+    score -= spam_count * 5
+    return max(0, min(100, score))
+
+def synthetic(count: int):
+    random.seed(16)
+    now = datetime.utcnow()
+    tweets, opportunities = [], []
+    for i in range(count):
+        text = ' '.join(random.choice(WORDS) for _ in range(20))
+        tweets.append(TweetRecord(
+            tweet_id=str(i), author_id=str(i % 500), author_username=f"user{i % 500}",
+            text=text, processed_text=text, created_at=now - timedelta(minutes=i % 5000)
+        ))
+        opportunities.append(OpportunityRecord(
+            tweet_id=str(i),
+            project_name=f"project{i % 300}" if i % 4 else None,
+            token_symbol=f"TOK{i % 97}" if i % 3 else None,
+            deadline=now + timedelta(days=3) if i % 2 else None,
+            participation_steps='follow and retweet' if i % 5 else None,
+            cluster_size=1 + i % 40,
+            tweet_url=f"https://twitter.com/i/web/status/{i}"
+        ))
+    return tweets, opportunities
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=100000)
+    arg_parser.add_argument('--batch', type=int, default=64, help='opportunities per extraction batch')
+    args = arg_parser.parse_args()
+    
+    tweets, opportunities = synthetic(args.count)
+    tweets_by_id = {tweet.tweet_id: tweet for tweet in tweets}
+    trusted = {f"user{i}" for i in range(0, 500, 7)}
+    engine = ScoringEngine({'trusted_author': 10.0, 'cluster_size': 2.0, 'age_hours': -0.1})
+    
+    start = time.perf_counter()
+    for tweet, opportunity in zip(tweets, opportunities):
+        reference_score(tweet, opportunity)
+    before = time.perf_counter() - start
+    
+    build = product = 0.0
+    for offset in range(0, args.count, args.batch):
+        chunk = opportunities[offset:offset + args.batch]
+        start = time.perf_counter()
+        matrix = engine.feature_matrix(chunk, tweets_by_id, trusted)
+        build += time.perf_counter() - start
+        start = time.perf_counter()
+        engine.score_matrix(matrix)
+        product += time.perf_counter() - start
+    
+    print(f"{args.count} opportunities, batches of {args.batch}")
+    print(f"  before: {before / args.count * 1e6:.2f}us per opportunity (4 features)")
+    print(f"   after: {(build + product) / args.count * 1e6:.2f}us per opportunity ({len(FEATURES)} features), "
+          f"of which {product / args.count * 1e6:.2f}us is the matrix product")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        db = init_db(f"sqlite:///{os.path.join(directory, 'scoring.db')}")
+        session = sessionmaker(bind=db)()
+        session.add_all(TwitterAccount(username=username, is_trusted=True) for username in trusted)
+        engine_defaults = ScoringEngine()
+        engine_defaults.score_opportunities(opportunities, tweets)
+        bulk_save(session, tweets, opportunities)
+        session.commit()
+        start = time.perf_counter()
+        changed = rescore_opportunities(session, engine)
+        session.commit()
+        elapsed = time.perf_counter() - start
+        print(f" rescore: {changed} of {args.count} scores changed in {elapsed:.2f}s "
+              f"({args.count / elapsed:,.0f} opportunities/sec)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Throughput of sharded cycles from 1 to N worker processes.
+
+Every run uses a fresh SQLite file with --accounts trusted accounts and
+the default search queries, served by a local FakeTwitterServer whose
+tweets come from a synthetic corpus. One cycle is timed per worker
+count, after the workers have loaded the model. Workers fetch, filter
+and extract in parallel, and the coordinator is the only process that
+writes. The speedup therefore levels off as the coordinator's share of
+the cycle spent writing approaches 100%. With --blank-model extraction
+is cheap and that happens at once; the speedup shows with the model.
+
+With the most workers, one worker is then killed. The next cycle shows
+its sources being handed to the rest, and the cycle after that shows
+them moving to its replacement.
+
+    python -m benchmarks.sharding [--workers 4] [--accounts 200] [--blank-model]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from models import init_db, TwitterAccount
+from metrics import METRICS
+from notifications import NotificationManager
+from outbox import Outbox
+from sharding import IngestWriter, ShardCoordinator, WorkerConfig
+from benchmarks.fake_twitter import FakeTwitterServer
+from benchmarks.synthetic_corpus import generate
+
+def serve(args, base_url):
+    """Run the fake API in its own process, so it does not compete with the coordinator for the GIL."""
+    texts = (status['full_text'] for status in generate(10 ** 8, seed=args.seed))
+    server = FakeTwitterServer(latency=args.latency, tweets_per_page=args.tweets_per_page, texts=texts).start()
+    base_url.put(server.base_url)
+    server.thread.join()
+
+def persist_seconds() -> float:
+    return sum(timer[1] for (name, labels), timer in METRICS.timers.items()
+               if name == 'airdrop_stage_seconds' and dict(labels)['stage'] == 'persist')
+
+async def timed_cycle(coordinator: ShardCoordinator, Session):
+    session = Session()
+    try:
+        writer = IngestWriter(session, Outbox(NotificationManager(), min_confidence=50.0))
+        start = time.perf_counter()
+        persisted = persist_seconds()
+        stats = await coordinator.run_cycle(writer)
+        return time.perf_counter() - start, persist_seconds() - persisted, stats
+    finally:
+        session.close()
+
+def run(args, workers: int, workdir: str, kill: bool):
+    engine = init_db(f"sqlite:///{os.path.join(workdir, f'shards-{workers}.db')}")
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add_all(TwitterAccount(username=f'account{i}', is_trusted=True) for i in range(args.accounts))
+    session.commit()
+    session.close()
+    
+    context = multiprocessing.get_context('spawn')
+    base_url = context.Queue()
+    server = context.Process(target=serve, args=(args, base_url), daemon=True)
+    server.start()
+    coordinator = ShardCoordinator(WorkerConfig(
+        engine.url.render_as_string(hide_password=False), ('key', 'secret', 'token', 'token_secret'),
+        twitter_base_url=base_url.get(timeout=60), fetch_concurrency=args.fetch_concurrency,
+        min_confidence=50.0, blank_model=args.blank_model
+    ), workers)
+    try:
+        start = time.perf_counter()
+        coordinator.start()
+        ready = time.perf_counter() - start
+        elapsed, persisted, stats = asyncio.run(timed_cycle(coordinator, Session))
+        result = (elapsed, persisted, stats['tweets'], ready)
+        if kill:
+            victim = sorted(coordinator.ring.nodes)[0]
+            coordinator.workers[victim].process.kill()
+            coordinator.workers[victim].process.join()
+            for label in ('after kill', 'with replacement'):
+                if label == 'with replacement':
+                    for handle in coordinator.workers.values():
+                        handle.ready.wait(60)
+                moved, reassigned = coordinator.stats['moved'], coordinator.stats['reassigned']
+                elapsed, _, stats = asyncio.run(timed_cycle(coordinator, Session))
+                print(f"  {label:>16}: {len(coordinator.ring)} workers on the ring, "
+                      f"{coordinator.stats['moved'] - moved} sources moved, "
+                      f"{coordinator.stats['reassigned'] - reassigned} reassigned mid-cycle, "
+                      f"{coordinator.stats['timed_out']} timed out, {elapsed:.2f}s")
+        return result
+    finally:
+        coordinator.stop()
+        server.terminate()
+        engine.dispose()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--workers', type=int, default=4)
+    arg_parser.add_argument('--accounts', type=int, default=200)
+    arg_parser.add_argument('--tweets-per-page', type=int, default=100)
+    arg_parser.add_argument('--latency', type=float, default=0.05)
+    arg_parser.add_argument('--fetch-concurrency', type=int, default=8)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--blank-model', action='store_true',
+                            help='blank spaCy pipeline instead of the model')
+    args = arg_parser.parse_args()
+    
+    baseline = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in range(1, args.workers + 1):
+            elapsed, persisted, tweets, ready = run(args, workers, workdir, kill=workers == args.workers and workers > 1)
+            rate = tweets / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>2} workers: {tweets} tweets in {elapsed:.2f}s, {rate:,.0f} tweets/sec, "
+                  f"{rate / baseline:.2f}x, coordinator writing {persisted / elapsed:.0%} of the cycle "
+                  f"(ready in {ready:.1f}s)")
+
+if __name__ == '__main__':
+    main()
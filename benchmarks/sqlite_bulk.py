@@ -0,0 +1,99 @@
+"""Insert and dedup throughput of the SQLite storage layer, before and after tuning.
+
+"before" uses a default SQLite engine, session.add per ORM object and
+one SELECT per tweet for dedup, as the monitor used to. "after" uses
+init_db's WAL/cache/mmap settings, bulk_save of plain records and
+chunked IN lookups.
+
+    python -m benchmarks.sqlite_bulk [--count 1000000] [--lookups 50000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import (Base, ProcessedTweet, AirdropOpportunity, OpportunityRecord, TweetRecord, init_db,
+                    bulk_save)
+from fetch_tweets import find_processed_ids
+
+# Tweets per commit, roughly one monitor cycle
+CYCLE_SIZE = 1400
+
+def synthetic_cycle(start: int, size: int, orm: bool = False):
+    if orm:
+        tweet_class, opportunity_class = ProcessedTweet, AirdropOpportunity
+    else:
+        tweet_class, opportunity_class = TweetRecord, OpportunityRecord
+    tweets, opportunities = [], []
+    now = datetime.utcnow()
+    for tweet_id in range(start, start + size):
+        text = f"project{tweet_id % 5000} airdrop! claim $TOK{tweet_id % 97} token. deadline: oct 20"
+        tweets.append(tweet_class(
+            tweet_id=str(tweet_id), author_id=str(tweet_id % 20000),
+            text=text, processed_text=text.lower(), created_at=now
+        ))
+        if tweet_id % 10 == 0:
+            opportunities.append(opportunity_class(
+                tweet_id=str(tweet_id), project_name=f"project{tweet_id % 5000}",
+                token_symbol=f"TOK{tweet_id % 97}", confidence_score=float(tweet_id % 100),
+                tweet_url=f"https://twitter.com/i/web/status/{tweet_id}"
+            ))
+    return tweets, opportunities
+
+def run(mode: str, path: str, count: int, lookups: int):
+    if mode == 'before':
+        engine = create_engine(f'sqlite:///{path}')
+        Base.metadata.create_all(engine)
+    else:
+        engine = init_db(f'sqlite:///{path}')
+    session = sessionmaker(bind=engine)()
+    
+    start = time.perf_counter()
+    for offset in range(0, count, CYCLE_SIZE):
+        tweets, opportunities = synthetic_cycle(offset, min(CYCLE_SIZE, count - offset), orm=mode == 'before')
+        if mode == 'before':
+            session.add_all(tweets)
+            session.add_all(opportunities)
+        else:
+            bulk_save(session, tweets, opportunities)
+        session.commit()
+        session.expunge_all()
+    insert_elapsed = time.perf_counter() - start
+    
+    # Half of the looked-up IDs exist, half are new
+    ids = [str(tweet_id) for tweet_id in random.sample(range(count), min(count, lookups // 2))]
+    ids += [str(count + i) for i in range(lookups - len(ids))]
+    random.shuffle(ids)
+    
+    start = time.perf_counter()
+    if mode == 'before':
+        found = sum(1 for tweet_id in ids
+                    if session.query(ProcessedTweet).filter_by(tweet_id=tweet_id).first())
+    else:
+        found = len(find_processed_ids(ids, session))
+    dedup_elapsed = time.perf_counter() - start
+    
+    session.close()
+    engine.dispose()
+    print(f"{mode:>6}: insert {count / insert_elapsed:>10,.0f} tweets/s ({insert_elapsed:.1f}s), "
+          f"dedup {lookups / dedup_elapsed:>10,.0f} lookups/s ({dedup_elapsed:.2f}s, {found} found)")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=1000000)
+    arg_parser.add_argument('--lookups', type=int, default=50000)
+    arg_parser.add_argument('--mode', choices=['before', 'after', 'both'], default='both')
+    args = arg_parser.parse_args()
+    
+    modes = ['before', 'after'] if args.mode == 'both' else [args.mode]
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as workdir:
+            run(mode, os.path.join(workdir, 'bench.db'), args.count, args.lookups)
+
+if __name__ == '__main__':
+    main()
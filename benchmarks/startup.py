@@ -0,0 +1,84 @@
+"""Measure cold start time and peak memory of the monitor.
+
+Each run starts a fresh interpreter in an empty directory, imports main
+and runs its startup (database and accounts) up to the point where the
+first cycle would be scheduled. With --with-model it also loads the spaCy
+model, as the first cycle with tweets to extract would.
+
+    python -m benchmarks.startup [--runs 5] [--max-seconds 2] [--max-rss-mb 150]
+
+Exits non-zero when a limit is exceeded, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.initialize()
+ready = time.perf_counter()
+result = {'import': imported - start, 'ready': ready - start}
+if sys.argv[1] == 'model':
+    from extract_info import get_nlp
+    get_nlp()
+    result['model'] = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+result['peak_rss_mb'] = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+print(json.dumps(result))
+'''
+
+def run_once(with_model: bool) -> dict:
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD, 'model' if with_model else 'plain'],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['process'] = time.perf_counter() - start
+    return result
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--runs', type=int, default=5)
+    arg_parser.add_argument('--with-model', action='store_true',
+                            help='also load the spaCy model after startup')
+    arg_parser.add_argument('--max-seconds', type=float,
+                            help='fail if median cold start to ready exceeds this')
+    arg_parser.add_argument('--max-rss-mb', type=float,
+                            help='fail if peak RSS exceeds this')
+    args = arg_parser.parse_args()
+    
+    runs = [run_once(args.with_model) for _ in range(args.runs)]
+    keys = ['import', 'ready', 'model', 'process']
+    for key in keys:
+        values = [run[key] for run in runs if key in run]
+        if values:
+            print(f"{key:>8}: median {statistics.median(values):.3f}s, "
+                  f"max {max(values):.3f}s")
+    peak_rss = max(run['peak_rss_mb'] for run in runs)
+    print(f"peak RSS: {peak_rss:.1f} MB")
+    
+    failed = False
+    cold_start = statistics.median(run['process'] for run in runs)
+    if args.max_seconds is not None and cold_start > args.max_seconds:
+        print(f"FAIL: cold start {cold_start:.3f}s exceeds {args.max_seconds}s")
+        failed = True
+    if args.max_rss_mb is not None and peak_rss > args.max_rss_mb:
+        print(f"FAIL: peak RSS {peak_rss:.1f} MB exceeds {args.max_rss_mb} MB")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
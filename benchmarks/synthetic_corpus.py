@@ -0,0 +1,161 @@
+"""Write a synthetic JSONL tweet corpus for replay.py.
+
+Each line is a Twitter v1.1 status object, as the timeline and search
+endpoints return them, so recorded API responses and synthetic tweets
+replay the same way. The mix is airdrop and testnet announcements,
+spam, and ordinary crypto chatter, posted by a pool of authors of whom
+a few mostly post spam. Announcements are often reposted: some with the
+exact same text (extraction cache hits), some reworded a little
+(near-duplicates), and some tweets show up twice, as they do when they
+match several searches.
+
+    python -m benchmarks.synthetic_corpus corpus.jsonl [--count 100000] [--seed 1]
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator
+
+PROJECTS = [
+    'LayerZero', 'zkSync', 'Starknet', 'Scroll', 'Linea', 'Taiko', 'Berachain', 'Monad',
+    'Celestia', 'EigenLayer', 'Blast', 'Manta', 'Fuel', 'Aztec', 'Movement', 'Eclipse',
+    'Hyperlane', 'Wormhole', 'Jupiter', 'Kamino', 'Zeta', 'Parcl', 'Tensor', 'Drift',
+]
+DEXES = ['SyncSwap', 'Uniswap', 'Orca', 'Velodrome', 'Ambient', 'Kodiak']
+DEADLINES = [
+    'October 20', 'Oct 31 2026', 'Nov 15', 'December 1st', '2026-11-30', '12/15/2026',
+    'in 3 days', 'in 2 weeks', 'tomorrow', 'next Friday', 'end of the month',
+]
+TRUSTED_AUTHORS = ['AirdropAlert', 'CryptoAirdrops', 'TestnetAnnounce']
+
+ANNOUNCEMENTS = [
+    "{project} airdrop is live! Claim ${token} until {deadline}. Steps: follow @{handle}, "
+    "retweet and join the Discord {url} #airdrop",
+    "🚀 {project} testnet is open. How to participate: 1. bridge ETH 2. swap on {dex} "
+    "3. collect points. Ends {deadline}. #testnet",
+    "${token} token distribution for early {project} users. Check eligibility at {url}, "
+    "closes on {deadline}. #airdrop #{project}",
+    "Don't miss the {project} ${token} airdrop 🪂 Snapshot on {deadline}. To participate: "
+    "connect your wallet and complete the tasks at {url}",
+    "{project} devnet launch today. Run a node, submit feedback and qualify for the "
+    "${token} airdrop. Deadline: {deadline}. {url}",
+]
+SPAM = [
+    "🎁 FREE $ETH giveaway! Send 0.1 ETH and get 1 ETH back, guaranteed. Hurry, DM me {url}",
+    "100x gem 🚀 ${token} presale is live, guaranteed profit, hurry before it's gone {url}",
+    "{project} airdrop claim is open!!! connect wallet to claim ${token} {url} hurry 100x",
+    "Giveaway time 🎉 like, RT & follow, 5 winners in 24h. Not a scam {url}",
+]
+CHATTER = [
+    "gm frens, market looking {mood} today",
+    "{project} just shipped v{version} of their SDK, docs at {url}",
+    "What do you think about ${token}? {mood} or not?",
+    "Bridging to {project} took 3 minutes today, fees were fine",
+    "Thread on how {project} sequencers work 🧵 {url}",
+]
+MOODS = ['bullish', 'bearish', 'choppy', 'wild', 'sleepy']
+DECORATIONS = [' 🔥', ' 🔥🔥', ' #crypto', ' #DeFi', ' (RT please)', ' 👇', ' NFA']
+
+def _url(rng: random.Random) -> str:
+    return f"https://t.co/{rng.getrandbits(40):010x}"
+
+def _fill(rng: random.Random, template: str) -> str:
+    project = rng.choice(PROJECTS)
+    return template.format(
+        project=project, handle=project.lower(), token=project[:3].upper() + rng.choice(['', 'X', 'T']),
+        deadline=rng.choice(DEADLINES), dex=rng.choice(DEXES), url=_url(rng),
+        mood=rng.choice(MOODS), version=f"{rng.randint(0, 3)}.{rng.randint(0, 20)}"
+    )
+
+def _reworded(rng: random.Random, text: str) -> str:
+    """A repost with a new link and an emoji or hashtag added."""
+    words = text.split(' ')
+    words = [_url(rng) if word.startswith('https://t.co/') else word for word in words]
+    return ' '.join(words) + rng.choice(DECORATIONS)
+
+def generate(count: int, seed: int = 1, authors: int = 2000, airdrop_share: float = 0.3,
+             spam_share: float = 0.2, repost_share: float = 0.3, repeat_share: float = 0.05,
+             days: float = 3.0) -> Iterator[Dict]:
+    """Yield count status objects, newest last, created over the last days."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    spammers = set(rng.sample(range(authors), max(1, authors // 20)))
+    recent_announcements = []
+    recent_statuses = []
+    next_id = 1_700_000_000_000_000_000
+    
+    for i in range(count):
+        if recent_statuses and rng.random() < repeat_share:
+            # The same tweet again, as returned by another search
+            yield rng.choice(recent_statuses)
+            continue
+        
+        author = rng.randrange(authors)
+        kind = rng.random()
+        if author in spammers or kind < spam_share:
+            text = _fill(rng, rng.choice(SPAM))
+        elif kind < spam_share + airdrop_share:
+            if recent_announcements and rng.random() < repost_share:
+                original = rng.choice(recent_announcements)
+                text = original if rng.random() < 0.5 else _reworded(rng, original)
+            else:
+                text = _fill(rng, rng.choice(ANNOUNCEMENTS))
+                recent_announcements.append(text)
+                if len(recent_announcements) > 500:
+                    recent_announcements.pop(0)
+        else:
+            text = _fill(rng, rng.choice(CHATTER))
+        
+        if rng.random() < 0.02:
+            screen_name = rng.choice(TRUSTED_AUTHORS)
+            author_id = TRUSTED_AUTHORS.index(screen_name) + 1
+        else:
+            screen_name = f"user{author}"
+            author_id = 1000 + author
+        next_id += rng.randint(1, 1000)
+        created_at = now - timedelta(days=days) * (1 - i / count)
+        status = {
+            'id': next_id,
+            'id_str': str(next_id),
+            'full_text': text,
+            'created_at': created_at.strftime('%a %b %d %H:%M:%S +0000 %Y'),
+            'user': {'id': author_id, 'id_str': str(author_id), 'screen_name': screen_name},
+            'in_reply_to_status_id': None,
+        }
+        recent_statuses.append(status)
+        if len(recent_statuses) > 1000:
+            recent_statuses.pop(0)
+        yield status
+
+def write_corpus(path: str, count: int, seed: int = 1, **options) -> int:
+    """Write generate() to a JSONL file; returns the number of lines."""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for status in generate(count, seed=seed, **options):
+            f.write(json.dumps(status, ensure_ascii=False))
+            f.write('\n')
+            written += 1
+    return written
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('path')
+    arg_parser.add_argument('--count', type=int, default=100000)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--authors', type=int, default=2000)
+    arg_parser.add_argument('--airdrop-share', type=float, default=0.3)
+    arg_parser.add_argument('--spam-share', type=float, default=0.2)
+    arg_parser.add_argument('--repost-share', type=float, default=0.3,
+                            help='share of announcements that repost an earlier one')
+    arg_parser.add_argument('--repeat-share', type=float, default=0.05,
+                            help='share of tweets that are returned a second time')
+    args = arg_parser.parse_args()
+    
+    written = write_corpus(args.path, args.count, seed=args.seed, authors=args.authors,
+                           airdrop_share=args.airdrop_share, spam_share=args.spam_share,
+                           repost_share=args.repost_share, repeat_share=args.repeat_share)
+    print(f"Wrote {written} tweets to {args.path}")
+
+if __name__ == '__main__':
+    main()
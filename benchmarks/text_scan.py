@@ -0,0 +1,138 @@
+"""Per-tweet cost of text preprocessing and regex extraction, before and after text_scan.
+
+"before" is the code as it was before text_scan, kept here for
+reference: the three-pass preprocess_tweet_text, and token, deadline,
+steps and spam extraction each searching the text on their own. "after"
+is text_scan.clean_text and scan_text. Both must give the same fields on
+every tweet in the corpus, or the run fails.
+
+    python -m benchmarks.text_scan [corpus.jsonl] [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from dateutil import parser
+
+from extract_info import parse_deadline
+import text_scan
+from text_scan import clean_text, scan_text
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), 'text_corpus.jsonl')
+
+# The deadline patterns have since changed on purpose (see deadlines.py),
+# so the reference searches today's patterns, uncompiled
+DEADLINE_PATTERNS = [pattern.pattern for pattern in text_scan.DEADLINE_PATTERNS]
+STEPS_PATTERNS = [
+    r'(?:how to participate|steps?|to participate):\s*(.+?)(?:\n|$)',
+    r'(?:1\.|\*)(.+?)(?:\n|$)'
+]
+SPAM_KEYWORDS = ['fake', 'scam', 'hurry', '100x', 'guaranteed']
+
+def reference_preprocess(text: str) -> str:
+    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'@(\w+)', r'\1', text)
+    text = re.sub(r'#(\w+)', r'\1', text)
+    text = ' '.join(text.split())
+    text = text.lower()
+    return text.strip()
+
+def reference_token_symbol(text: str):
+    dollar_match = re.search(r'\$([A-Z]{2,10})', text)
+    if dollar_match:
+        return dollar_match.group(1)
+    token_match = re.search(r'([A-Z][A-Z0-9]{2,9})\s+(?:token|coin)', text, re.IGNORECASE)
+    if token_match:
+        return token_match.group(1)
+    return None
+
+def reference_deadline_candidates(text: str):
+    matches = (re.search(pattern, text, re.IGNORECASE) for pattern in DEADLINE_PATTERNS)
+    return [match.group(1) for match in matches if match]
+
+def reference_deadline(text: str):
+    for pattern in DEADLINE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                return parser.parse(match.group(1), fuzzy=True)
+            except (ValueError, parser.ParserError):
+                continue
+    return None
+
+def reference_steps(text: str):
+    for pattern in STEPS_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return None
+
+def reference_spam_count(text: str) -> int:
+    return sum(1 for keyword in SPAM_KEYWORDS if keyword in text.lower())
+
+def regex_before(text: str):
+    return (reference_token_symbol(text), reference_deadline_candidates(text),
+            reference_steps(text), reference_spam_count(text))
+
+def regex_after(text: str, raw_text: str = None):
+    scanned = scan_text(text, raw_text=raw_text)
+    return (scanned.token_symbol, scanned.deadline_candidates,
+            scanned.participation_steps, scanned.spam_count)
+
+def fields_before(text: str):
+    return (reference_token_symbol(text), reference_deadline(text),
+            reference_steps(text), reference_spam_count(text))
+
+def fields_after(text: str):
+    scanned = scan_text(text)
+    return (scanned.token_symbol, parse_deadline(scanned.deadline_candidates),
+            scanned.participation_steps, scanned.spam_count)
+
+def per_tweet_us(function, texts, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    arg_parser.add_argument('--repeat', type=int, default=2000)
+    args = arg_parser.parse_args()
+    
+    with open(args.corpus) as f:
+        raw_texts = [json.loads(line)['text'] for line in f if line.strip()]
+    processed = [reference_preprocess(text) for text in raw_texts]
+    
+    mismatches = 0
+    cased_symbols = 0
+    for raw_text, text in zip(raw_texts, processed):
+        if clean_text(raw_text) != text or regex_after(text) != regex_before(text):
+            mismatches += 1
+            print(f"  MISMATCH: {raw_text!r}")
+        if regex_after(text, raw_text)[0] != reference_token_symbol(text):
+            cased_symbols += 1
+    
+    # dateutil dominates when a deadline is found, so the regex work is timed on its own too
+    rows = [
+        ('preprocess', reference_preprocess, clean_text, raw_texts),
+        ('regex fields', regex_before, regex_after, processed),
+        ('fields + dates', fields_before, fields_after, processed),
+    ]
+    print(f"{len(raw_texts)} tweets x {args.repeat} repeats")
+    for name, before, after, texts in rows:
+        before_us = per_tweet_us(before, texts, args.repeat)
+        after_us = per_tweet_us(after, texts, args.repeat)
+        print(f"{name:>15}: before {before_us:7.2f}us, after {after_us:7.2f}us "
+              f"({before_us / after_us:.1f}x)")
+    
+    print(f"{cased_symbols} tweets gain a $SYMBOL from the raw text's casing")
+    print("OK: identical fields" if not mismatches else f"FAIL: {mismatches} tweets differ")
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
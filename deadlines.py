@@ -0,0 +1,202 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import List, Optional
+
+from dateutil import parser
+from dateutil.relativedelta import relativedelta
+
+# Deadlines are naive UTC datetimes, like every other timestamp we store.
+# Dates without a time resolve to midnight, as dateutil does.
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+WEEKDAYS = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'twelve': 12,
+}
+UNITS = {'mo': 'months', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+# Hours ahead of UTC. CST and IST are left out, they mean different zones.
+TIMEZONE_OFFSETS = {
+    'utc': 0, 'gmt': 0, 'est': -5, 'edt': -4, 'pst': -8, 'pdt': -7, 'cet': 1,
+    'cest': 2, 'bst': 1, 'jst': 9, 'kst': 9, 'sgt': 8, 'hkt': 8,
+}
+# A month written without a year more than this far in the past means next year
+YEAR_ROLLOVER = timedelta(days=180)
+
+MONTH = (r'(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|'
+         r'aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)')
+DAY = r'(?P<day>\d{1,2})(?:st|nd|rd|th)?'
+YEAR = r'(?:,?\s+(?P<year>\d{4}))?'
+COUNT = r'(?P<count>\d+|' + '|'.join(NUMBER_WORDS) + r')'
+UNIT = r'(?P<unit>mo(?:nths?)?|m(?:in(?:ute)?s?)?|h(?:(?:ou)?rs?)?|d(?:ays?)?|w(?:(?:ee)?ks?)?)'
+
+# Calendar dates, in order of preference when several match
+DATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b',
+    rf'\b{MONTH}\b\.?\s+{DAY}\b{YEAR}',
+    rf'\b{DAY}\s+(?:of\s+)?{MONTH}\b\.?{YEAR}',
+    # Month first like dateutil, unless the first number can't be a month
+    r'\b(?P<first>\d{1,2})/(?P<second>\d{1,2})(?:/(?P<year>\d{4}|\d{2}))?\b(?!/)',
+    # Dotted and dashed dates are written day first
+    r'\b(?P<day>\d{1,2})([.-])(?P<month>\d{1,2})\2(?P<year>\d{4})\b',
+]]
+RELATIVE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    rf'\bin\s+{COUNT}\s*{UNIT}\b',
+    rf'\b{COUNT}\s*{UNIT}\s+(?:left|remaining|to go|from now)\b',
+]]
+DAY_WORD_PATTERN = re.compile(r'\b(?P<word>today|tonight|tomorrow)\b', re.IGNORECASE)
+WEEKDAY_PATTERN = re.compile(
+    r'\b(?P<weekday>mon|tue|wed|thu|fri|sat|sun)(?:day|s|sday|nesday|r|rs|rsday|urday)?\b',
+    re.IGNORECASE
+)
+TIME_PATTERN = re.compile(
+    r'\b(?:(?P<named>midnight|noon)'
+    r'|(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?:(?P<ampm>[ap])\.?m\b\.?)?)\s*'
+    r'(?:(?P<tz>' + '|'.join(TIMEZONE_OFFSETS) + r')\b(?P<offset>[+-]\d{1,2}\b)?)?',
+    re.IGNORECASE
+)
+# Only text with a month name, a year or digits with separators is worth
+# handing to dateutil; it reads a lone count ("3 winners") as a day
+FALLBACK_HINT = re.compile(rf'\d[/:.-]\d|\b\d{{4}}\b|\b{MONTH}\b', re.IGNORECASE)
+
+def _year(value: Optional[str], month: int, day: int, today: date) -> int:
+    if value:
+        year = int(value)
+        return year + 2000 if year < 100 else year
+    if date(today.year, month, day) < today - YEAR_ROLLOVER:
+        return today.year + 1
+    return today.year
+
+def _match_date(text: str, today: date):
+    """Earliest calendar date in the text, with the span it was found at."""
+    best = None
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(text)
+        if match and (best is None or match.start() < best.start()):
+            best = match
+    if best is None:
+        return None, None
+    
+    groups = best.groupdict()
+    try:
+        if groups.get('first'):
+            first, second = int(groups['first']), int(groups['second'])
+            month, day = (second, first) if first > 12 else (first, second)
+        else:
+            month = groups['month']
+            month = int(month) if month.isdigit() else MONTHS[month[:3].lower()]
+            day = int(groups['day'])
+        return date(_year(groups['year'], month, day, today), month, day), best.span()
+    except ValueError:
+        return None, None
+
+def _match_time(text: str, date_span):
+    """First time of day in the text outside date_span, as (time, hours ahead of UTC)."""
+    for match in TIME_PATTERN.finditer(text):
+        if date_span and match.start() < date_span[1] and match.end() > date_span[0]:
+            continue
+        named, hour, minute, ampm, tz = match.group('named', 'hour', 'minute', 'ampm', 'tz')
+        # A bare number is not a time
+        if not (named or minute or ampm or tz):
+            continue
+        hour = 12 if named == 'noon' else int(hour or 0)
+        if ampm:
+            if not 1 <= hour <= 12:
+                continue
+            hour = hour % 12 + (12 if ampm.lower() == 'p' else 0)
+        if hour > 23 or (minute and int(minute) > 59):
+            continue
+        offset = TIMEZONE_OFFSETS[tz.lower()] if tz else 0
+        if match.group('offset'):
+            offset += int(match.group('offset'))
+        return time(hour, int(minute or 0)), offset
+    return None, 0
+
+def _match_relative(text: str, now: datetime) -> Optional[datetime]:
+    for pattern in RELATIVE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            count = match.group('count').lower()
+            count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+            unit = match.group('unit').lower()
+            unit = UNITS[unit[:2]] if unit[:2] in UNITS else UNITS[unit[0]]
+            delta = relativedelta(**{unit: count})
+            return (now + delta).replace(second=0, microsecond=0)
+    return None
+
+def match_deadline(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Read a deadline from the date shapes common in airdrop tweets.
+    
+    Recognizes calendar dates ("oct 20", "20th october 2024", "10/20",
+    "2024-10-20"), relative times ("in 3 days", "48h left"), "today",
+    "tonight", "tomorrow" and weekdays, each optionally with a time of
+    day and timezone ("12:00 utc", "3pm est", "midnight"). Returns None for anything
+    else.
+    """
+    now = now or datetime.utcnow()
+    today = now.date()
+    
+    day, date_span = _match_date(text, today)
+    if day is None:
+        relative = _match_relative(text, now)
+        if relative is not None:
+            return relative
+    
+    at, offset = _match_time(text, date_span)
+    if day is None:
+        word = DAY_WORD_PATTERN.search(text)
+        weekday = WEEKDAY_PATTERN.search(text)
+        if word:
+            word = word.group('word').lower()
+            day = today + timedelta(days=1) if word == 'tomorrow' else today
+            if word == 'tonight' and at is None:
+                at = time(23, 59)
+        elif weekday:
+            days_ahead = (WEEKDAYS[weekday.group('weekday').lower()] - today.weekday()) % 7
+            day = today + timedelta(days=days_ahead)
+        elif at is not None:
+            # A time on its own is the next time the clock shows it
+            day = today
+            if datetime.combine(day, at) - timedelta(hours=offset) < now:
+                day += timedelta(days=1)
+        else:
+            return None
+    
+    return datetime.combine(day, at or time()) - timedelta(hours=offset)
+
+@lru_cache(maxsize=4096)
+def _fuzzy_parse(text: str, default: datetime) -> Optional[datetime]:
+    try:
+        parsed = parser.parse(text, fuzzy=True, default=default)
+    except (ValueError, OverflowError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def fuzzy_deadline(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """dateutil's fuzzy parse of the text, memoized per text and day."""
+    if not FALLBACK_HINT.search(text):
+        return None
+    now = now or datetime.utcnow()
+    return _fuzzy_parse(text, datetime.combine(now.date(), time()))
+
+def parse_deadline(candidates: List[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """Parse the first deadline candidate a date can be read from.
+    
+    Every candidate is tried against the grammar in match_deadline
+    before any is handed to dateutil.
+    """
+    for candidate in candidates:
+        deadline = match_deadline(candidate, now)
+        if deadline is not None:
+            return deadline
+    for candidate in candidates:
+        deadline = fuzzy_deadline(candidate, now)
+        if deadline is not None:
+            return deadline
+    return None
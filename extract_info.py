@@ -1,57 +1,94 @@
-import spacy
-import re
+import hashlib
+import threading
+import time
 from datetime import datetime
-from dateutil import parser
-from typing import Dict, Optional, Tuple
-from models import ProcessedTweet, AirdropOpportunity
+from typing import Dict, List, Optional, Set, Tuple
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+import numpy as np
+
+from models import TweetRecord, OpportunityRecord
+from deadlines import parse_deadline
+from metrics import METRICS
+from scoring import DEFAULT_SCORER, ScoringEngine, feature_row
+from text_scan import (CASHTAG_PATTERN, DEADLINE_PATTERNS, STEPS_PATTERNS, count_spam,
+                       find_token_symbol, scan_text)
+
+# Pipeline components extract_project_info never reads. We only need the
+# entities from "ner" and the sentence boundaries set by "parser".
+UNUSED_PIPES = ['tagger', 'attribute_ruler', 'lemmatizer']
+
+MODEL_NAME = "en_core_web_sm"
+
+# Bump whenever extraction or scoring changes, so cached results are not reused
+EXTRACTOR_VERSION = 5
+
+# Extracted fields that depend only on the tweet text, and so can be cached.
+# The score is not (it depends on the author, the cluster and the weights),
+# nor is the deadline: "tomorrow" depends on when the tweet was posted, so
+# the candidates are cached and parsed again for every tweet.
+CACHED_FIELDS = ['project_name', 'token_symbol', 'description', 'deadline_candidates',
+                 'participation_steps']
+
+# The spaCy model takes seconds and a lot of memory to load, so it is only
+# loaded when the first tweet needs extracting (or by warm_up_in_background)
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Return the spaCy model, loading it on first use."""
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                _nlp = spacy.load(MODEL_NAME, disable=UNUSED_PIPES)
+    return _nlp
+
+_cache_namespace = None
+
+def _model_version() -> str:
+    from importlib import metadata
+    for name in (MODEL_NAME, MODEL_NAME.replace('_', '-')):
+        try:
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    return 'unknown'
+
+def cache_key(text: str, raw_text: Optional[str] = None) -> str:
+    """Content hash of a tweet's text plus the model and extractor versions.
+    
+    The cashtags of raw_text are part of the key: cleaning lowercases
+    them, but the token symbol is taken from their original casing.
+    """
+    global _cache_namespace
+    if _cache_namespace is None:
+        _cache_namespace = f"{MODEL_NAME}={_model_version()}/{EXTRACTOR_VERSION}"
+    normalized = ' '.join((text or '').split())
+    cashtags = CASHTAG_PATTERN.findall(raw_text) if raw_text else None
+    if cashtags:
+        normalized += '\n$' + ' $'.join(cashtags)
+    return hashlib.blake2b(f"{_cache_namespace}\n{normalized}".encode('utf-8'), digest_size=16).hexdigest()
+
+def warm_up_in_background() -> threading.Thread:
+    """Start loading the spaCy model in a daemon thread."""
+    thread = threading.Thread(target=get_nlp, name='nlp-warm-up', daemon=True)
+    thread.start()
+    return thread
 
 def extract_token_symbol(text: str) -> Optional[str]:
     """Extract potential token symbols from text."""
-    # Look for $SYMBOL pattern
-    dollar_match = re.search(r'\$([A-Z]{2,10})', text)
-    if dollar_match:
-        return dollar_match.group(1)
-    
-    # Look for "TOKEN" or "Token" followed by "token"/"coin"
-    token_match = re.search(r'([A-Z][A-Z0-9]{2,9})\s+(?:token|coin)', text, re.IGNORECASE)
-    if token_match:
-        return token_match.group(1)
-    
-    return None
+    return find_token_symbol(text)
 
-def extract_deadline(text: str) -> Optional[datetime]:
+def extract_deadline(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
     """Extract deadline date from text."""
-    # Common deadline patterns
-    patterns = [
-        r'deadline:?\s*(.+?)(?:\.|$)',
-        r'ends?(?:\son)?:?\s*(.+?)(?:\.|$)',
-        r'until:?\s*(.+?)(?:\.|$)',
-        r'closes?(?:\son)?:?\s*(.+?)(?:\.|$)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            try:
-                return parser.parse(match.group(1), fuzzy=True)
-            except (ValueError, parser.ParserError):
-                continue
-    
-    return None
+    candidates = (pattern.search(text) for pattern in DEADLINE_PATTERNS)
+    return parse_deadline([match.group(1) for match in candidates if match], now)
 
 def extract_participation_steps(text: str) -> Optional[str]:
     """Extract participation instructions from text."""
-    # Common patterns for participation instructions
-    patterns = [
-        r'(?:how to participate|steps?|to participate):\s*(.+?)(?:\n|$)',
-        r'(?:1\.|\*)(.+?)(?:\n|$)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in STEPS_PATTERNS:
+        match = pattern.search(text)
         if match:
             return match.group(1).strip()
     
@@ -76,68 +113,221 @@ def extract_project_info(doc) -> Tuple[Optional[str], Optional[str]]:
     
     return project_name, description
 
-def calculate_confidence_score(tweet: ProcessedTweet, extracted_info: Dict) -> float:
-    """Calculate confidence score for the airdrop opportunity."""
-    score = 0.0
-    
-    # Check if essential information is present
-    if extracted_info.get('project_name'):
-        score += 20
-    if extracted_info.get('token_symbol'):
-        score += 20
-    if extracted_info.get('deadline'):
-        score += 15
-    if extracted_info.get('participation_steps'):
-        score += 15
-    
-    # Check for spam indicators
-    spam_keywords = ['fake', 'scam', 'hurry', '100x', 'guaranteed']
-    spam_count = sum(1 for keyword in spam_keywords if keyword in tweet.processed_text.lower())
-    score -= spam_count * 5
-    
-    # Bonus points for verified accounts (would need to be implemented with actual Twitter API)
-    # if tweet.author_verified:
-    #     score += 10
-    
-    # Normalize score to 0-100 range
-    score = max(0, min(100, score))
+def count_spam_keywords(text: str) -> int:
+    """Count how many distinct spam keywords appear in the text."""
+    return count_spam(text)
+
+def calculate_confidence_score(tweet: TweetRecord, extracted_info: Dict,
+                               scorer: Optional[ScoringEngine] = None) -> float:
+    """Calculate confidence score for the airdrop opportunity.
     
-    return score
+    Scores one opportunity; batches go through ScoringEngine.score_opportunities.
+    """
+    scorer = scorer or DEFAULT_SCORER
+    features = feature_row(
+        extracted_info.get('project_name'),
+        extracted_info.get('token_symbol'),
+        extracted_info.get('deadline'),
+        extracted_info.get('participation_steps'),
+        tweet.processed_text,
+        tweet.author_username,
+        extracted_info.get('cluster_size'),
+        tweet.created_at,
+        datetime.utcnow(),
+        frozenset()
+    )
+    return float(scorer.score_matrix(np.array([features]))[0])
 
-def extract_airdrop_info(tweet: ProcessedTweet) -> Optional[AirdropOpportunity]:
-    """Extract all relevant information from a tweet and create an AirdropOpportunity."""
-    # Process with spaCy
-    doc = nlp(tweet.processed_text)
+def build_opportunity(tweet: TweetRecord, doc,
+                      timings: Optional[Dict[str, float]] = None) -> Optional[OpportunityRecord]:
+    """Create an unscored OpportunityRecord from a tweet and its parsed spaCy doc.
     
+    With timings, the seconds spent in each step are added to it.
+    """
+    return _from_cached_fields(tweet, _extract_fields(tweet, doc, timings), timings)
+
+def _extract_fields(tweet: TweetRecord, doc,
+                    timings: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+    """CACHED_FIELDS of a tweet, or None if it names no project or token."""
+    start = time.perf_counter()
     # Extract information
     project_name, description = extract_project_info(doc)
-    token_symbol = extract_token_symbol(tweet.processed_text)
-    deadline = extract_deadline(tweet.processed_text)
-    participation_steps = extract_participation_steps(tweet.processed_text)
+    project_done = time.perf_counter()
+    # One regex pass for the token symbol, deadline candidates, steps and
+    # spam; cashtags come from the raw text, which keeps their case
+    scanned = scan_text(tweet.processed_text, raw_text=tweet.text)
+    token_symbol = scanned.token_symbol
+    if timings is not None:
+        timings['project'] += project_done - start
+        timings['scan'] += time.perf_counter() - project_done
     
     # If we don't have enough information, return None
     if not (project_name or token_symbol):
         return None
     
-    # Create extracted info dictionary for confidence calculation
-    extracted_info = {
+    return {
         'project_name': project_name,
         'token_symbol': token_symbol,
-        'deadline': deadline,
-        'participation_steps': participation_steps
+        'description': description,
+        'deadline_candidates': scanned.deadline_candidates,
+        'participation_steps': scanned.participation_steps,
     }
+
+class PreFilter:
+    """Cheap regex screen that runs before spaCy.
+    
+    A tweet is only rejected when the full extraction path could never
+    notify on it: either it has no text for NER to find a project in and
+    no token symbol, or its best possible confidence score (assuming NER
+    finds a project, every deadline candidate parses and the author and
+    cluster features take their best values) is still below min_confidence.
+    """
+    
+    def __init__(self, min_confidence: float = 70.0, scorer: Optional[ScoringEngine] = None):
+        self.min_confidence = min_confidence
+        self.scorer = scorer or DEFAULT_SCORER
+        self.stats = {'passed': 0, 'rejected_no_subject': 0, 'rejected_score': 0}
     
-    # Calculate confidence score
-    confidence_score = calculate_confidence_score(tweet, extracted_info)
+    def max_possible_score(self, text: str, raw_text: Optional[str] = None) -> float:
+        """Upper bound of the scorer's score for this text."""
+        scanned = scan_text(text, raw_text=raw_text)
+        return self.scorer.max_possible_score({
+            'token_symbol': 1.0 if scanned.token_symbol else 0.0,
+            'deadline': 1.0 if scanned.deadline_candidates else 0.0,
+            'participation_steps': 1.0 if scanned.participation_steps is not None else 0.0,
+            'spam_terms': float(scanned.spam_count),
+        })
     
-    # Create AirdropOpportunity object
-    return AirdropOpportunity(
+    def accepts(self, tweet: TweetRecord) -> bool:
+        """Return False if the tweet can safely skip extraction."""
+        text = tweet.processed_text or ''
+        if not text.strip():
+            self.stats['rejected_no_subject'] += 1
+            return False
+        if self.max_possible_score(text, tweet.text) < self.min_confidence:
+            self.stats['rejected_score'] += 1
+            return False
+        self.stats['passed'] += 1
+        return True
+    
+    def filter(self, tweets: List[TweetRecord]) -> List[TweetRecord]:
+        """Keep only the tweets worth sending through spaCy."""
+        with METRICS.timer('airdrop_prefilter_seconds'):
+            return [tweet for tweet in tweets if self.accepts(tweet)]
+
+def extract_airdrop_info(tweet: TweetRecord,
+                         scorer: Optional[ScoringEngine] = None) -> Optional[OpportunityRecord]:
+    """Extract all relevant information from a tweet and create an OpportunityRecord."""
+    # Process with spaCy
+    doc = get_nlp()(tweet.processed_text)
+    opportunity = build_opportunity(tweet, doc)
+    if opportunity is not None:
+        (scorer or DEFAULT_SCORER).score_opportunities([opportunity], [tweet])
+    return opportunity
+
+def _from_cached_fields(tweet: TweetRecord, fields: Optional[Dict],
+                        timings: Optional[Dict[str, float]] = None) -> Optional[OpportunityRecord]:
+    if fields is None:
+        return None
+    start = time.perf_counter()
+    # "in 3 days" counts from when this tweet was posted
+    deadline = parse_deadline(fields['deadline_candidates'], now=tweet.created_at)
+    if timings is not None:
+        timings['deadline'] += time.perf_counter() - start
+    return OpportunityRecord(
         tweet_id=tweet.tweet_id,
-        project_name=project_name,
-        token_symbol=token_symbol,
-        description=description,
+        project_name=fields['project_name'],
+        token_symbol=fields['token_symbol'],
+        description=fields['description'],
         deadline=deadline,
-        participation_steps=participation_steps,
-        tweet_url=f"https://twitter.com/i/web/status/{tweet.tweet_id}",
-        confidence_score=confidence_score
-    ) 
\ No newline at end of file
+        participation_steps=fields['participation_steps'],
+        tweet_url=f"https://twitter.com/i/web/status/{tweet.tweet_id}"
+    )
+
+def extract_airdrop_info_batch(tweets: List[TweetRecord], batch_size: int = 64,
+                               n_process: int = 1, report: bool = True,
+                               cache=None, scorer: Optional[ScoringEngine] = None,
+                               trusted_authors: Set[str] = frozenset(),
+                               near_duplicates=None, reputation=None) -> List[OpportunityRecord]:
+    """Extract opportunities from many tweets at once using nlp.pipe.
+    
+    With an ExtractionCache, tweets whose text was extracted before reuse
+    that result, and identical texts in the batch are extracted once.
+    The opportunities are scored together once extraction is done, with
+    cluster sizes from near_duplicates and author reputations from
+    reputation (an AuthorReputation) when given.
+    """
+    if not tweets:
+        return []
+    
+    start = time.perf_counter()
+    timings = {'cache': 0.0, 'spacy': 0.0, 'project': 0.0, 'scan': 0.0, 'deadline': 0.0, 'score': 0.0}
+    results: Dict[int, Optional[OpportunityRecord]] = {}
+    
+    # Only the first tweet with each uncached text goes through spaCy
+    pending = list(enumerate(tweets))
+    keys: Dict[int, str] = {}
+    fields_by_key: Dict[str, Optional[Dict]] = {}
+    if cache is not None:
+        from extraction_cache import MISSING
+        pending = []
+        for i, tweet in enumerate(tweets):
+            key = keys[i] = cache_key(tweet.processed_text, tweet.text)
+            if key in fields_by_key:
+                continue
+            fields = cache.get(key)
+            if fields is MISSING:
+                fields_by_key[key] = MISSING
+                pending.append((i, tweet))
+            else:
+                fields_by_key[key] = fields
+                results[i] = _from_cached_fields(tweet, fields)
+        timings['cache'] += time.perf_counter() - start
+    
+    if pending:
+        docs = get_nlp().pipe((tweet.processed_text for _, tweet in pending),
+                        batch_size=batch_size, n_process=n_process)
+        for i, tweet in pending:
+            # nlp.pipe parses lazily, so spaCy's time is spent in next()
+            parse_start = time.perf_counter()
+            doc = next(docs)
+            timings['spacy'] += time.perf_counter() - parse_start
+            fields = _extract_fields(tweet, doc, timings)
+            if cache is not None:
+                fields_by_key[keys[i]] = fields
+            results[i] = _from_cached_fields(tweet, fields, timings)
+        if cache is not None:
+            store_start = time.perf_counter()
+            cache.put_many((keys[i], fields_by_key[keys[i]]) for i, _ in pending)
+            timings['cache'] += time.perf_counter() - store_start
+    
+    opportunities = []
+    for i, tweet in enumerate(tweets):
+        if i not in results:
+            # Same text as an earlier tweet in this batch
+            results[i] = _from_cached_fields(tweet, fields_by_key[keys[i]])
+        if results[i]:
+            opportunities.append(results[i])
+    
+    score_start = time.perf_counter()
+    if near_duplicates is not None:
+        near_duplicates.attach_cluster_sizes(opportunities)
+    (scorer or DEFAULT_SCORER).score_opportunities(opportunities, tweets, trusted_authors,
+                                                    reputation=reputation)
+    timings['score'] += time.perf_counter() - score_start
+    
+    for step, seconds in timings.items():
+        if step == 'cache' and cache is None:
+            continue
+        count = len(pending) if step in ('spacy', 'project', 'scan', 'deadline') else len(tweets)
+        METRICS.observe('airdrop_extract_step_seconds', seconds, count=count, step=step)
+    METRICS.inc('airdrop_tweets_total', len(tweets), stage='extracted')
+    METRICS.inc('airdrop_opportunities_total', len(opportunities))
+    
+    if report:
+        elapsed = time.perf_counter() - start
+        rate = len(tweets) / elapsed if elapsed > 0 else float('inf')
+        parsed = f", {len(pending)} parsed by spaCy" if cache is not None else ''
+        print(f"Extracted {len(tweets)} tweets in {elapsed:.2f}s ({rate:.1f} tweets/sec{parsed})")
+    
+    return opportunities
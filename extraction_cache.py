@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Returned by get() when a key is not cached; None is a valid cached value
+MISSING = object()
+
+def _encode(value: Optional[Dict]) -> str:
+    return json.dumps(value, default=lambda v: {'__datetime__': v.isoformat()})
+
+def _decode(raw: str) -> Optional[Dict]:
+    def hook(obj):
+        if '__datetime__' in obj:
+            return datetime.fromisoformat(obj['__datetime__'])
+        return obj
+    return json.loads(raw, object_hook=hook)
+
+class ExtractionCache:
+    """Two-tier cache of extraction results, keyed by a hash of the tweet text.
+    
+    The memory tier is an LRU bounded by max_entries. With a path, results
+    are also written to a small SQLite database that survives restarts and
+    is read on a memory miss. Entries older than ttl_seconds are ignored
+    in both tiers.
+    """
+    
+    def __init__(self, max_entries: int = 50000, ttl_seconds: float = 86400,
+                 path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            # Extraction runs in a worker thread in the streaming pipeline
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS extraction_cache '
+                '(key TEXT PRIMARY KEY, value TEXT, created_at REAL NOT NULL)'
+            )
+            self._db.commit()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _remember(self, key: str, created_at: float, value: Any):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    def get(self, key: str) -> Any:
+        """Return the cached value for key, or MISSING."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry[1]
+                del self._entries[key]
+                self.stats['expired'] += 1
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, created_at FROM extraction_cache WHERE key = ? AND created_at >= ?',
+                    (key, now - self.ttl_seconds)
+                ).fetchone()
+                if row is not None:
+                    value = _decode(row[0])
+                    self._remember(key, row[1], value)
+                    self.stats['disk_hits'] += 1
+                    return value
+            
+            self.stats['misses'] += 1
+            return MISSING
+    
+    def put_many(self, items: Iterable[Tuple[str, Optional[Dict]]]):
+        """Cache several results, writing them to disk in one transaction."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for key, value in items:
+                self._remember(key, now, value)
+                rows.append((key, _encode(value), now))
+            if self._db is not None and rows:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO extraction_cache (key, value, created_at) VALUES (?, ?, ?)',
+                    rows
+                )
+                self._db.commit()
+    
+    def put(self, key: str, value: Optional[Dict]):
+        self.put_many([(key, value)])
+    
+    def prune(self) -> int:
+        """Delete expired rows from the disk tier."""
+        if self._db is None:
+            return 0
+        with self._lock:
+            deleted = self._db.execute(
+                'DELETE FROM extraction_cache WHERE created_at < ?',
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self._db.commit()
+        return deleted
+    
+    def hit_rate(self) -> float:
+        hits = self.stats['hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
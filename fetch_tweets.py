@@ -1,12 +1,17 @@
-import tweepy
-import re
+from __future__ import annotations
+
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 from sqlalchemy.orm import Session
-from models import TwitterAccount, ProcessedTweet
+from models import TwitterAccount, ProcessedTweet, FetchCursor, TweetRecord
+from metrics import METRICS
+from text_scan import clean_text
 
 class TwitterClient:
     def __init__(self, api_key: str, api_secret: str, access_token: str, access_token_secret: str):
+        # Imported here so importing this module stays cheap
+        import tweepy
         auth = tweepy.OAuthHandler(api_key, api_secret)
         auth.set_access_token(access_token, access_token_secret)
         self.api = tweepy.API(auth, wait_on_rate_limit=True)
@@ -14,77 +19,153 @@ class TwitterClient:
     def get_user_tweets(self, username: str, since_id: Optional[str] = None, 
                        max_results: int = 100) -> List[tweepy.Tweet]:
         """Fetch recent tweets from a specific user."""
+        import tweepy
         try:
-            tweets = self.api.user_timeline(screen_name=username,
-                                          count=max_results,
-                                          since_id=since_id,
-                                          tweet_mode="extended")
+            with METRICS.timer('airdrop_fetch_seconds', source_type='account'):
+                tweets = self.api.user_timeline(screen_name=username,
+                                              count=max_results,
+                                              since_id=since_id,
+                                              tweet_mode="extended")
+            METRICS.inc('airdrop_tweets_total', len(tweets), stage='fetched')
             return tweets
-        except tweepy.TweepError as e:
+        except tweepy.TweepyException as e:
             print(f"Error fetching tweets for {username}: {str(e)}")
             return []
 
     def search_tweets(self, query: str, since_id: Optional[str] = None,
                      max_results: int = 100) -> List[tweepy.Tweet]:
         """Search for tweets matching the query."""
+        import tweepy
         try:
-            tweets = self.api.search_tweets(q=query,
-                                          count=max_results,
-                                          since_id=since_id,
-                                          tweet_mode="extended")
+            with METRICS.timer('airdrop_fetch_seconds', source_type='query'):
+                tweets = self.api.search_tweets(q=query,
+                                              count=max_results,
+                                              since_id=since_id,
+                                              tweet_mode="extended")
+            METRICS.inc('airdrop_tweets_total', len(tweets), stage='fetched')
             return tweets
-        except tweepy.TweepError as e:
+        except tweepy.TweepyException as e:
             print(f"Error searching tweets for {query}: {str(e)}")
             return []
 
 def preprocess_tweet_text(text: str) -> str:
-    """Clean and preprocess tweet text."""
-    # Remove URLs
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+    """Clean and preprocess tweet text.
     
-    # Remove mentions while keeping the username text
-    text = re.sub(r'@(\w+)', r'\1', text)
+    Removes URLs and the @/# of mentions and hashtags, collapses
+    whitespace and lowercases, in a single regex pass.
+    """
+    return clean_text(text)
+
+# SQLite limits the number of bound parameters per statement
+DEDUP_CHUNK_SIZE = 500
+
+# Tweets older than this are dropped before dedup
+MAX_TWEET_AGE_DAYS = 7
+
+class SeenTweetCache:
+    """In-process LRU cache of tweet IDs that are already in processed_tweets."""
     
-    # Remove hashtag symbols while keeping the text
-    text = re.sub(r'#(\w+)', r'\1', text)
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self._ids = OrderedDict()
     
-    # Remove extra whitespace
-    text = ' '.join(text.split())
+    def __contains__(self, tweet_id: str) -> bool:
+        if tweet_id in self._ids:
+            self._ids.move_to_end(tweet_id)
+            return True
+        return False
     
-    # Convert to lowercase
-    text = text.lower()
+    def __len__(self) -> int:
+        return len(self._ids)
     
-    return text.strip()
+    def add(self, tweet_id: str):
+        """Remember a tweet ID, evicting the least recently used one if full."""
+        self._ids[tweet_id] = None
+        self._ids.move_to_end(tweet_id)
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+    
+    def add_many(self, tweet_ids: Iterable[str]):
+        """Remember several tweet IDs at once."""
+        for tweet_id in tweet_ids:
+            self.add(tweet_id)
+    
+    def warm(self, db: Session):
+        """Load the most recently processed tweet IDs from the database."""
+        rows = (db.query(ProcessedTweet.tweet_id)
+                .order_by(ProcessedTweet.id.desc())
+                .limit(self.capacity)
+                .all())
+        # Insert oldest first so the newest end up most recently used
+        self.add_many(row.tweet_id for row in reversed(rows))
+
+def find_processed_ids(tweet_ids: List[str], db: Session) -> Set[str]:
+    """Return the subset of tweet_ids already stored, using chunked IN queries."""
+    existing = set()
+    for i in range(0, len(tweet_ids), DEDUP_CHUNK_SIZE):
+        chunk = tweet_ids[i:i + DEDUP_CHUNK_SIZE]
+        rows = (db.query(ProcessedTweet.tweet_id)
+                .filter(ProcessedTweet.tweet_id.in_(chunk))
+                .all())
+        existing.update(row.tweet_id for row in rows)
+    return existing
 
+@METRICS.timed('airdrop_filter_seconds')
 def filter_tweets(tweets: List[tweepy.Tweet], db: Session,
-                 max_age_days: int = 7) -> List[ProcessedTweet]:
-    """Filter tweets based on various criteria."""
-    filtered_tweets = []
+                 max_age_days: int = MAX_TWEET_AGE_DAYS,
+                 seen_cache: Optional[SeenTweetCache] = None,
+                 reputation=None) -> List[TweetRecord]:
+    """Filter tweets based on various criteria.
+    
+    With an AuthorReputation, tweets by blacklisted or low-reputation
+    authors are dropped before anything else looks at them.
+    """
     cutoff_date = datetime.utcnow() - timedelta(days=max_age_days)
     
+    # Deduplicate the batch itself, since the same tweet can come back
+    # from several keyword searches, and drop tweets that are too old
+    candidates = {}
     for tweet in tweets:
-        # Skip if tweet is too old
-        if tweet.created_at < cutoff_date:
+        tweet_id = str(tweet.id)
+        if tweet_id in candidates:
             continue
-            
-        # Check if tweet is already processed
-        existing = db.query(ProcessedTweet).filter_by(tweet_id=str(tweet.id)).first()
-        if existing:
+        # tweepy returns timezone-aware UTC datetimes
+        created_at = tweet.created_at
+        if created_at.tzinfo is not None:
+            created_at = created_at.replace(tzinfo=None)
+        if created_at < cutoff_date:
+            continue
+        if reputation is not None and not reputation.allows(str(tweet.user.id), tweet.user.screen_name):
+            continue
+        if seen_cache is not None and tweet_id in seen_cache:
+            continue
+        candidates[tweet_id] = (tweet, created_at)
+    
+    # Check which of the remaining tweets are already processed
+    existing = find_processed_ids(list(candidates), db)
+    if seen_cache is not None:
+        seen_cache.add_many(existing)
+    
+    filtered_tweets = []
+    for tweet_id, (tweet, created_at) in candidates.items():
+        if tweet_id in existing:
             continue
             
-        # Create ProcessedTweet object
-        processed_tweet = ProcessedTweet(
-            tweet_id=str(tweet.id),
+        # A plain record; it only becomes a processed_tweets row in bulk_save
+        processed_tweet = TweetRecord(
+            tweet_id=tweet_id,
             author_id=str(tweet.user.id),
+            author_username=tweet.user.screen_name,
             text=tweet.full_text,
             processed_text=preprocess_tweet_text(tweet.full_text),
-            created_at=tweet.created_at,
+            created_at=created_at,
             is_retweet=hasattr(tweet, 'retweeted_status'),
             is_reply=tweet.in_reply_to_status_id is not None
         )
         
         filtered_tweets.append(processed_tweet)
     
+    METRICS.inc('airdrop_tweets_total', len(filtered_tweets), stage='new')
     return filtered_tweets
 
 # Keywords and hashtags for searching
@@ -102,22 +183,58 @@ def get_search_queries() -> List[str]:
     """Combine keywords into search queries."""
     return AIRDROP_KEYWORDS + TESTNET_KEYWORDS
 
-def fetch_new_tweets(client: TwitterClient, db: Session) -> List[ProcessedTweet]:
-    """Fetch new tweets from both followed accounts and keyword searches."""
-    all_tweets = []
-    
-    # Get trusted accounts
+def move_cursor(cursor: FetchCursor, newest_id: int):
+    """Move a cursor forward to newest_id unless it is already past it."""
+    if cursor.since_id is None or newest_id > int(cursor.since_id):
+        cursor.since_id = str(newest_id)
+
+def advance_cursor(cursor: FetchCursor, tweets: List[tweepy.Tweet]):
+    """Move a cursor forward to the highest tweet ID in a fetched batch."""
+    if tweets:
+        move_cursor(cursor, max(tweet.id for tweet in tweets))
+
+def load_cursors(db: Session) -> Dict[Tuple[str, str], FetchCursor]:
+    """Load the cursor of every source in one query."""
+    return {(cursor.source_type, cursor.source): cursor
+            for cursor in db.query(FetchCursor).all()}
+
+def get_cursor(db: Session, cursors: Dict[Tuple[str, str], FetchCursor],
+               source_type: str, source: str) -> FetchCursor:
+    """Return the cursor for a source, creating a pending one if needed."""
+    cursor = cursors.get((source_type, source))
+    if cursor is None:
+        cursor = FetchCursor(source_type=source_type, source=source)
+        db.add(cursor)
+        cursors[(source_type, source)] = cursor
+    return cursor
+
+def get_sources(db: Session) -> List[Tuple[str, str]]:
+    """List every (source_type, source) pair to fetch: trusted accounts, then queries."""
     trusted_accounts = db.query(TwitterAccount).filter_by(is_trusted=True).all()
+    sources = [('account', account.username) for account in trusted_accounts]
+    sources.extend(('query', query) for query in get_search_queries())
+    return sources
+
+def fetch_new_tweets(client: TwitterClient, db: Session,
+                     seen_cache: Optional[SeenTweetCache] = None,
+                     reputation=None) -> List[TweetRecord]:
+    """Fetch new tweets from both followed accounts and keyword searches.
     
-    # Fetch from trusted accounts
-    for account in trusted_accounts:
-        tweets = client.get_user_tweets(account.username)
-        all_tweets.extend(tweets)
+    Each source is fetched from its stored since_id cursor. Cursors are
+    advanced in the session but not committed, so they only move forward
+    when the caller commits the tweets they cover.
+    """
+    all_tweets = []
+    cursors = load_cursors(db)
     
-    # Search using keywords
-    for query in get_search_queries():
-        tweets = client.search_tweets(query)
+    for source_type, source in get_sources(db):
+        cursor = get_cursor(db, cursors, source_type, source)
+        if source_type == 'account':
+            tweets = client.get_user_tweets(source, since_id=cursor.since_id)
+        else:
+            tweets = client.search_tweets(source, since_id=cursor.since_id)
+        advance_cursor(cursor, tweets)
         all_tweets.extend(tweets)
     
     # Filter and process tweets
-    return filter_tweets(all_tweets, db) 
\ No newline at end of file
+    return filter_tweets(all_tweets, db, seen_cache=seen_cache, reputation=reputation)
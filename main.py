@@ -1,13 +1,23 @@
 import os
 import asyncio
+import signal
 import schedule
 import time
+from typing import List
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from models import init_db, TwitterAccount, ProcessedTweet, AirdropOpportunity
-from fetch_tweets import TwitterClient, fetch_new_tweets
-from extract_info import extract_airdrop_info
-from notifications import EmailNotifier, TelegramNotifier, NotificationManager
+from models import init_db, bulk_save, TwitterAccount, TweetRecord
+from fetch_tweets import TwitterClient, SeenTweetCache, fetch_new_tweets
+from extract_info import PreFilter, extract_airdrop_info_batch, warm_up_in_background
+from pipeline import StreamingPipeline
+from retention import enable_incremental_vacuum, run_retention
+from near_duplicates import NearDuplicateIndex
+from opportunity_index import OpportunityIndex
+from extraction_cache import ExtractionCache
+from scoring import ScoringEngine, rescore_opportunities
+from author_reputation import AuthorReputation
+from outbox import Outbox
+from metrics import METRICS, CycleHealth, profiled, start_http_server
 
 # Configuration
 TWITTER_API_KEY = os.getenv('TWITTER_API_KEY')
@@ -20,17 +30,140 @@ EMAIL_SMTP_PORT = int(os.getenv('EMAIL_SMTP_PORT', '587'))
 EMAIL_USERNAME = os.getenv('EMAIL_USERNAME')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_RECIPIENT = os.getenv('EMAIL_RECIPIENT')
+EMAIL_SMTP_STARTTLS = os.getenv('EMAIL_SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes')
 
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_MESSAGES_PER_MINUTE = int(os.getenv('TELEGRAM_MESSAGES_PER_MINUTE', '20'))
+TELEGRAM_CONCURRENCY = int(os.getenv('TELEGRAM_CONCURRENCY', '4'))
+
+# Notifications go through a durable outbox (notification_deliveries).
+# Failed sends are retried after NOTIFICATION_BACKOFF_SECONDS, doubling
+# each time, up to NOTIFICATION_MAX_ATTEMPTS attempts. Opportunities not
+# notified within NOTIFICATION_MAX_AGE_HOURS of being found are skipped.
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '6'))
+NOTIFICATION_BACKOFF_SECONDS = float(os.getenv('NOTIFICATION_BACKOFF_SECONDS', '30'))
+NOTIFICATION_MAX_AGE_HOURS = float(os.getenv('NOTIFICATION_MAX_AGE_HOURS', '24'))
+
+# The default weights add up to 70 at most
+MIN_CONFIDENCE_SCORE = float(os.getenv('MIN_CONFIDENCE_SCORE', '70.0'))
+
+# Confidence score weights, as JSON ({"weights": {...}, "bias": 0}); the
+# defaults reproduce the original score. RESCORE_ON_STARTUP recomputes the
+# scores of stored opportunities, e.g. after the weights change.
+SCORING_WEIGHTS_PATH = os.getenv('SCORING_WEIGHTS_PATH', '')
+RESCORE_ON_STARTUP = os.getenv('RESCORE_ON_STARTUP', 'false').lower() in ('1', 'true', 'yes')
+
+# Per-author stats are kept in author_stats and in memory. Tweets by
+# blacklisted accounts are always dropped; MIN_AUTHOR_REPUTATION (0
+# disables it) also drops authors whose reputation fell below it after
+# at least MIN_AUTHOR_TWEETS of their tweets were seen.
+MIN_AUTHOR_REPUTATION = float(os.getenv('MIN_AUTHOR_REPUTATION', '0'))
+MIN_AUTHOR_TWEETS = int(os.getenv('MIN_AUTHOR_TWEETS', '20'))
 
-MIN_CONFIDENCE_SCORE = float(os.getenv('MIN_CONFIDENCE_SCORE', '80.0'))
 CHECK_INTERVAL_MINUTES = int(os.getenv('CHECK_INTERVAL_MINUTES', '30'))
 
+# Service mode runs every cycle on one event loop and keeps clients and
+# connections open between cycles. Its interval can go below a minute.
+SERVICE_MODE = os.getenv('SERVICE_MODE', 'false').lower() in ('1', 'true', 'yes')
+CHECK_INTERVAL_SECONDS = float(os.getenv('CHECK_INTERVAL_SECONDS', str(CHECK_INTERVAL_MINUTES * 60)))
+
+EXTRACTION_BATCH_SIZE = int(os.getenv('EXTRACTION_BATCH_SIZE', '64'))
+EXTRACTION_PROCESSES = int(os.getenv('EXTRACTION_PROCESSES', '1'))
+
+# Reuse extraction results for tweets with identical text (0 disables the
+# cache); EXTRACTION_CACHE_PATH adds an SQLite tier that survives restarts
+EXTRACTION_CACHE_SIZE = int(os.getenv('EXTRACTION_CACHE_SIZE', '50000'))
+EXTRACTION_CACHE_TTL_HOURS = float(os.getenv('EXTRACTION_CACHE_TTL_HOURS', '24'))
+EXTRACTION_CACHE_PATH = os.getenv('EXTRACTION_CACHE_PATH', '')
+
+# Fetch accounts and queries concurrently instead of one after another
+ASYNC_FETCH = os.getenv('ASYNC_FETCH', 'false').lower() in ('1', 'true', 'yes')
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '8'))
+
+# Load the spaCy model in the background right after startup instead of
+# on the first cycle that has tweets to extract
+WARM_UP_MODELS = os.getenv('WARM_UP_MODELS', 'false').lower() in ('1', 'true', 'yes')
+
+# Fetch and extract in SHARD_WORKERS worker processes (0 or 1 disables
+# sharding). Accounts and queries are spread over the workers by consistent
+# hashing, and this process is the only one writing to the database.
+# SIGTTIN adds a worker and SIGTTOU removes one. Implies service mode.
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', '0'))
+
+# Stream each source's tweets through extract, persist and notify as soon
+# as it is fetched, instead of finishing each stage for the whole cycle
+STREAMING_PIPELINE = os.getenv('STREAMING_PIPELINE', 'false').lower() in ('1', 'true', 'yes')
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+
+# Number of recent tweet IDs kept in memory for dedup (0 disables the cache)
+SEEN_CACHE_SIZE = int(os.getenv('SEEN_CACHE_SIZE', '100000'))
+
+# Collapse reworded copies of the same announcement into one cluster before
+# extraction; the index is kept in memory and appended to NEAR_DUPLICATE_INDEX_PATH
+NEAR_DUPLICATE_CLUSTERING = os.getenv('NEAR_DUPLICATE_CLUSTERING', 'false').lower() in ('1', 'true', 'yes')
+NEAR_DUPLICATE_INDEX_PATH = os.getenv('NEAR_DUPLICATE_INDEX_PATH', 'near_duplicates.log')
+
+# Merge opportunities for the same project/token instead of storing and
+# notifying one per tweet; only new or materially updated ones are notified
+OPPORTUNITY_MERGE = os.getenv('OPPORTUNITY_MERGE', 'true').lower() in ('1', 'true', 'yes')
+MERGE_WINDOW_DAYS = int(os.getenv('MERGE_WINDOW_DAYS', '30'))
+
+# SQLite tuning: OFF, NORMAL or FULL; NORMAL is safe with WAL journaling
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_CACHE_SIZE_MB = int(os.getenv('SQLITE_CACHE_SIZE_MB', '64'))
+SQLITE_MMAP_SIZE_MB = int(os.getenv('SQLITE_MMAP_SIZE_MB', '256'))
+
+# Retention: text of non-opportunity tweets older than TEXT_RETENTION_DAYS
+# moves to gzip archives; TOMBSTONE_RETENTION_DAYS (0 keeps them forever,
+# otherwise at least the 7-day fetch window) deletes the remaining ID rows
+# once they are no longer needed for dedup
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+TEXT_RETENTION_DAYS = int(os.getenv('TEXT_RETENTION_DAYS', '7'))
+TOMBSTONE_RETENTION_DAYS = int(os.getenv('TOMBSTONE_RETENTION_DAYS', '14'))
+RETENTION_INTERVAL_HOURS = int(os.getenv('RETENTION_INTERVAL_HOURS', '24'))
+
+# Prometheus metrics on /metrics and a liveness check on /health (0
+# disables them). /health answers 503 once no cycle has succeeded for
+# HEALTH_STALE_AFTER_SECONDS, three check intervals by default.
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+HEALTH_STALE_AFTER_SECONDS = float(os.getenv('HEALTH_STALE_AFTER_SECONDS', str(CHECK_INTERVAL_SECONDS * 3)))
+
+# Read-only opportunity API and dashboard (0 disables it); serves the
+# same database from its own connections, so cycles are never blocked
+API_PORT = int(os.getenv('API_PORT', '0'))
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', '1024'))
+
+# Profile the first cycle with cProfile and write the stats here; in
+# service mode, SIGUSR1 profiles the next cycle as well
+PROFILE_CYCLE_PATH = os.getenv('PROFILE_CYCLE_PATH', '')
+
 # Initialize database
-engine = init_db()
+engine = init_db(
+    synchronous=SQLITE_SYNCHRONOUS,
+    cache_size_mb=SQLITE_CACHE_SIZE_MB,
+    mmap_size_mb=SQLITE_MMAP_SIZE_MB
+)
 Session = sessionmaker(bind=engine)
 
+seen_cache = SeenTweetCache(SEEN_CACHE_SIZE) if SEEN_CACHE_SIZE > 0 else None
+scorer = ScoringEngine.from_file(SCORING_WEIGHTS_PATH) if SCORING_WEIGHTS_PATH else ScoringEngine()
+reputation = AuthorReputation(min_reputation=MIN_AUTHOR_REPUTATION, min_tweets=MIN_AUTHOR_TWEETS)
+near_duplicates = None
+opportunity_index = OpportunityIndex(
+    min_confidence=MIN_CONFIDENCE_SCORE,
+    window_days=MERGE_WINDOW_DAYS
+) if OPPORTUNITY_MERGE else None
+extraction_cache = ExtractionCache(
+    max_entries=EXTRACTION_CACHE_SIZE,
+    ttl_seconds=EXTRACTION_CACHE_TTL_HOURS * 3600,
+    path=EXTRACTION_CACHE_PATH or None
+) if EXTRACTION_CACHE_SIZE > 0 else None
+health = CycleHealth(stale_after=HEALTH_STALE_AFTER_SECONDS)
+profile_next_cycle = bool(PROFILE_CYCLE_PATH)
+
 def setup_initial_accounts(session):
     """Set up initial trusted Twitter accounts if none exist."""
     if session.query(TwitterAccount).count() == 0:
@@ -42,19 +175,37 @@ def setup_initial_accounts(session):
         session.add_all(initial_accounts)
         session.commit()
 
-async def process_tweets():
-    """Main function to process tweets and send notifications."""
-    try:
-        # Create new session
-        session = Session()
+class MonitorClients:
+    """Twitter and notification clients used by a processing cycle.
+    
+    The scheduler builds a fresh set for every cycle, while service mode
+    builds one set at startup (with persistent connections) and reuses it.
+    """
+    
+    def __init__(self, keep_alive: bool = False):
+        # Client libraries are imported here rather than at module level so
+        # startup only pays for the ones that are configured
+        from notifications import EmailNotifier, TelegramNotifier, NotificationManager
         
-        # Initialize clients
-        twitter_client = TwitterClient(
-            TWITTER_API_KEY,
-            TWITTER_API_SECRET,
-            TWITTER_ACCESS_TOKEN,
-            TWITTER_ACCESS_TOKEN_SECRET
-        )
+        self.fetcher = None
+        self.twitter_client = None
+        self._sync_fetch_lock = asyncio.Lock()
+        if ASYNC_FETCH:
+            from async_fetch import AsyncTwitterFetcher
+            self.fetcher = AsyncTwitterFetcher(
+                TWITTER_API_KEY,
+                TWITTER_API_SECRET,
+                TWITTER_ACCESS_TOKEN,
+                TWITTER_ACCESS_TOKEN_SECRET,
+                max_concurrency=FETCH_CONCURRENCY
+            )
+        else:
+            self.twitter_client = TwitterClient(
+                TWITTER_API_KEY,
+                TWITTER_API_SECRET,
+                TWITTER_ACCESS_TOKEN,
+                TWITTER_ACCESS_TOKEN_SECRET
+            )
         
         # Set up notifiers
         email_notifier = None
@@ -63,60 +214,298 @@ async def process_tweets():
                 EMAIL_SMTP_SERVER,
                 EMAIL_SMTP_PORT,
                 EMAIL_USERNAME,
-                EMAIL_PASSWORD
+                EMAIL_PASSWORD,
+                keep_alive=keep_alive,
+                starttls=EMAIL_SMTP_STARTTLS
             )
         
         telegram_notifier = None
         if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
             telegram_notifier = TelegramNotifier(
                 TELEGRAM_BOT_TOKEN,
-                TELEGRAM_CHAT_ID
+                TELEGRAM_CHAT_ID,
+                connection_pool_size=TELEGRAM_CONCURRENCY,
+                messages_per_minute=TELEGRAM_MESSAGES_PER_MINUTE
             )
         
-        notification_manager = NotificationManager(
+        self.notification_manager = NotificationManager(
             email_notifier=email_notifier,
             telegram_notifier=telegram_notifier,
             min_confidence=MIN_CONFIDENCE_SCORE
         )
+        self.outbox = Outbox(
+            self.notification_manager,
+            email_recipient=EMAIL_RECIPIENT,
+            min_confidence=MIN_CONFIDENCE_SCORE,
+            max_age_hours=NOTIFICATION_MAX_AGE_HOURS,
+            max_attempts=NOTIFICATION_MAX_ATTEMPTS,
+            backoff_seconds=NOTIFICATION_BACKOFF_SECONDS
+        )
+    
+    async def start(self):
+        """Open long-lived connections up front."""
+        telegram_notifier = self.notification_manager.telegram_notifier
+        if telegram_notifier:
+            try:
+                await telegram_notifier.initialize()
+            except Exception as e:
+                print(f"Failed to initialize Telegram bot: {str(e)}")
+    
+    async def fetch_source(self, source_type: str, source: str, since_id: str = None) -> List:
+        """Fetch raw tweets for one account or search query."""
+        if self.fetcher:
+            _, _, tweets = await self.fetcher.fetch_source(source_type, source, since_id=since_id)
+            return tweets
+        # tweepy is blocking and not thread safe; run one request at a time off the loop
+        async with self._sync_fetch_lock:
+            if source_type == 'account':
+                return await asyncio.to_thread(self.twitter_client.get_user_tweets, source, since_id)
+            return await asyncio.to_thread(self.twitter_client.search_tweets, source, since_id)
+    
+    async def fetch_new_tweets(self, session) -> List[TweetRecord]:
+        """Fetch new tweets with whichever Twitter client is configured."""
+        if self.fetcher:
+            from async_fetch import fetch_new_tweets_async
+            return await fetch_new_tweets_async(self.fetcher, session, seen_cache=seen_cache,
+                                                reputation=reputation)
+        return fetch_new_tweets(self.twitter_client, session, seen_cache=seen_cache,
+                                reputation=reputation)
+    
+    async def close(self):
+        """Close every connection held by the clients."""
+        if self.fetcher:
+            await self.fetcher.aclose()
+        await self.notification_manager.close()
+
+async def process_tweets(clients: MonitorClients = None):
+    """Main function to process tweets and send notifications."""
+    owns_clients = clients is None
+    session = Session()
+    start = time.perf_counter()
+    error = None
+    try:
+        # Initialize clients unless long-lived ones were passed in
+        if owns_clients:
+            clients = MonitorClients()
         
-        # Fetch and process new tweets
-        new_tweets = fetch_new_tweets(twitter_client, session)
+        if STREAMING_PIPELINE:
+            pipeline = StreamingPipeline(
+                session,
+                clients.fetch_source,
+                clients.outbox,
+                seen_cache=seen_cache,
+                min_confidence=MIN_CONFIDENCE_SCORE,
+                queue_size=PIPELINE_QUEUE_SIZE,
+                batch_size=EXTRACTION_BATCH_SIZE,
+                n_process=EXTRACTION_PROCESSES,
+                near_duplicates=near_duplicates,
+                opportunity_index=opportunity_index,
+                extraction_cache=extraction_cache,
+                scorer=scorer,
+                reputation=reputation
+            )
+            metrics = await pipeline.run()
+            print(f"Authors: {reputation.stats}")
+            print(f"Pre-filter: {pipeline.prefilter.stats}")
+            print(metrics.summary())
+            if extraction_cache is not None:
+                print(f"Extraction cache: {extraction_cache.stats}, hit rate {extraction_cache.hit_rate():.0%}")
+            # Retries that came due while no new batch needed notifying
+            await clients.outbox.deliver(session)
+            print(f"Outbox: {clients.outbox.stats}")
+            return
         
-        # Extract airdrop information
-        opportunities = []
-        for tweet in new_tweets:
-            opportunity = extract_airdrop_info(tweet)
-            if opportunity:
-                opportunities.append(opportunity)
-                session.add(opportunity)
-            session.add(tweet)
+        # Fetch and process new tweets
+        with METRICS.timer('airdrop_stage_seconds', stage='fetch'):
+            reputation.refresh_accounts(session)
+            new_tweets = await clients.fetch_new_tweets(session)
+        print(f"Authors: {reputation.stats}")
         
-        # Commit new tweets and opportunities to database
-        session.commit()
+        with METRICS.timer('airdrop_stage_seconds', stage='extract'):
+            # Only extract one tweet per cluster of near-duplicates
+            candidates = new_tweets
+            if near_duplicates is not None:
+                candidates = near_duplicates.collapse(new_tweets)
+                print(f"Near-duplicates: {len(new_tweets) - len(candidates)} of {len(new_tweets)} tweets collapsed")
+            
+            # Skip spaCy for tweets that could never be notified on
+            prefilter = PreFilter(min_confidence=MIN_CONFIDENCE_SCORE, scorer=scorer)
+            candidates = prefilter.filter(candidates)
+            print(f"Pre-filter: {prefilter.stats}")
+            
+            # Extract airdrop information
+            opportunities = extract_airdrop_info_batch(
+                candidates,
+                batch_size=EXTRACTION_BATCH_SIZE,
+                n_process=EXTRACTION_PROCESSES,
+                cache=extraction_cache,
+                scorer=scorer,
+                trusted_authors=reputation.trusted,
+                near_duplicates=near_duplicates,
+                reputation=reputation
+            )
+            if extraction_cache is not None:
+                print(f"Extraction cache: {extraction_cache.stats}, hit rate {extraction_cache.hit_rate():.0%}")
         
-        # Send notifications
-        if opportunities:
-            await notification_manager.notify(opportunities, EMAIL_RECIPIENT)
+        with METRICS.timer('airdrop_stage_seconds', stage='persist'):
+            if near_duplicates is not None:
+                near_duplicates.refresh_cluster_sizes(session, new_tweets)
+            
+            # Fold repeat announcements into the opportunity they describe
+            if opportunity_index is not None:
+                merge = opportunity_index.merge(opportunities, session)
+                bulk_save(session, new_tweets, merge.new)
+                merge.save(session)
+                print(f"Opportunities: {len(merge.new)} new, {len(merge.sources)} merged, "
+                      f"{len(merge.to_notify)} to notify")
+            else:
+                bulk_save(session, new_tweets, opportunities)
+            reputation.record_batch(session, new_tweets, opportunities)
+            clients.outbox.enqueue(session)
+            
+            # Commit new tweets, opportunities and queued notifications to database
+            with METRICS.timer('airdrop_db_commit_seconds'):
+                session.commit()
+            if near_duplicates is not None:
+                near_duplicates.save()
+            if seen_cache is not None:
+                seen_cache.add_many(tweet.tweet_id for tweet in new_tweets)
         
+        # Send queued notifications, including retries that are due
+        with METRICS.timer('airdrop_stage_seconds', stage='notify'):
+            await clients.outbox.deliver(session)
+        print(f"Outbox: {clients.outbox.stats}")
+    
     except Exception as e:
+        error = e
         print(f"Error in process_tweets: {str(e)}")
+    finally:
+        health.record(time.perf_counter() - start, error)
+        session.close()
+        if owns_clients and clients is not None:
+            await clients.close()
+
+async def run_cycle(clients: MonitorClients = None):
+    """Run process_tweets, under cProfile when a profile was asked for."""
+    global profile_next_cycle
+    if not profile_next_cycle:
+        await process_tweets(clients)
+        return
+    profile_next_cycle = False
+    with profiled(PROFILE_CYCLE_PATH or 'cycle.prof'):
+        await process_tweets(clients)
+
+def request_profile():
+    """Profile the next cycle (SIGUSR1 in service mode)."""
+    global profile_next_cycle
+    profile_next_cycle = True
+    print(f"Profiling the next cycle into {PROFILE_CYCLE_PATH or 'cycle.prof'}")
+
+async def process_sharded(coordinator, clients: MonitorClients):
+    """Run one cycle on the shard workers, writing their results from this process."""
+    from sharding import IngestWriter
+    
+    session = Session()
+    start = time.perf_counter()
+    error = None
+    try:
+        writer = IngestWriter(
+            session,
+            clients.outbox,
+            seen_cache=seen_cache,
+            opportunity_index=opportunity_index,
+            reputation=reputation
+        )
+        stats = await coordinator.run_cycle(writer)
+        print(f"Shards: {len(coordinator.ring)} workers, {stats}, {coordinator.stats}")
+        # Retries that came due while no new batch needed notifying
+        with METRICS.timer('airdrop_stage_seconds', stage='notify'):
+            await clients.outbox.deliver(session)
+        print(f"Outbox: {clients.outbox.stats}")
+    except Exception as e:
+        error = e
+        print(f"Error in process_sharded: {str(e)}")
+    finally:
+        health.record(time.perf_counter() - start, error)
+        session.close()
+
+def run_retention_job():
+    """Archive old tweet text, prune tombstones and vacuum the database.
+    
+    Also drops expired entries from the on-disk extraction cache.
+    """
+    session = Session()
+    try:
+        run_retention(
+            engine,
+            session,
+            ARCHIVE_DIR,
+            text_retention_days=TEXT_RETENTION_DAYS,
+            tombstone_retention_days=TOMBSTONE_RETENTION_DAYS
+        )
+        if extraction_cache is not None:
+            extraction_cache.prune()
+    except Exception as e:
+        print(f"Error in retention: {str(e)}")
     finally:
         session.close()
 
+def initialize():
+    """Initialize database and accounts."""
+    global near_duplicates
+    max_score = scorer.max_possible_score({})
+    if MIN_CONFIDENCE_SCORE > max_score:
+        print(f"WARNING: MIN_CONFIDENCE_SCORE is {MIN_CONFIDENCE_SCORE:g} but the scoring weights "
+              f"give at most {max_score:g}; every tweet will be skipped and nothing notified")
+    
+    session = Session()
+    setup_initial_accounts(session)
+    reputation.warm(session)
+    print(f"Loaded reputation for {len(reputation)} authors")
+    if RESCORE_ON_STARTUP:
+        rescored = rescore_opportunities(session, scorer, reputation=reputation)
+        session.commit()
+        print(f"Re-scored {rescored} opportunities")
+    if seen_cache is not None:
+        seen_cache.warm(session)
+    if opportunity_index is not None:
+        opportunity_index.warm(session)
+    session.close()
+    
+    if RETENTION_INTERVAL_HOURS > 0:
+        # Retention's vacuum only returns space once this has run
+        enable_incremental_vacuum(engine)
+    
+    if NEAR_DUPLICATE_CLUSTERING:
+        near_duplicates = NearDuplicateIndex.load(NEAR_DUPLICATE_INDEX_PATH)
+        print(f"Loaded {len(near_duplicates)} near-duplicate signatures")
+    
+    if WARM_UP_MODELS:
+        warm_up_in_background()
+    
+    if METRICS_PORT > 0:
+        start_http_server(METRICS_HOST, METRICS_PORT, health)
+        print(f"Serving /metrics and /health on {METRICS_HOST}:{METRICS_PORT}")
+    
+    if API_PORT > 0:
+        # Imported here so the monitor doesn't load Flask unless the API is on
+        from api import start_api_server
+        start_api_server(API_HOST, API_PORT, engine.url.render_as_string(hide_password=False), API_CACHE_SIZE)
+        print(f"Serving the opportunity API and dashboard on http://{API_HOST}:{API_PORT}/")
+
 def run_scheduler():
     """Run the scheduler to periodically check for new tweets."""
     async def schedule_task():
-        await process_tweets()
+        await run_cycle()
     
     # Schedule the task
     schedule.every(CHECK_INTERVAL_MINUTES).minutes.do(
         lambda: asyncio.run(schedule_task())
     )
+    if RETENTION_INTERVAL_HOURS > 0:
+        schedule.every(RETENTION_INTERVAL_HOURS).hours.do(run_retention_job)
     
-    # Initialize database and accounts
-    session = Session()
-    setup_initial_accounts(session)
-    session.close()
+    initialize()
     
     print(f"Starting airdrop monitor. Checking every {CHECK_INTERVAL_MINUTES} minutes...")
     
@@ -125,5 +514,104 @@ def run_scheduler():
         schedule.run_pending()
         time.sleep(1)
 
+async def run_service():
+    """Run cycles on one long-lived event loop, reusing clients between them."""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Not available on Windows; Ctrl+C still cancels the loop
+            pass
+    if hasattr(signal, 'SIGUSR1'):
+        loop.add_signal_handler(signal.SIGUSR1, request_profile)
+    
+    initialize()
+    clients = MonitorClients(keep_alive=True)
+    await clients.start()
+    
+    print(f"Starting airdrop monitor service. Checking every {CHECK_INTERVAL_SECONDS:g} seconds...")
+    
+    last_retention = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            await run_cycle(clients)
+            if (RETENTION_INTERVAL_HOURS > 0
+                    and time.monotonic() - last_retention >= RETENTION_INTERVAL_HOURS * 3600):
+                await asyncio.to_thread(run_retention_job)
+                last_retention = time.monotonic()
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=CHECK_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        print("Shutting down airdrop monitor...")
+        await clients.close()
+        if extraction_cache is not None:
+            extraction_cache.close()
+        engine.dispose()
+
+async def run_sharded():
+    """Run cycles as a coordinator of SHARD_WORKERS fetch-and-extract processes."""
+    from sharding import ShardCoordinator, WorkerConfig
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    initialize()
+    if near_duplicates is not None:
+        print("Near-duplicate clustering is not available with SHARD_WORKERS; it is off")
+    coordinator = ShardCoordinator(WorkerConfig(
+        engine.url.render_as_string(hide_password=False),
+        (TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET),
+        async_fetch=ASYNC_FETCH,
+        fetch_concurrency=FETCH_CONCURRENCY,
+        min_confidence=MIN_CONFIDENCE_SCORE,
+        scoring_weights_path=SCORING_WEIGHTS_PATH,
+        min_author_reputation=MIN_AUTHOR_REPUTATION,
+        min_author_tweets=MIN_AUTHOR_TWEETS,
+        batch_size=EXTRACTION_BATCH_SIZE,
+        seen_cache_size=SEEN_CACHE_SIZE,
+        extraction_cache_size=EXTRACTION_CACHE_SIZE,
+        extraction_cache_ttl_hours=EXTRACTION_CACHE_TTL_HOURS
+    ), SHARD_WORKERS)
+    loop.add_signal_handler(signal.SIGTTIN, lambda: coordinator.scale(coordinator.target_workers + 1))
+    loop.add_signal_handler(signal.SIGTTOU, lambda: coordinator.scale(coordinator.target_workers - 1))
+    
+    print(f"Starting {SHARD_WORKERS} shard workers...")
+    await asyncio.to_thread(coordinator.start)
+    clients = MonitorClients(keep_alive=True)
+    await clients.start()
+    
+    print(f"Starting airdrop monitor coordinator. Checking every {CHECK_INTERVAL_SECONDS:g} seconds...")
+    
+    last_retention = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            await process_sharded(coordinator, clients)
+            if (RETENTION_INTERVAL_HOURS > 0
+                    and time.monotonic() - last_retention >= RETENTION_INTERVAL_HOURS * 3600):
+                await asyncio.to_thread(run_retention_job)
+                last_retention = time.monotonic()
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=CHECK_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        print("Shutting down airdrop monitor...")
+        await asyncio.to_thread(coordinator.stop)
+        await clients.close()
+        if extraction_cache is not None:
+            extraction_cache.close()
+        engine.dispose()
+
 if __name__ == "__main__":
-    run_scheduler() 
\ No newline at end of file
+    if SHARD_WORKERS > 1:
+        asyncio.run(run_sharded())
+    elif SERVICE_MODE:
+        asyncio.run(run_service())
+    else:
+        run_scheduler() 
\ No newline at end of file
@@ -0,0 +1,188 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+# Every metric the monitor records, with its Prometheus HELP text
+DESCRIPTIONS = {
+    'airdrop_cycles_total': 'Processing cycles, by outcome',
+    'airdrop_cycle_seconds': 'Wall time of whole processing cycles',
+    'airdrop_stage_seconds': 'Time per cycle stage: fetch, extract, persist, notify',
+    'airdrop_fetch_seconds': 'Time per Twitter request, by source type',
+    'airdrop_filter_seconds': 'Time in filter_tweets (age, author and dedup checks)',
+    'airdrop_prefilter_seconds': 'Time in the regex pre-filter before spaCy',
+    'airdrop_extract_step_seconds': 'Extraction time per step; the count is tweets',
+    'airdrop_db_commit_seconds': 'Time per database commit',
+    'airdrop_notify_seconds': 'Time per notification channel send',
+    'airdrop_tweets_total': 'Tweets fetched, new after filter_tweets, and extracted',
+    'airdrop_opportunities_total': 'Opportunities extracted',
+    'airdrop_notifications_total': 'Notification messages, by channel and outcome',
+    'airdrop_last_cycle_timestamp_seconds': 'Unix time the last cycle finished',
+}
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict[str, str]) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + '}'
+
+class Metrics:
+    """Thread-safe counters, gauges and timers in the Prometheus text format.
+    
+    Timers are summaries without quantiles: a count and a sum of seconds,
+    so rates and averages come from the scraper.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Key, float] = {}
+        self.gauges: Dict[Key, float] = {}
+        self.timers: Dict[Key, list] = {}  # [count, sum]
+    
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+    
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+    
+    def observe(self, name: str, seconds: float, count: int = 1, **labels):
+        """Add seconds spent on count events to a timer."""
+        key = _key(name, labels)
+        with self._lock:
+            timer = self.timers.setdefault(key, [0, 0.0])
+            timer[0] += count
+            timer[1] += seconds
+    
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+    
+    def timed(self, name: str, **labels):
+        """Decorator that times every call of a function."""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            timers = {key: list(value) for key, value in self.timers.items()}
+        
+        lines = []
+        for kind, values in (('counter', counters), ('gauge', gauges), ('summary', timers)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric != name:
+                        continue
+                    if kind == 'summary':
+                        lines.append(f"{name}_count{_format_labels(labels)} {value[0]}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {value[1]:.6f}")
+                    else:
+                        lines.append(f"{name}{_format_labels(labels)} {value:.17g}")
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics()
+
+class CycleHealth:
+    """When cycles last started, succeeded and failed, for /health."""
+    
+    def __init__(self, stale_after: float):
+        self.stale_after = stale_after
+        self.started_at = time.time()
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+    
+    def record(self, seconds: float, error: Optional[Exception] = None):
+        """Record a finished cycle in the health state and the cycle metrics."""
+        now = time.time()
+        METRICS.observe('airdrop_cycle_seconds', seconds)
+        METRICS.inc('airdrop_cycles_total', outcome='error' if error else 'ok')
+        METRICS.set('airdrop_last_cycle_timestamp_seconds', now)
+        if error is None:
+            self.last_success = now
+        else:
+            self.last_error = f"{type(error).__name__}: {error}"
+            self.last_error_at = now
+    
+    def status(self) -> Tuple[bool, Dict]:
+        """Whether a cycle succeeded within stale_after seconds (or since startup), and details."""
+        now = time.time()
+        healthy = now - (self.last_success or self.started_at) <= self.stale_after
+        return healthy, {
+            'status': 'ok' if healthy else 'stale',
+            'uptime_seconds': round(now - self.started_at, 1),
+            'last_success_age_seconds': round(now - self.last_success, 1) if self.last_success else None,
+            'last_error': self.last_error,
+            'last_error_age_seconds': round(now - self.last_error_at, 1) if self.last_error_at else None,
+        }
+
+def create_app(health: CycleHealth, metrics: Metrics = METRICS):
+    """Flask app serving /metrics and /health."""
+    # Imported here so the monitor only pays for Flask when the endpoint is on
+    from flask import Flask, Response, jsonify
+    
+    app = Flask(__name__)
+    
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    
+    @app.route('/health')
+    def health_endpoint():
+        healthy, details = health.status()
+        return jsonify(details), 200 if healthy else 503
+    
+    return app
+
+def start_http_server(host: str, port: int, health: CycleHealth):
+    """Serve create_app from a daemon thread; returns the server."""
+    from werkzeug.serving import make_server
+    
+    server = make_server(host, port, create_app(health), threaded=True)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+@contextmanager
+def profiled(path: str, top: int = 25):
+    """Run the block under cProfile, dump the stats to path and print the top entries.
+    
+    Only code on the calling thread is profiled; work handed to threads
+    (asyncio.to_thread, executors) shows up as time waiting for it.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        print(f"Cycle profile written to {path}\n{out.getvalue()}")
@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, create_engine
+from sqlalchemy import (Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index,
+                        UniqueConstraint, create_engine, event, func, insert, inspect, select)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship
 from datetime import datetime
+from typing import Callable, Dict, List, Optional
 
 Base = declarative_base()
 
@@ -19,19 +23,30 @@ class ProcessedTweet(Base):
     
     id = Column(Integer, primary_key=True)
     tweet_id = Column(String, unique=True, nullable=False)
-    author_id = Column(String, nullable=False)
+    author_id = Column(String, nullable=False, index=True)
+    author_username = Column(String)
     text = Column(String)
     processed_text = Column(String)
     created_at = Column(DateTime)
-    processed_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, default=datetime.utcnow, index=True)
     is_retweet = Column(Boolean, default=False)
     is_reply = Column(Boolean, default=False)
+    cluster_id = Column(String, index=True)  # tweet_id of the first near-duplicate
 
 class AirdropOpportunity(Base):
     __tablename__ = 'airdrop_opportunities'
+    __table_args__ = (
+        # Unnotified opportunities above a confidence threshold
+        Index('ix_airdrop_opportunities_notified_confidence', 'notified', 'confidence_score'),
+        # Recent opportunities for a project
+        Index('ix_airdrop_opportunities_project_created', 'project_name', 'created_at'),
+        # Keyset pages in api.py: by deadline, and by confidence
+        Index('ix_airdrop_opportunities_deadline_id', 'deadline', 'id'),
+        Index('ix_airdrop_opportunities_confidence_id', 'confidence_score', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
-    tweet_id = Column(String, ForeignKey('processed_tweets.tweet_id'))
+    tweet_id = Column(String, ForeignKey('processed_tweets.tweet_id'), index=True)
     project_name = Column(String)
     token_symbol = Column(String)
     description = Column(String)
@@ -39,13 +54,290 @@ class AirdropOpportunity(Base):
     participation_steps = Column(String)
     tweet_url = Column(String)
     confidence_score = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     notified = Column(Boolean, default=False)
+    cluster_size = Column(Integer, default=1)  # near-duplicate tweets seen for it
+    source_count = Column(Integer, default=1)  # tweets merged into it, see opportunity_sources
+    updated_at = Column(DateTime)  # last material update after it was first stored
     
     tweet = relationship("ProcessedTweet")
 
+# Case-insensitive project and token lookups in api.py, newest first
+Index('ix_airdrop_opportunities_project_key_id',
+      func.lower(AirdropOpportunity.project_name), AirdropOpportunity.id)
+Index('ix_airdrop_opportunities_token_key_id',
+      func.lower(AirdropOpportunity.token_symbol), AirdropOpportunity.id)
+
+class OpportunitySource(Base):
+    __tablename__ = 'opportunity_sources'
+    __table_args__ = (UniqueConstraint('opportunity_id', 'tweet_id'),)
+    
+    id = Column(Integer, primary_key=True)
+    opportunity_id = Column(Integer, ForeignKey('airdrop_opportunities.id'), nullable=False)
+    tweet_id = Column(String, ForeignKey('processed_tweets.tweet_id'), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# One opportunity queued for one notification channel, and its delivery attempts
+class NotificationDelivery(Base):
+    __tablename__ = 'notification_deliveries'
+    __table_args__ = (
+        # Due deliveries, see outbox.Outbox.deliver
+        Index('ix_notification_deliveries_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    opportunity_id = Column(Integer, ForeignKey('airdrop_opportunities.id'), nullable=False, index=True)
+    channel = Column(String, nullable=False)  # 'email' or 'telegram'
+    status = Column(String, default='pending')  # 'pending', 'sent' or 'failed' (gave up)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+class AuthorStats(Base):
+    __tablename__ = 'author_stats'
+    
+    id = Column(Integer, primary_key=True)
+    author_id = Column(String, unique=True, nullable=False)
+    author_username = Column(String)
+    tweets_seen = Column(Integer, default=0)
+    opportunities = Column(Integer, default=0)  # opportunities extracted from their tweets
+    confidence_total = Column(Float, default=0.0)  # sum of those confidence scores
+    spam_hits = Column(Integer, default=0)  # tweets with at least one spam keyword
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class FetchCursor(Base):
+    __tablename__ = 'fetch_cursors'
+    __table_args__ = (UniqueConstraint('source_type', 'source'),)
+    
+    id = Column(Integer, primary_key=True)
+    source_type = Column(String, nullable=False)  # 'account' or 'query'
+    source = Column(String, nullable=False)  # username or search query
+    since_id = Column(String)  # highest tweet ID seen from this source
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Tweets and opportunities pass through filtering, extraction, scoring,
+# merging and notification as the plain records below, not as ORM
+# instances: they take less memory, are quicker to create and pickle, and
+# the session never tracks them. bulk_save turns them into rows.
+class TweetRecord:
+    """A new tweet on its way to processed_tweets."""
+    
+    __slots__ = ('tweet_id', 'author_id', 'author_username', 'text', 'processed_text',
+                 'created_at', 'processed_at', 'is_retweet', 'is_reply', 'cluster_id')
+    
+    def __init__(self, tweet_id: str, author_id: str, author_username: Optional[str] = None,
+                 text: Optional[str] = None, processed_text: Optional[str] = None,
+                 created_at: Optional[datetime] = None, processed_at: Optional[datetime] = None,
+                 is_retweet: bool = False, is_reply: bool = False, cluster_id: Optional[str] = None):
+        self.tweet_id = tweet_id
+        self.author_id = author_id
+        self.author_username = author_username
+        self.text = text
+        self.processed_text = processed_text
+        self.created_at = created_at
+        self.processed_at = processed_at
+        self.is_retweet = is_retweet
+        self.is_reply = is_reply
+        self.cluster_id = cluster_id
+
+class OpportunityRecord:
+    """An extracted opportunity, or a copy of an airdrop_opportunities row.
+    
+    id is None until bulk_save inserts it. Columns left None get their
+    defaults when inserted, as with the ORM class.
+    """
+    
+    __slots__ = ('id', 'tweet_id', 'project_name', 'token_symbol', 'description', 'deadline',
+                 'participation_steps', 'tweet_url', 'confidence_score', 'created_at', 'notified',
+                 'cluster_size', 'source_count', 'updated_at')
+    
+    def __init__(self, id: Optional[int] = None, tweet_id: Optional[str] = None,
+                 project_name: Optional[str] = None, token_symbol: Optional[str] = None,
+                 description: Optional[str] = None, deadline: Optional[datetime] = None,
+                 participation_steps: Optional[str] = None, tweet_url: Optional[str] = None,
+                 confidence_score: Optional[float] = None, created_at: Optional[datetime] = None,
+                 notified: Optional[bool] = None, cluster_size: Optional[int] = None,
+                 source_count: Optional[int] = None, updated_at: Optional[datetime] = None):
+        self.id = id
+        self.tweet_id = tweet_id
+        self.project_name = project_name
+        self.token_symbol = token_symbol
+        self.description = description
+        self.deadline = deadline
+        self.participation_steps = participation_steps
+        self.tweet_url = tweet_url
+        self.confidence_score = confidence_score
+        self.created_at = created_at
+        self.notified = notified
+        self.cluster_size = cluster_size
+        self.source_count = source_count
+        self.updated_at = updated_at
+
+def load_opportunities(session, *criteria) -> List[OpportunityRecord]:
+    """Stored opportunities matching the criteria, by id, as OpportunityRecords."""
+    rows = session.execute(
+        select(AirdropOpportunity.__table__).where(*criteria).order_by(AirdropOpportunity.id)
+    )
+    return [OpportunityRecord(**row._mapping) for row in rows]
+
+# Rows per executemany batch in bulk_save
+BULK_INSERT_CHUNK_SIZE = 5000
+
+def _row(table, obj) -> Dict:
+    """Column values of a record (or ORM object) for a Core insert, with defaults applied."""
+    row = {}
+    for column in table.columns:
+        if column.primary_key:
+            continue
+        value = getattr(obj, column.key)
+        if value is None and column.default is not None:
+            value = column.default.arg(None) if column.default.is_callable else column.default.arg
+        row[column.key] = value
+    return row
+
+def bulk_save(session, tweets: List[TweetRecord], opportunities: List[OpportunityRecord]):
+    """Insert tweets and opportunities with executemany instead of session.add.
+    
+    This is where records become rows: Core inserts on the tables, so the
+    ORM's bulk machinery is skipped as well and nothing is added to the
+    session. Opportunities get their new primary keys assigned so callers
+    can still refer to them.
+    """
+    tweet_table = ProcessedTweet.__table__
+    opportunity_table = AirdropOpportunity.__table__
+    for i in range(0, len(tweets), BULK_INSERT_CHUNK_SIZE):
+        rows = [_row(tweet_table, tweet) for tweet in tweets[i:i + BULK_INSERT_CHUNK_SIZE]]
+        session.execute(insert(tweet_table), rows)
+    
+    for i in range(0, len(opportunities), BULK_INSERT_CHUNK_SIZE):
+        chunk = opportunities[i:i + BULK_INSERT_CHUNK_SIZE]
+        ids = session.execute(
+            insert(opportunity_table).returning(opportunity_table.c.id, sort_by_parameter_order=True),
+            [_row(opportunity_table, opportunity) for opportunity in chunk]
+        ).scalars().all()
+        for opportunity, opportunity_id in zip(chunk, ids):
+            opportunity.id = opportunity_id
+
+def after_commit(session, apply: Optional[Callable[[], None]] = None,
+                 undo: Optional[Callable[[], None]] = None):
+    """Call apply once the session's transaction commits, or undo if it ends any other way.
+    
+    For in-memory state that mirrors rows written in the transaction, so
+    it never keeps changes that were rolled back. Callbacks registered
+    before the transaction begins belong to the next one.
+    """
+    session.info.setdefault('after_commit', []).append((apply, undo))
+
+@event.listens_for(Session, 'after_commit')
+def _apply_after_commit(session):
+    for apply, _ in session.info.pop('after_commit', []):
+        if apply is not None:
+            apply()
+
+@event.listens_for(Session, 'after_transaction_end')
+def _undo_after_rollback(session, transaction):
+    # Also runs after a commit, when after_commit has already taken them
+    if transaction.parent is None:
+        for _, undo in reversed(session.info.pop('after_commit', [])):
+            if undo is not None:
+                undo()
+
+def add_missing_columns(engine):
+    """Add columns introduced after a table was created.
+    
+    create_all never alters existing tables. New columns are nullable with
+    Python-side defaults, so a plain ALTER TABLE ADD COLUMN is enough.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    )
+
+# SQLite FTS5 index over opportunity descriptions and tweet text, with the
+# opportunity id as rowid. Triggers keep it in step with the table; bulk_save
+# inserts a tweet before its opportunity, so the tweet text is there to copy.
+SEARCH_TABLE = 'opportunity_search'
+SEARCH_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON airdrop_opportunities BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, description, tweet_text)
+        VALUES (new.id, new.description, (SELECT text FROM processed_tweets WHERE tweet_id = new.tweet_id));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF description ON airdrop_opportunities
+    BEGIN
+        UPDATE {SEARCH_TABLE} SET description = new.description WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON airdrop_opportunities BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+]
+
+def create_search_index(engine) -> bool:
+    """Create the full-text index and its triggers, filling it from existing rows the first time.
+    
+    Returns False if SQLite was built without FTS5.
+    """
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+        ).first()
+        if exists is None:
+            try:
+                conn.exec_driver_sql(f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(description, tweet_text)')
+            except OperationalError:
+                return False
+            conn.exec_driver_sql(
+                f'INSERT INTO {SEARCH_TABLE}(rowid, description, tweet_text) '
+                f'SELECT o.id, o.description, t.text FROM airdrop_opportunities o '
+                f'LEFT JOIN processed_tweets t ON t.tweet_id = o.tweet_id'
+            )
+        for trigger in SEARCH_TRIGGERS:
+            conn.exec_driver_sql(trigger)
+    return True
+
 # Create engine and tables
-def init_db(db_url='sqlite:///airdrops.db'):
+def init_db(db_url='sqlite:///airdrops.db', synchronous: str = 'NORMAL',
+            cache_size_mb: int = 64, mmap_size_mb: int = 256):
+    """Create the engine and tables.
+    
+    SQLite connections are switched to WAL journaling, so readers don't block
+    the writer, with the given synchronous mode, page cache and mmap sizes.
+    """
     engine = create_engine(db_url)
+    
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # Only takes effect when the database file is created; see
+            # retention.enable_incremental_vacuum for existing databases
+            cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+            # Negative cache_size is in KiB
+            cursor.execute(f'PRAGMA cache_size={-cache_size_mb * 1024}')
+            cursor.execute(f'PRAGMA mmap_size={mmap_size_mb * 1024 * 1024}')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+            cursor.close()
+    
     Base.metadata.create_all(engine)
-    return engine 
\ No newline at end of file
+    add_missing_columns(engine)
+    
+    # create_all skips tables that already exist, so add any missing indexes.
+    # IF NOT EXISTS rather than checkfirst, which can't reflect expression indexes.
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+    
+    if engine.dialect.name == 'sqlite':
+        create_search_index(engine)
+    
+    return engine
@@ -0,0 +1,296 @@
+import hashlib
+import os
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import AirdropOpportunity, OpportunityRecord, TweetRecord, after_commit
+
+# MinHash over the tweet's set of words, split into 6 bands of 4 rows for
+# LSH. Pairs with Jaccard similarity 0.7 share a band ~81% of the time,
+# at 0.8 ~96%; candidates are then checked against THRESHOLD.
+NUM_PERM = 24
+BANDS = 6
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.7
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutations(count: int) -> List[Tuple[int, int]]:
+    # Fixed seeds so signatures stay comparable across restarts
+    params = []
+    for i in range(count):
+        digest = hashlib.blake2b(f'minhash-{i}'.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little') % _MERSENNE_PRIME or 1
+        b = int.from_bytes(digest[8:], 'little') % _MERSENNE_PRIME
+        params.append((a, b))
+    return params
+
+PERMUTATIONS = _permutations(NUM_PERM)
+
+WORD_PATTERN = re.compile(r'\w+')
+CASHTAG_PATTERN = re.compile(r'\$([a-z][a-z0-9]{1,9})\b', re.IGNORECASE)
+MENTION_PATTERN = re.compile(r'@(\w{1,15})')
+DOMAIN_PATTERN = re.compile(r'(?:https?://|\bwww\.)(?:www\.)?([^/\s?#]+)', re.IGNORECASE)
+# Capitalized or all-caps words, where project names usually are
+NAME_PATTERN = re.compile(r'\b[A-Z][A-Za-z0-9]{2,}')
+
+# Link shorteners and Twitter's own links say nothing about the project
+SHORTENER_DOMAINS = {'t.co', 'bit.ly', 'buff.ly', 'tinyurl.com', 'twitter.com', 'x.com'}
+# Capitalized words that start sentences or shout in any airdrop tweet
+ENTITY_STOPWORDS = {
+    'THE', 'AND', 'FOR', 'YOU', 'YOUR', 'OUR', 'THIS', 'THAT', 'WITH', 'FROM', 'ITS', 'ARE', 'NOT',
+    'DON', 'DONT', 'JUST', 'NOW', 'NEW', 'ALL', 'GET', 'HUGE', 'BIG', 'FREE', 'LIVE', 'JOIN', 'CLAIM',
+    'FOLLOW', 'RETWEET', 'LIKE', 'TAG', 'DROP', 'AIRDROP', 'AIRDROPS', 'TESTNET', 'MAINNET', 'TOKEN',
+    'TOKENS', 'COIN', 'COINS', 'CRYPTO', 'NFT', 'NFTS', 'ALPHA', 'BREAKING', 'HURRY', 'LAST', 'CHANCE',
+    'DEADLINE', 'STEPS', 'STEP', 'ENDS', 'SOON', 'TODAY', 'TOMORROW', 'DAYS', 'HOURS',
+    'JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'SEPT', 'OCT', 'NOV', 'DEC',
+    'JANUARY', 'FEBRUARY', 'MARCH', 'APRIL', 'JUNE', 'JULY', 'AUGUST', 'SEPTEMBER', 'OCTOBER',
+    'NOVEMBER', 'DECEMBER', 'MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN', 'MONDAY', 'TUESDAY',
+    'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY', 'UTC',
+}
+# Share of their entities two tweets must have in common to be the same
+# announcement (Jaccard). Templates reused for another project differ in
+# the name, cashtag, handle and link, and fall well below it.
+ENTITY_OVERLAP = 0.5
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def minhash(text: str) -> Optional[array]:
+    """MinHash signature of the text's word set; None for text without words."""
+    words = set(WORD_PATTERN.findall((text or '').lower()))
+    if not words:
+        return None
+    hashes = [_hash64(word) for word in words]
+    return array('I', (
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+        for a, b in PERMUTATIONS
+    ))
+
+def entity_keys(text: str) -> Tuple[int, ...]:
+    """Sorted hashes of what names the project in a raw tweet, empty if nothing does.
+    
+    Cashtags, @mentions, link domains and capitalized names. A cashtag and
+    the same name capitalized ($ZETA, Zeta) are one entity. Shill
+    templates get reused for different projects, so tweets only share a
+    cluster when they share most of these, however similar the rest is.
+    """
+    text = text or ''
+    entities = {tag.upper() for tag in CASHTAG_PATTERN.findall(text)}
+    entities.update(name.upper() for name in NAME_PATTERN.findall(text)
+                    if name.upper() not in ENTITY_STOPWORDS)
+    entities.update('@' + mention.lower() for mention in MENTION_PATTERN.findall(text))
+    for domain in DOMAIN_PATTERN.findall(text):
+        domain = domain.lower().rstrip('.,;:!?)')
+        if domain not in SHORTENER_DOMAINS:
+            entities.add('//' + domain)
+    return tuple(sorted(_hash64(entity) >> 1 for entity in entities))
+
+def _band_keys(signature: array) -> List[int]:
+    return [hash((band,) + tuple(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+class NearDuplicateIndex:
+    """In-memory MinHash LSH index that groups reworded copies of a tweet into clusters.
+    
+    Only the first tweet of each cluster (its head) is indexed; later
+    copies just add to the cluster's size. Tweets with no entities are
+    never clustered or indexed. A tweet's change to the index is undone if
+    the transaction storing it rolls back, or buffered once it commits and
+    appended to a plain text log by save(), which load() replays on
+    restart; see refresh_cluster_sizes.
+    """
+    
+    def __init__(self, path: Optional[str] = None, threshold: float = THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._min_matches = int(threshold * NUM_PERM + 0.999)
+        self.signatures = array('I')  # NUM_PERM values per head
+        # Entity hashes of every head, head i's from entity_offsets[i] to entity_offsets[i + 1]
+        self.entities = array('q')
+        self.entity_offsets = array('q', [0])
+        self.sizes = array('l')
+        self.tweet_ids: List[str] = []
+        self._positions: Dict[str, int] = {}  # head tweet_id -> position
+        # Band key -> head position, or a list of them when heads collide
+        self.buckets = [dict() for _ in range(BANDS)]
+        self.stats = {'new_clusters': 0, 'near_duplicates': 0}
+        # Tweet_id -> (position of its head, whether it is the head, log line)
+        # for tweets added since their batch was last stored
+        self._uncommitted: Dict[str, Tuple[int, bool, str]] = {}
+        # Log lines of committed changes, until save()
+        self._pending: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self._positions)
+    
+    def _insert(self, tweet_id: str, signature: array, entities: Iterable[int]) -> int:
+        position = len(self.tweet_ids)
+        self.signatures.extend(signature)
+        self.entities.extend(entities)
+        self.entity_offsets.append(len(self.entities))
+        self.sizes.append(1)
+        self.tweet_ids.append(tweet_id)
+        self._positions[tweet_id] = position
+        for bucket, key in zip(self.buckets, _band_keys(signature)):
+            existing = bucket.get(key)
+            if existing is None:
+                bucket[key] = position
+            elif isinstance(existing, int):
+                bucket[key] = [existing, position]
+            else:
+                existing.append(position)
+        return position
+    
+    def _similar(self, position: int, signature: array) -> bool:
+        offset = position * NUM_PERM
+        stored = self.signatures[offset:offset + NUM_PERM]
+        return sum(1 for x, y in zip(stored, signature) if x == y) >= self._min_matches
+    
+    def _same_entities(self, position: int, entities: frozenset) -> bool:
+        stored = self.entities[self.entity_offsets[position]:self.entity_offsets[position + 1]]
+        shared = sum(1 for entity in stored if entity in entities)
+        return shared > 0 and shared >= ENTITY_OVERLAP * (len(stored) + len(entities) - shared)
+    
+    def find(self, signature: array, entities: Iterable[int] = ()) -> Optional[int]:
+        """Return the position of a cluster head similar to the signature and naming the same entities, if any."""
+        entities = frozenset(entities)
+        if not entities:
+            return None
+        checked = set()
+        for bucket, key in zip(self.buckets, _band_keys(signature)):
+            candidates = bucket.get(key)
+            if candidates is None:
+                continue
+            if isinstance(candidates, int):
+                candidates = (candidates,)
+            for position in candidates:
+                if position in checked:
+                    continue
+                checked.add(position)
+                if self._similar(position, signature) and self._same_entities(position, entities):
+                    return position
+        return None
+    
+    def add(self, tweet_id: str, text: str, raw_text: Optional[str] = None) -> Tuple[str, bool]:
+        """Store a tweet; return its cluster's head tweet_id and whether it starts a new cluster.
+        
+        Entities are read from raw_text when given, since cleaning drops
+        links and case.
+        """
+        signature = minhash(text)
+        if signature is None:
+            return tweet_id, True
+        return self.add_signature(tweet_id, signature, entity_keys(raw_text if raw_text is not None else text))
+    
+    def add_signature(self, tweet_id: str, signature: array, entities: Iterable[int] = ()) -> Tuple[str, bool]:
+        """Store a precomputed signature; see add."""
+        uncommitted = self._uncommitted.get(tweet_id)
+        if uncommitted is not None:
+            # Refetched after a cycle that failed before storing it
+            position, is_head, _ = uncommitted
+            return self.tweet_ids[position], is_head
+        if tweet_id in self._positions:
+            # Refetched after a failed cycle; it still heads its own cluster
+            return tweet_id, True
+        entities = tuple(entities)
+        if not entities:
+            # Nothing could ever match it
+            return tweet_id, True
+        
+        head = self.find(signature, entities)
+        if head is None:
+            position = self._insert(tweet_id, signature, entities)
+            self.stats['new_clusters'] += 1
+            line = f"H {tweet_id} {','.join(map(str, entities))} {signature.tobytes().hex()}\n"
+            self._uncommitted[tweet_id] = (position, True, line)
+            return tweet_id, True
+        
+        self.sizes[head] += 1
+        self.stats['near_duplicates'] += 1
+        self._uncommitted[tweet_id] = (head, False, f"M {self.tweet_ids[head]}\n")
+        return self.tweet_ids[head], False
+    
+    def _undo(self, changes: List[Tuple[int, bool, str]]):
+        for position, is_head, _ in reversed(changes):
+            if not is_head:
+                self.sizes[position] -= 1
+                continue
+            # The slot stays so later positions don't move, but nothing finds it
+            del self._positions[self.tweet_ids[position]]
+            offset = position * NUM_PERM
+            for bucket, key in zip(self.buckets, _band_keys(self.signatures[offset:offset + NUM_PERM])):
+                existing = bucket[key]
+                if isinstance(existing, int):
+                    del bucket[key]
+                else:
+                    existing.remove(position)
+    
+    def cluster_size(self, cluster_tweet_id: str) -> int:
+        position = self._positions.get(cluster_tweet_id)
+        return self.sizes[position] if position is not None else 1
+    
+    def collapse(self, tweets: List[TweetRecord]) -> List[TweetRecord]:
+        """Assign tweets to clusters and return only those that start a new cluster."""
+        heads = []
+        for tweet in tweets:
+            cluster_tweet_id, is_new = self.add(tweet.tweet_id, tweet.processed_text, tweet.text)
+            tweet.cluster_id = cluster_tweet_id
+            if is_new:
+                heads.append(tweet)
+        return heads
+    
+    def attach_cluster_sizes(self, opportunities: List[OpportunityRecord]):
+        """Record on each opportunity how many near-duplicate tweets its cluster has."""
+        for opportunity in opportunities:
+            opportunity.cluster_size = self.cluster_size(opportunity.tweet_id)
+    
+    def refresh_cluster_sizes(self, session: Session, tweets: List[TweetRecord]):
+        """Update stored opportunities whose clusters grew with these tweets.
+        
+        Call it in the transaction that stores the tweets: their changes to
+        the index are queued for save() once it commits, and undone if it
+        rolls back so the tweets are clustered afresh when refetched.
+        """
+        changes = [self._uncommitted.pop(tweet.tweet_id) for tweet in tweets
+                   if tweet.tweet_id in self._uncommitted]
+        after_commit(session,
+                     apply=lambda: self._pending.extend(line for _, _, line in changes),
+                     undo=lambda: self._undo(changes))
+        grown = {tweet.cluster_id for tweet in tweets
+                 if tweet.cluster_id and tweet.cluster_id != tweet.tweet_id}
+        for cluster_tweet_id in grown:
+            session.execute(
+                update(AirdropOpportunity)
+                .where(AirdropOpportunity.tweet_id == cluster_tweet_id)
+                .values(cluster_size=self.cluster_size(cluster_tweet_id))
+            )
+    
+    def save(self):
+        """Append clusters and members committed since the last save to the log file."""
+        if not self.path or not self._pending:
+            return
+        with open(self.path, 'a') as f:
+            f.writelines(self._pending)
+        self._pending = []
+    
+    @classmethod
+    def load(cls, path: str, threshold: float = THRESHOLD) -> 'NearDuplicateIndex':
+        """Rebuild an index from its log file, or start empty if there is none."""
+        index = cls(path, threshold=threshold)
+        if not os.path.exists(path):
+            return index
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if parts[:1] == ['H'] and len(parts) == 4 and len(parts[3]) == NUM_PERM * 8:
+                    entities = [int(entity) for entity in parts[2].split(',')]
+                    index._insert(parts[1], array('I', bytes.fromhex(parts[3])), entities)
+                elif parts[:1] == ['M'] and len(parts) == 2 and parts[1] in index._positions:
+                    index.sizes[index._positions[parts[1]]] += 1
+                # Anything else is a partially written last line
+        return index
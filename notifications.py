@@ -1,21 +1,98 @@
+import asyncio
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import telegram
-from typing import List
-from models import AirdropOpportunity
+from telegram.error import RetryAfter
+from telegram.request import HTTPXRequest
+from typing import List, Optional, Tuple
+from metrics import METRICS
+from models import OpportunityRecord
+from rate_limit import TokenBucket
+
+# Opportunities per email; more are split over several emails
+EMAIL_DIGEST_SIZE = 100
+
+# Telegram rejects longer messages
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+# Telegram allows about 20 messages a minute into one group chat
+TELEGRAM_MESSAGES_PER_MINUTE = 20
+TELEGRAM_DIGEST_SEPARATOR = '\n➖➖➖➖➖➖\n'
+
+# The opportunities one message covered, and the error sending it, if any
+DeliveryResult = Tuple[List[OpportunityRecord], Optional[Exception]]
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """How long the server asked to wait before retrying, if it did."""
+    if not isinstance(error, RetryAfter):
+        return None
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
 
 class EmailNotifier:
-    def __init__(self, smtp_server: str, smtp_port: int, username: str, password: str):
+    def __init__(self, smtp_server: str, smtp_port: int, username: str, password: str,
+                 keep_alive: bool = False, starttls: bool = True,
+                 digest_size: int = EMAIL_DIGEST_SIZE):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.username = username
         self.password = password
+        self.keep_alive = keep_alive
+        self.starttls = starttls
+        self.digest_size = digest_size
+        self._server = None
+        # smtplib blocks; sends run here, one at a time over the one connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='smtp')
     
-    def format_opportunity(self, opportunity: AirdropOpportunity) -> str:
+    def _connect(self) -> smtplib.SMTP:
+        """Open an authenticated SMTP connection."""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        if self.starttls:
+            server.starttls()
+        server.login(self.username, self.password)
+        return server
+    
+    def _send(self, msg: MIMEMultipart):
+        """Send a message, reusing the open connection when keep_alive is set."""
+        if not self.keep_alive:
+            with self._connect() as server:
+                server.send_message(msg)
+            return
+        
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # The server dropped the idle connection; reconnect once
+            self.close()
+            self._server = self._connect()
+            self._server.send_message(msg)
+    
+    def close(self):
+        """Close the kept-alive SMTP connection, if any."""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+    
+    def shutdown(self):
+        """Close the connection and stop the send thread."""
+        self._executor.shutdown(wait=True)
+        self.close()
+    
+    def format_opportunity(self, opportunity: OpportunityRecord) -> str:
         """Format an airdrop opportunity into a readable email message."""
+        # Opportunities merged from later tweets are sent again as updates
+        heading = 'Updated' if opportunity.updated_at else 'New'
         message = f"""
-New Airdrop/Testnet Opportunity!
+{heading} Airdrop/Testnet Opportunity!
 
 Project: {opportunity.project_name or 'Unknown'}
 Token: {opportunity.token_symbol or 'Unknown'}
@@ -34,44 +111,76 @@ Confidence Score: {opportunity.confidence_score:.1f}%
         
         return message
     
-    def send_notification(self, recipient: str, opportunities: List[AirdropOpportunity]) -> bool:
+    def send_digest(self, recipient: str, opportunities: List[OpportunityRecord]):
+        """Send one email listing the opportunities; raises if it can't be sent."""
+        msg = MIMEMultipart()
+        msg['From'] = self.username
+        msg['To'] = recipient
+        msg['Subject'] = f"New Airdrop Opportunities ({len(opportunities)})"
+        
+        body = "Here are the latest airdrop and testnet opportunities:\n\n"
+        body += "\n" + "="*50 + "\n\n".join(
+            self.format_opportunity(opp) for opp in opportunities
+        )
+        
+        msg.attach(MIMEText(body, 'plain'))
+        
+        self._send(msg)
+    
+    def send_notification(self, recipient: str, opportunities: List[OpportunityRecord]) -> bool:
         """Send email notification for new opportunities."""
         if not opportunities:
             return True
             
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.username
-            msg['To'] = recipient
-            msg['Subject'] = f"New Airdrop Opportunities ({len(opportunities)})"
-            
-            body = "Here are the latest airdrop and testnet opportunities:\n\n"
-            body += "\n" + "="*50 + "\n\n".join(
-                self.format_opportunity(opp) for opp in opportunities
-            )
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
-                
+            self.send_digest(recipient, opportunities)
             return True
             
         except Exception as e:
             print(f"Failed to send email notification: {str(e)}")
             return False
+    
+    async def deliver(self, recipient: str, opportunities: List[OpportunityRecord]) -> List[DeliveryResult]:
+        """Send the opportunities as digests of digest_size, off the event loop."""
+        loop = asyncio.get_running_loop()
+        results = []
+        for i in range(0, len(opportunities), self.digest_size):
+            chunk = opportunities[i:i + self.digest_size]
+            try:
+                await loop.run_in_executor(self._executor, self.send_digest, recipient, chunk)
+                results.append((chunk, None))
+            except Exception as e:
+                results.append((chunk, e))
+        return results
 
 class TelegramNotifier:
-    def __init__(self, bot_token: str, chat_id: str):
-        self.bot = telegram.Bot(token=bot_token)
+    def __init__(self, bot_token: str, chat_id: str, connection_pool_size: int = 1,
+                 messages_per_minute: int = TELEGRAM_MESSAGES_PER_MINUTE,
+                 base_url: Optional[str] = None):
+        bot_options = {'base_url': base_url} if base_url else {}
+        self.bot = telegram.Bot(
+            token=bot_token,
+            request=HTTPXRequest(connection_pool_size=connection_pool_size),
+            **bot_options
+        )
         self.chat_id = chat_id
+        self.bucket = TokenBucket(messages_per_minute, 60.0)
+        # No more sends in flight than connections to send them on
+        self.semaphore = asyncio.Semaphore(connection_pool_size)
+    
+    async def initialize(self):
+        """Open the bot's HTTP connection pool so it is reused across sends."""
+        await self.bot.initialize()
+    
+    async def shutdown(self):
+        """Close the bot's HTTP connection pool."""
+        await self.bot.shutdown()
     
-    def format_opportunity(self, opportunity: AirdropOpportunity) -> str:
+    def format_opportunity(self, opportunity: OpportunityRecord) -> str:
         """Format an airdrop opportunity into a Telegram message."""
+        heading = 'Updated' if opportunity.updated_at else 'New'
         message = f"""
-🚀 *New Airdrop/Testnet Opportunity!*
+🚀 *{heading} Airdrop/Testnet Opportunity!*
 
 *Project:* {opportunity.project_name or 'Unknown'}
 *Token:* {opportunity.token_symbol or 'Unknown'}
@@ -90,50 +199,118 @@ class TelegramNotifier:
         
         return message
     
-    async def send_notification(self, opportunities: List[AirdropOpportunity]) -> bool:
-        """Send Telegram notification for new opportunities."""
-        if not opportunities:
-            return True
-            
-        try:
-            for opp in opportunities:
-                message = self.format_opportunity(opp)
+    def digests(self, opportunities: List[OpportunityRecord]) -> List[Tuple[List[OpportunityRecord], str]]:
+        """Pack the opportunities' messages into as few Telegram messages as fit."""
+        digests = []
+        chunk, text = [], ''
+        for opp in opportunities:
+            message = self.format_opportunity(opp)[:TELEGRAM_MAX_MESSAGE_LENGTH]
+            if chunk and len(text) + len(TELEGRAM_DIGEST_SEPARATOR) + len(message) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                digests.append((chunk, text))
+                chunk, text = [], ''
+            text = text + TELEGRAM_DIGEST_SEPARATOR + message if chunk else message
+            chunk.append(opp)
+        if chunk:
+            digests.append((chunk, text))
+        return digests
+    
+    async def _send_digest(self, opportunities: List[OpportunityRecord], text: str) -> DeliveryResult:
+        await self.bucket.acquire()
+        async with self.semaphore:
+            try:
                 await self.bot.send_message(
                     chat_id=self.chat_id,
-                    text=message,
+                    text=text,
                     parse_mode='Markdown',
                     disable_web_page_preview=True
                 )
+            except RetryAfter as e:
+                # Flood control applies to every send to the chat, not just this one
+                self.bucket.exhaust(retry_after_seconds(e))
+                return opportunities, e
+            except Exception as e:
+                return opportunities, e
+        return opportunities, None
+    
+    async def deliver(self, opportunities: List[OpportunityRecord]) -> List[DeliveryResult]:
+        """Send the opportunities as digest messages, concurrently under the rate limit."""
+        return list(await asyncio.gather(*(
+            self._send_digest(chunk, text) for chunk, text in self.digests(opportunities)
+        )))
+    
+    async def send_notification(self, opportunities: List[OpportunityRecord]) -> bool:
+        """Send Telegram notification for new opportunities."""
+        if not opportunities:
             return True
-            
-        except Exception as e:
-            print(f"Failed to send Telegram notification: {str(e)}")
-            return False
+        
+        success = True
+        for _, error in await self.deliver(opportunities):
+            if error is not None:
+                print(f"Failed to send Telegram notification: {str(error)}")
+                success = False
+        return success
 
 class NotificationManager:
     def __init__(self, email_notifier: EmailNotifier = None, 
                  telegram_notifier: TelegramNotifier = None,
-                 min_confidence: float = 80.0):
+                 min_confidence: float = 70.0):
         self.email_notifier = email_notifier
         self.telegram_notifier = telegram_notifier
         self.min_confidence = min_confidence
     
-    def filter_opportunities(self, opportunities: List[AirdropOpportunity]) -> List[AirdropOpportunity]:
+    def filter_opportunities(self, opportunities: List[OpportunityRecord]) -> List[OpportunityRecord]:
         """Filter opportunities based on confidence score."""
         return [opp for opp in opportunities if opp.confidence_score >= self.min_confidence]
     
-    async def notify(self, opportunities: List[AirdropOpportunity], email_recipient: str = None) -> bool:
-        """Send notifications through all configured channels."""
+    def channels(self, email_recipient: str = None) -> List[str]:
+        """Names of the configured channels."""
+        channels = []
+        if self.email_notifier and email_recipient:
+            channels.append('email')
+        if self.telegram_notifier:
+            channels.append('telegram')
+        return channels
+    
+    async def send(self, channel: str, opportunities: List[OpportunityRecord],
+                   email_recipient: str = None) -> List[DeliveryResult]:
+        """Deliver opportunities on one channel, reporting each message's outcome."""
+        with METRICS.timer('airdrop_notify_seconds', channel=channel):
+            if channel == 'email':
+                results = await self.email_notifier.deliver(email_recipient, opportunities)
+            elif channel == 'telegram':
+                results = await self.telegram_notifier.deliver(opportunities)
+            else:
+                raise ValueError(f"Unknown notification channel: {channel}")
+        for _, error in results:
+            METRICS.inc('airdrop_notifications_total', channel=channel,
+                        outcome='sent' if error is None else 'failed')
+        return results
+    
+    async def notify(self, opportunities: List[OpportunityRecord], email_recipient: str = None) -> bool:
+        """Send notifications through all configured channels.
+        
+        The channels are sent to concurrently, and a failed message
+        doesn't stop the others. Nothing is retried; see outbox.Outbox.
+        """
         filtered_opps = self.filter_opportunities(opportunities)
         if not filtered_opps:
             return True
-            
-        success = True
         
-        if self.email_notifier and email_recipient:
-            success &= self.email_notifier.send_notification(email_recipient, filtered_opps)
-            
+        channels = self.channels(email_recipient)
+        results = await asyncio.gather(*(
+            self.send(channel, filtered_opps, email_recipient) for channel in channels
+        ))
+        success = True
+        for channel, channel_results in zip(channels, results):
+            for _, error in channel_results:
+                if error is not None:
+                    print(f"Failed to send {channel} notification: {str(error)}")
+                    success = False
+        return success
+    
+    async def close(self):
+        """Close connections held open by the notifiers."""
+        if self.email_notifier:
+            await asyncio.to_thread(self.email_notifier.shutdown)
         if self.telegram_notifier:
-            success &= await self.telegram_notifier.send_notification(filtered_opps)
-            
-        return success 
\ No newline at end of file
+            await self.telegram_notifier.shutdown()
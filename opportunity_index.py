@@ -0,0 +1,271 @@
+import difflib
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, or_, update
+from sqlalchemy.orm import Session
+
+from models import AirdropOpportunity, OpportunityRecord, OpportunitySource, after_commit, load_opportunities
+
+# Opportunities not seen for this long start over instead of being merged into
+MERGE_WINDOW_DAYS = 30
+# difflib ratio above which two normalized project names are the same project
+FUZZY_CUTOFF = 0.85
+# A deadline only counts as extended when it moves later by more than this.
+# Relative deadlines ("ends in 3 days") are computed from each tweet's
+# created_at, so every repost gives a slightly later one.
+DEADLINE_TOLERANCE = timedelta(days=1)
+
+# Trailing words that don't tell projects apart ("Zeta Network" == "Zeta")
+PROJECT_SUFFIXES = {
+    'airdrop', 'testnet', 'mainnet', 'token', 'tokens', 'coin', 'protocol', 'network',
+    'labs', 'finance', 'foundation', 'dao', 'official', 'io', 'xyz', 'app',
+}
+# Words extract_token_symbol picks up from "<word> token" that aren't symbols
+GENERIC_TOKENS = {
+    'THE', 'NEW', 'FREE', 'YOUR', 'OUR', 'THIS', 'THEIR', 'NATIVE', 'GOVERNANCE',
+    'UTILITY', 'REWARD', 'REWARDS', 'AIRDROP', 'TESTNET', 'ANY', 'MORE',
+}
+
+UPDATED_COLUMNS = [
+    'project_name', 'token_symbol', 'description', 'deadline', 'participation_steps',
+    'confidence_score', 'source_count', 'updated_at',
+]
+
+def normalize_project(name: Optional[str]) -> Optional[str]:
+    """Lowercase alphanumeric key for a project name, without filler words."""
+    words = re.findall(r'[a-z0-9]+', (name or '').lower())
+    if words and words[0] == 'the':
+        words = words[1:]
+    while len(words) > 1 and words[-1] in PROJECT_SUFFIXES:
+        words.pop()
+    return ''.join(words) or None
+
+def normalize_token(symbol: Optional[str]) -> Optional[str]:
+    """Uppercase token symbol, or None for words that aren't symbols."""
+    if not symbol:
+        return None
+    symbol = symbol.upper()
+    return None if symbol in GENERIC_TOKENS else symbol
+
+class MergeResult:
+    """What a batch of extracted opportunities changed."""
+    
+    def __init__(self):
+        self.new: List[OpportunityRecord] = []
+        self.updated: List[OpportunityRecord] = []  # stored rows that need an UPDATE
+        self.sources: List[Tuple[OpportunityRecord, str]] = []  # tweets merged into an opportunity
+        self.to_notify: List[OpportunityRecord] = []
+    
+    def save(self, session: Session):
+        """Write updates and source links; call after the new opportunities are inserted."""
+        if self.updated:
+            session.execute(update(AirdropOpportunity), [
+                {'id': opportunity.id, **{column: getattr(opportunity, column) for column in UPDATED_COLUMNS}}
+                for opportunity in self.updated
+            ])
+        rows = [{'opportunity_id': opportunity.id, 'tweet_id': opportunity.tweet_id}
+                for opportunity in self.new]
+        rows += [{'opportunity_id': opportunity.id, 'tweet_id': tweet_id}
+                 for opportunity, tweet_id in self.sources]
+        if rows:
+            session.execute(insert(OpportunitySource), rows)
+        # Updated opportunities go through the notification outbox again
+        new_ids = {id(opportunity) for opportunity in self.new}
+        renotify = [{'id': opportunity.id, 'notified': False}
+                    for opportunity in self.to_notify if id(opportunity) not in new_ids]
+        if renotify:
+            session.execute(update(AirdropOpportunity), renotify)
+
+class OpportunityIndex:
+    """Recent opportunities keyed on normalized project name and token symbol.
+    
+    merge() folds newly extracted opportunities that describe an airdrop
+    already in the index into the existing one, and reports which
+    opportunities are new or materially changed and so worth notifying.
+    """
+    
+    def __init__(self, min_confidence: float = 70.0, window_days: int = MERGE_WINDOW_DAYS,
+                 fuzzy_cutoff: float = FUZZY_CUTOFF):
+        self.min_confidence = min_confidence
+        self.window = timedelta(days=window_days)
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.by_project: Dict[str, List[OpportunityRecord]] = defaultdict(list)
+        self.by_token: Dict[str, List[OpportunityRecord]] = defaultdict(list)
+        # Project keys grouped by first character, to keep fuzzy matching cheap
+        self.project_keys: Dict[str, List[str]] = defaultdict(list)
+        self.stats = {'new': 0, 'merged': 0, 'updated': 0}
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def warm(self, session: Session):
+        """Load opportunities created or updated within the merge window."""
+        cutoff = datetime.utcnow() - self.window
+        # Records, not ORM objects, so the index can update them without the session noticing
+        for opportunity in load_opportunities(
+                session, or_(AirdropOpportunity.created_at >= cutoff, AirdropOpportunity.updated_at >= cutoff)):
+            self._add(opportunity)
+    
+    def _add(self, opportunity: OpportunityRecord) -> List[Tuple[Dict, str]]:
+        self._count += 1
+        return self._index_keys(opportunity)
+    
+    def _index_keys(self, opportunity: OpportunityRecord) -> List[Tuple[Dict, str]]:
+        """Index opportunity under its keys; returns the (index, key) pairs it was added to."""
+        added = []
+        project = normalize_project(opportunity.project_name)
+        token = normalize_token(opportunity.token_symbol)
+        if project and opportunity not in self.by_project.get(project, []):
+            if project not in self.by_project:
+                self.project_keys[project[0]].append(project)
+            self.by_project[project].append(opportunity)
+            added.append((self.by_project, project))
+        if token and opportunity not in self.by_token.get(token, []):
+            self.by_token[token].append(opportunity)
+            added.append((self.by_token, token))
+        return added
+    
+    def _remove_keys(self, opportunity: OpportunityRecord, added: List[Tuple[Dict, str]]):
+        for index, key in added:
+            index[key].remove(opportunity)
+            if not index[key]:
+                del index[key]
+                if index is self.by_project:
+                    self.project_keys[key[0]].remove(key)
+    
+    def _same_project(self, a: str, b: str) -> bool:
+        return a == b or difflib.SequenceMatcher(None, a, b).ratio() >= self.fuzzy_cutoff
+    
+    def _matching_projects(self, project: str) -> List[str]:
+        if project in self.by_project:
+            return [project]
+        return difflib.get_close_matches(project, self.project_keys.get(project[0], []),
+                                         n=3, cutoff=self.fuzzy_cutoff)
+    
+    def find(self, opportunity: OpportunityRecord, batch_ids=()) -> Optional[OpportunityRecord]:
+        """Return the indexed opportunity for the same airdrop, if any.
+        
+        The token symbol decides first: a matching symbol is enough unless
+        both project names are known and differ, and a different symbol
+        rules a match out. Without a symbol, the project name decides.
+        Opportunities that were never stored (a failed cycle) are skipped,
+        except those in batch_ids, the current merge.
+        """
+        project = normalize_project(opportunity.project_name)
+        token = normalize_token(opportunity.token_symbol)
+        cutoff = datetime.utcnow() - self.window
+        
+        def is_recent(existing):
+            if existing.id is None:
+                return id(existing) in batch_ids
+            return (existing.updated_at or existing.created_at or datetime.utcnow()) >= cutoff
+        
+        if token:
+            for existing in reversed(self.by_token.get(token, [])):
+                existing_project = normalize_project(existing.project_name)
+                if (not project or not existing_project or self._same_project(project, existing_project)) \
+                        and is_recent(existing):
+                    return existing
+        
+        if project:
+            for key in self._matching_projects(project):
+                for existing in reversed(self.by_project[key]):
+                    existing_token = normalize_token(existing.token_symbol)
+                    if token and existing_token and token != existing_token:
+                        continue
+                    if is_recent(existing):
+                        return existing
+        return None
+    
+    def _merge_into(self, existing: OpportunityRecord, opportunity: OpportunityRecord) -> bool:
+        """Keep the best of both in existing; return whether anything material changed."""
+        material = False
+        if opportunity.project_name and not existing.project_name:
+            existing.project_name = opportunity.project_name
+            material = True
+        if normalize_token(opportunity.token_symbol) and not normalize_token(existing.token_symbol):
+            existing.token_symbol = opportunity.token_symbol
+            material = True
+        # An upcoming deadline well past the current one (an extension) wins.
+        # Earlier dates are ignored, so posts quoting an old and a new date
+        # in turn don't flip the deadline back and forth.
+        if opportunity.deadline and (existing.deadline is None or (
+                opportunity.deadline > datetime.utcnow()
+                and opportunity.deadline - existing.deadline > DEADLINE_TOLERANCE)):
+            existing.deadline = opportunity.deadline
+            material = True
+        # Longer steps or description are kept, but rewording isn't news
+        if opportunity.participation_steps and \
+                len(opportunity.participation_steps) > len(existing.participation_steps or ''):
+            existing.participation_steps = opportunity.participation_steps
+        if opportunity.description and len(opportunity.description) > len(existing.description or ''):
+            existing.description = opportunity.description
+        
+        was_notifiable = (existing.confidence_score or 0) >= self.min_confidence
+        existing.confidence_score = max(existing.confidence_score or 0, opportunity.confidence_score or 0)
+        if not was_notifiable and existing.confidence_score >= self.min_confidence:
+            material = True
+        
+        existing.source_count = (existing.source_count or 1) + 1
+        return material
+    
+    def merge(self, opportunities: List[OpportunityRecord], session: Optional[Session] = None) -> MergeResult:
+        """Merge extracted opportunities into the index.
+        
+        With a session, the index changes are undone unless the session's
+        transaction, which is to store them, commits.
+        """
+        result = MergeResult()
+        new_ids = set()
+        updated_ids = set()
+        notify_ids = set()
+        added_keys = []  # (opportunity, [(index, key)]) to remove on rollback
+        before = {}  # id(existing) -> (existing, column values before the merge)
+        
+        for opportunity in opportunities:
+            existing = self.find(opportunity, new_ids)
+            if existing is None:
+                opportunity.source_count = 1
+                added_keys.append((opportunity, self._add(opportunity)))
+                result.new.append(opportunity)
+                result.to_notify.append(opportunity)
+                new_ids.add(id(opportunity))
+                self.stats['new'] += 1
+                continue
+            
+            if id(existing) not in new_ids and id(existing) not in before:
+                before[id(existing)] = (existing, {column: getattr(existing, column) for column in UPDATED_COLUMNS})
+            material = self._merge_into(existing, opportunity)
+            if material:
+                # It may have gained a project name or token symbol to be found by
+                added_keys.append((existing, self._index_keys(existing)))
+            result.sources.append((existing, opportunity.tweet_id))
+            self.stats['merged'] += 1
+            # Merged into one from this same batch, which is inserted as a whole
+            if id(existing) in new_ids:
+                continue
+            
+            if material:
+                existing.updated_at = datetime.utcnow()
+                self.stats['updated'] += 1
+                if id(existing) not in notify_ids:
+                    result.to_notify.append(existing)
+                    notify_ids.add(id(existing))
+            if id(existing) not in updated_ids:
+                result.updated.append(existing)
+                updated_ids.add(id(existing))
+        
+        if session is not None:
+            def undo():
+                for opportunity, added in reversed(added_keys):
+                    self._remove_keys(opportunity, added)
+                for existing, values in before.values():
+                    for column, value in values.items():
+                        setattr(existing, column, value)
+                self._count -= len(result.new)
+            after_commit(session, undo=undo)
+        return result
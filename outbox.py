@@ -0,0 +1,205 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from metrics import METRICS
+from models import AirdropOpportunity, NotificationDelivery, load_opportunities
+
+# Unnotified opportunities older than this are not sent at all, so a
+# database from before the outbox doesn't flood every channel
+MAX_AGE_HOURS = 24
+# Attempts per delivery before it is marked failed
+MAX_ATTEMPTS = 6
+# Wait before the nth retry: BACKOFF_SECONDS * 2 ** (n - 1), up to MAX_BACKOFF_SECONDS
+BACKOFF_SECONDS = 30.0
+MAX_BACKOFF_SECONDS = 3600.0
+# Due deliveries read per deliver() call
+DELIVERY_BATCH_SIZE = 500
+
+class Outbox:
+    """Durable queue of notifications, with retries.
+    
+    enqueue() turns every opportunity whose notified flag is still false
+    into one pending notification_deliveries row per channel and sets the
+    flag, in the caller's transaction. Merged opportunities with a material
+    update get the flag cleared again, so they are queued once more on
+    every channel that doesn't still have a delivery pending for them.
+    deliver() sends due deliveries through the NotificationManager and
+    records each attempt; failed ones are retried with exponential backoff,
+    or after the delay the server asked for.
+    """
+    
+    def __init__(self, notification_manager, email_recipient: str = None,
+                 min_confidence: float = 70.0, max_age_hours: float = MAX_AGE_HOURS,
+                 max_attempts: int = MAX_ATTEMPTS, backoff_seconds: float = BACKOFF_SECONDS,
+                 max_backoff_seconds: float = MAX_BACKOFF_SECONDS):
+        self.notification_manager = notification_manager
+        self.email_recipient = email_recipient
+        self.min_confidence = min_confidence
+        self.max_age = timedelta(hours=max_age_hours)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.stats = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+        # Seconds from queueing to a successful send, for recent deliveries
+        self.latencies = deque(maxlen=10000)
+    
+    def enqueue(self, session: Session) -> int:
+        """Queue unnotified opportunities on every channel; returns how many opportunities.
+        
+        Doesn't commit, so the deliveries are stored with whatever the
+        caller stores along with them.
+        """
+        now = datetime.utcnow()
+        opportunity_ids = session.execute(
+            select(AirdropOpportunity.id)
+            .where(AirdropOpportunity.notified.is_(False),
+                   AirdropOpportunity.confidence_score >= self.min_confidence)
+            .where(or_(AirdropOpportunity.updated_at >= now - self.max_age,
+                       AirdropOpportunity.created_at >= now - self.max_age))
+            .order_by(AirdropOpportunity.id)
+        ).scalars().all()
+        if not opportunity_ids:
+            return 0
+        
+        # A merge update can re-queue an opportunity whose last delivery is
+        # still pending; that delivery sends the current record anyway
+        pending = set(session.execute(
+            select(NotificationDelivery.opportunity_id, NotificationDelivery.channel)
+            .where(NotificationDelivery.status == 'pending',
+                   NotificationDelivery.opportunity_id.in_(opportunity_ids))
+        ).tuples())
+        channels = self.notification_manager.channels(self.email_recipient)
+        rows = [{'opportunity_id': opportunity_id, 'channel': channel, 'status': 'pending',
+                 'attempts': 0, 'next_attempt_at': now, 'created_at': now}
+                for opportunity_id in opportunity_ids for channel in channels
+                if (opportunity_id, channel) not in pending]
+        if rows:
+            session.execute(insert(NotificationDelivery), rows)
+        session.execute(update(AirdropOpportunity),
+                        [{'id': opportunity_id, 'notified': True} for opportunity_id in opportunity_ids])
+        self.stats['queued'] += len(rows)
+        return len(opportunity_ids)
+    
+    def _backoff(self, attempts: int, error: Optional[Exception]) -> float:
+        # Imported here so importing this module doesn't load telegram
+        from notifications import retry_after_seconds
+        delay = min(self.backoff_seconds * 2 ** (attempts - 1), self.max_backoff_seconds)
+        retry_after = retry_after_seconds(error) if error is not None else None
+        return max(delay, retry_after or 0.0)
+    
+    async def deliver(self, session: Session) -> int:
+        """Send every due delivery once and commit the outcomes; returns how many were sent."""
+        now = datetime.utcnow()
+        due = session.execute(
+            select(NotificationDelivery.id, NotificationDelivery.opportunity_id,
+                   NotificationDelivery.channel, NotificationDelivery.attempts,
+                   NotificationDelivery.created_at)
+            .where(NotificationDelivery.status == 'pending',
+                   NotificationDelivery.next_attempt_at <= now)
+            .order_by(NotificationDelivery.id)
+            .limit(DELIVERY_BATCH_SIZE)
+        ).all()
+        if not due:
+            return 0
+        
+        opportunities = {
+            opportunity.id: opportunity
+            for opportunity in load_opportunities(
+                session, AirdropOpportunity.id.in_({row.opportunity_id for row in due})
+            )
+        }
+        # Due rows per channel and opportunity; there can be more than one
+        # from before enqueue() skipped opportunities already pending
+        by_channel: Dict[str, Dict[int, list]] = defaultdict(lambda: defaultdict(list))
+        for row in due:
+            by_channel[row.channel][row.opportunity_id].append(row)
+        
+        async def send(channel: str):
+            channel_opportunities = [opportunities[opportunity_id] for opportunity_id in by_channel[channel]
+                                     if opportunity_id in opportunities]
+            results = await self.notification_manager.send(channel, channel_opportunities,
+                                                           self.email_recipient)
+            return results, datetime.utcnow()
+        
+        configured = self.notification_manager.channels(self.email_recipient)
+        channels = [channel for channel in by_channel if channel in configured]
+        results = await asyncio.gather(*(send(channel) for channel in channels),
+                                       return_exceptions=True)
+        
+        # Outcome of every due delivery; missing means its message was never sent
+        errors: Dict[int, Optional[Exception]] = {}
+        sent_at: Dict[int, datetime] = {}
+        for channel, channel_results in zip(channels, results):
+            rows_by_opportunity = by_channel[channel]
+            if isinstance(channel_results, Exception):
+                for rows in rows_by_opportunity.values():
+                    for row in rows:
+                        errors[row.id] = channel_results
+                continue
+            channel_results, channel_finished = channel_results
+            for sent_opportunities, error in channel_results:
+                for opportunity in sent_opportunities:
+                    for row in rows_by_opportunity[opportunity.id]:
+                        errors[row.id] = error
+                        sent_at[row.id] = channel_finished
+        
+        finished = datetime.utcnow()
+        sent = 0
+        updates = []
+        for row in due:
+            attempts = row.attempts + 1
+            if row.id in errors and errors[row.id] is None:
+                updates.append({'id': row.id, 'status': 'sent', 'attempts': attempts,
+                                'sent_at': sent_at[row.id], 'last_error': None})
+                self.latencies.append((sent_at[row.id] - row.created_at).total_seconds())
+                sent += 1
+                continue
+            error = errors.get(row.id)
+            if row.channel not in configured:
+                message = f"channel {row.channel} is not configured"
+            elif row.opportunity_id not in opportunities:
+                message = 'opportunity no longer exists'
+            elif error is None:
+                message = 'not sent'
+            else:
+                message = str(error) or type(error).__name__
+            if attempts >= self.max_attempts or row.opportunity_id not in opportunities:
+                updates.append({'id': row.id, 'status': 'failed', 'attempts': attempts,
+                                'last_error': message})
+                self.stats['failed'] += 1
+            else:
+                retry_at = finished + timedelta(seconds=self._backoff(attempts, error))
+                updates.append({'id': row.id, 'attempts': attempts, 'next_attempt_at': retry_at,
+                                'last_error': message})
+                self.stats['retried'] += 1
+        
+        session.execute(update(NotificationDelivery), updates)
+        with METRICS.timer('airdrop_db_commit_seconds'):
+            session.commit()
+        self.stats['sent'] += sent
+        return sent
+    
+    async def drain(self, session: Session, timeout: float) -> int:
+        """Deliver until nothing is pending or timeout seconds have passed, waiting out backoffs."""
+        deadline = time.monotonic() + timeout
+        sent = 0
+        while True:
+            sent += await self.deliver(session)
+            next_attempt_at = session.execute(
+                select(NotificationDelivery.next_attempt_at)
+                .where(NotificationDelivery.status == 'pending')
+                .order_by(NotificationDelivery.next_attempt_at)
+                .limit(1)
+            ).scalar()
+            if next_attempt_at is None:
+                return sent
+            wait = max((next_attempt_at - datetime.utcnow()).total_seconds(), 0.0)
+            if time.monotonic() + wait > deadline:
+                return sent
+            await asyncio.sleep(wait)
@@ -0,0 +1,240 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import TweetRecord, OpportunityRecord, bulk_save
+from fetch_tweets import (SeenTweetCache, filter_tweets, get_cursor, get_sources,
+                          load_cursors, move_cursor)
+from extract_info import PreFilter, extract_airdrop_info_batch
+from near_duplicates import NearDuplicateIndex
+from opportunity_index import OpportunityIndex
+from extraction_cache import ExtractionCache
+from scoring import ScoringEngine, load_trusted_authors
+from author_reputation import AuthorReputation
+from metrics import METRICS
+from outbox import Outbox
+
+# Fetches one source: (source_type, source, since_id) -> raw tweets
+FetchSource = Callable[[str, str, Optional[str]], Awaitable[List]]
+
+STAGES = ['fetch', 'extract', 'persist', 'notify']
+
+class Batch:
+    """New tweets from one source moving through the pipeline."""
+    
+    def __init__(self, source_type: str, source: str, newest_id: Optional[int],
+                 tweets: List[TweetRecord]):
+        self.source_type = source_type
+        self.source = source
+        self.newest_id = newest_id
+        self.tweets = tweets
+        self.opportunities: List[OpportunityRecord] = []
+        self.fetched_at = time.perf_counter()
+
+class PipelineMetrics:
+    """Per-stage latency and queue-depth numbers for one pipeline run."""
+    
+    def __init__(self):
+        self.stages = {stage: {'batches': 0, 'tweets': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+                       for stage in STAGES}
+        self.queues = {}
+        self.delivery_latencies = []
+        self.started = time.perf_counter()
+        self.finished = None
+    
+    def record(self, stage: str, batch: Batch, seconds: float):
+        stats = self.stages[stage]
+        stats['batches'] += 1
+        stats['tweets'] += len(batch.tweets)
+        stats['seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        METRICS.observe('airdrop_stage_seconds', seconds, stage=stage)
+    
+    def record_queue(self, name: str, queue: asyncio.Queue):
+        stats = self.queues.setdefault(name, {'puts': 0, 'max_depth': 0, 'total_depth': 0})
+        depth = queue.qsize()
+        stats['puts'] += 1
+        stats['max_depth'] = max(stats['max_depth'], depth)
+        stats['total_depth'] += depth
+    
+    def summary(self) -> str:
+        """Human readable summary for the cycle log."""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        lines = [f"Pipeline finished in {elapsed:.2f}s"]
+        for stage, stats in self.stages.items():
+            average = stats['seconds'] / stats['batches'] if stats['batches'] else 0.0
+            lines.append(f"  {stage:>8}: {stats['batches']} batches, {stats['tweets']} tweets, "
+                         f"avg {average * 1000:.1f}ms, max {stats['max_seconds'] * 1000:.1f}ms")
+        for name, stats in self.queues.items():
+            average = stats['total_depth'] / stats['puts'] if stats['puts'] else 0.0
+            lines.append(f"  queue {name}: avg depth {average:.1f}, max depth {stats['max_depth']}")
+        if self.delivery_latencies:
+            lines.append(f"  fetch-to-notify: first {self.delivery_latencies[0]:.2f}s, "
+                         f"max {max(self.delivery_latencies):.2f}s")
+        return '\n'.join(lines)
+
+class StreamingPipeline:
+    """Run one cycle as fetch -> extract -> persist -> notify stages.
+    
+    Stages are connected by bounded queues, so a slow stage applies
+    backpressure instead of letting a whole cycle's tweets pile up in
+    memory. Each source's batch is committed (together with its since_id
+    cursor and its queued notifications) and delivered through the outbox
+    as soon as it clears the stages before it.
+    """
+    
+    def __init__(self, session: Session, fetch_source: FetchSource, outbox: Outbox,
+                 seen_cache: Optional[SeenTweetCache] = None, min_confidence: float = 70.0,
+                 queue_size: int = 4,
+                 batch_size: int = 64, n_process: int = 1,
+                 near_duplicates: Optional[NearDuplicateIndex] = None,
+                 opportunity_index: Optional[OpportunityIndex] = None,
+                 extraction_cache: Optional[ExtractionCache] = None,
+                 scorer: Optional[ScoringEngine] = None,
+                 reputation: Optional[AuthorReputation] = None):
+        self.session = session
+        self.fetch_source = fetch_source
+        self.outbox = outbox
+        self.seen_cache = seen_cache
+        self.scorer = scorer
+        self.trusted_authors = frozenset()
+        self.reputation = reputation
+        self.prefilter = PreFilter(min_confidence=min_confidence, scorer=scorer)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.near_duplicates = near_duplicates
+        self.opportunity_index = opportunity_index
+        self.extraction_cache = extraction_cache
+        self.metrics = PipelineMetrics()
+    
+    async def _put(self, name: str, queue: asyncio.Queue, batch: Optional[Batch]):
+        await queue.put(batch)
+        if batch is not None:
+            self.metrics.record_queue(name, queue)
+    
+    async def _fetch(self, out_queue: asyncio.Queue):
+        self.cursors = load_cursors(self.session)
+        if self.reputation is not None:
+            self.reputation.refresh_accounts(self.session)
+            self.trusted_authors = self.reputation.trusted
+        else:
+            self.trusted_authors = load_trusted_authors(self.session)
+        tasks = []
+        for source_type, source in get_sources(self.session):
+            cursor = get_cursor(self.session, self.cursors, source_type, source)
+            tasks.append(asyncio.create_task(
+                self._fetch_one(source_type, source, cursor.since_id)
+            ))
+        
+        # A tweet can appear in several sources; only pass it on once
+        passed_ids = set()
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                source_type, source, raw_tweets, started = await next_result
+                # The cursor covers every tweet fetched, even those passed on
+                # with another source's batch
+                newest_id = max((tweet.id for tweet in raw_tweets), default=None)
+                raw_tweets = [tweet for tweet in raw_tweets if str(tweet.id) not in passed_ids]
+                passed_ids.update(str(tweet.id) for tweet in raw_tweets)
+                tweets = filter_tweets(raw_tweets, self.session, seen_cache=self.seen_cache,
+                                       reputation=self.reputation)
+                
+                batch = Batch(source_type, source, newest_id, tweets)
+                self.metrics.record('fetch', batch, time.perf_counter() - started)
+                if newest_id is not None:
+                    # Even with no new tweets, so persist moves the cursor
+                    await self._put('extract', out_queue, batch)
+        finally:
+            for task in tasks:
+                task.cancel()
+        await self._put('extract', out_queue, None)
+    
+    async def _fetch_one(self, source_type: str, source: str, since_id: Optional[str]):
+        started = time.perf_counter()
+        raw_tweets = await self.fetch_source(source_type, source, since_id)
+        return source_type, source, raw_tweets, started
+    
+    async def _extract(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue):
+        while True:
+            batch = await in_queue.get()
+            if batch is None:
+                break
+            start = time.perf_counter()
+            candidates = batch.tweets
+            if self.near_duplicates is not None:
+                candidates = self.near_duplicates.collapse(candidates)
+            candidates = self.prefilter.filter(candidates)
+            # spaCy is CPU bound; keep the event loop free for fetches and sends
+            batch.opportunities = await asyncio.to_thread(
+                extract_airdrop_info_batch, candidates,
+                batch_size=self.batch_size, n_process=self.n_process, report=False,
+                cache=self.extraction_cache, scorer=self.scorer,
+                trusted_authors=self.trusted_authors, near_duplicates=self.near_duplicates,
+                reputation=self.reputation
+            )
+            self.metrics.record('extract', batch, time.perf_counter() - start)
+            await self._put('persist', out_queue, batch)
+        await self._put('persist', out_queue, None)
+    
+    async def _persist(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue):
+        while True:
+            batch = await in_queue.get()
+            if batch is None:
+                break
+            start = time.perf_counter()
+            if self.opportunity_index is not None:
+                merge = self.opportunity_index.merge(batch.opportunities, self.session)
+                bulk_save(self.session, batch.tweets, merge.new)
+                merge.save(self.session)
+            else:
+                bulk_save(self.session, batch.tweets, batch.opportunities)
+            if self.reputation is not None:
+                self.reputation.record_batch(self.session, batch.tweets, batch.opportunities)
+            cursor = get_cursor(self.session, self.cursors, batch.source_type, batch.source)
+            move_cursor(cursor, batch.newest_id)
+            if self.near_duplicates is not None:
+                self.near_duplicates.refresh_cluster_sizes(self.session, batch.tweets)
+            queued = self.outbox.enqueue(self.session)
+            with METRICS.timer('airdrop_db_commit_seconds'):
+                self.session.commit()
+            if self.near_duplicates is not None:
+                self.near_duplicates.save()
+            if self.seen_cache is not None:
+                self.seen_cache.add_many(tweet.tweet_id for tweet in batch.tweets)
+            self.metrics.record('persist', batch, time.perf_counter() - start)
+            if queued:
+                await self._put('notify', out_queue, batch)
+        await self._put('notify', out_queue, None)
+    
+    async def _notify(self, in_queue: asyncio.Queue):
+        while True:
+            batch = await in_queue.get()
+            if batch is None:
+                break
+            start = time.perf_counter()
+            await self.outbox.deliver(self.session)
+            self.metrics.record('notify', batch, time.perf_counter() - start)
+            self.metrics.delivery_latencies.append(time.perf_counter() - batch.fetched_at)
+    
+    async def run(self) -> PipelineMetrics:
+        """Run every stage until all sources have been fetched and drained."""
+        to_extract = asyncio.Queue(maxsize=self.queue_size)
+        to_persist = asyncio.Queue(maxsize=self.queue_size)
+        to_notify = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [
+            asyncio.create_task(self._fetch(to_extract)),
+            asyncio.create_task(self._extract(to_extract, to_persist)),
+            asyncio.create_task(self._persist(to_persist, to_notify)),
+            asyncio.create_task(self._notify(to_notify)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # If one stage failed, stop the others instead of leaving them blocked
+            for task in tasks:
+                task.cancel()
+            self.metrics.finished = time.perf_counter()
+        return self.metrics
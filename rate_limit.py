@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import httpx
+
+class TokenBucket:
+    """Rate limiter for one API endpoint family or destination.
+    
+    Refills continuously at capacity/window until the API reports its own
+    quota through the x-rate-limit-* headers. From then on the reported
+    remaining count is used and the bucket refills when the window resets.
+    """
+    
+    def __init__(self, capacity: int, window_seconds: float):
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.refill_rate = capacity / window_seconds
+        self.reset_at = None  # monotonic time the reported window resets
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        if self.reset_at is not None:
+            if now >= self.reset_at:
+                self.tokens = float(self.capacity)
+                self.reset_at = None
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+    
+    async def acquire(self):
+        """Wait until a request may be sent and take a token for it."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                if self.reset_at is not None:
+                    wait = self.reset_at - time.monotonic()
+                else:
+                    wait = (1 - self.tokens) / self.refill_rate
+                await asyncio.sleep(max(wait, 0.01))
+    
+    def update_from_headers(self, headers: httpx.Headers):
+        """Sync the bucket with the remaining-quota headers of a response."""
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        if remaining is not None:
+            self.tokens = min(float(self.capacity), float(remaining))
+        if reset is not None:
+            self.reset_at = time.monotonic() + max(0.0, int(reset) - time.time())
+    
+    def exhaust(self, seconds: float):
+        """Block the bucket for a while, e.g. after a 429 with Retry-After."""
+        self.tokens = 0.0
+        self.reset_at = time.monotonic() + seconds
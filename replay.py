@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+from tweepy.models import Status
+
+from models import init_db, bulk_save
+from fetch_tweets import MAX_TWEET_AGE_DAYS, SeenTweetCache, filter_tweets
+from extract_info import PreFilter, extract_airdrop_info_batch
+from near_duplicates import NearDuplicateIndex
+from opportunity_index import OpportunityIndex
+from extraction_cache import ExtractionCache
+from scoring import ScoringEngine, load_trusted_authors
+from author_reputation import AuthorReputation
+from notifications import DeliveryResult, NotificationManager
+from outbox import Outbox
+from metrics import METRICS
+
+REPLAY_STAGES = ['read', 'filter', 'extract', 'persist', 'notify']
+
+# Raw tweets read from the corpus and run through the stages together
+REPLAY_CHUNK_SIZE = 1000
+
+def read_corpus(path: str, chunk_size: int = REPLAY_CHUNK_SIZE) -> Iterator[List[Status]]:
+    """Yield lists of tweets from a JSONL file of Twitter v1.1 status objects."""
+    chunk = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            chunk.append(Status.parse(None, json.loads(line)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+class NullNotifier:
+    """Stands in for EmailNotifier or TelegramNotifier and accepts every message unsent."""
+    
+    def __init__(self, digest_size: int = 50):
+        self.digest_size = digest_size
+        self.messages = 0
+        self.opportunities = 0
+    
+    async def deliver(self, *args) -> List[DeliveryResult]:
+        # EmailNotifier.deliver takes the recipient first, TelegramNotifier.deliver doesn't
+        opportunities = args[-1]
+        results = [(opportunities[i:i + self.digest_size], None)
+                   for i in range(0, len(opportunities), self.digest_size)]
+        self.messages += len(results)
+        self.opportunities += len(opportunities)
+        return results
+
+def _max_rss() -> int:
+    """Peak resident set size of this process so far, in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class StageStats:
+    def __init__(self):
+        self.tweets = 0
+        self.latencies: List[float] = []  # seconds per chunk
+        self.memory = 0  # bytes; see ReplayReport
+
+class ReplayReport:
+    """Throughput, per-chunk latency and memory of every replay stage.
+    
+    With trace_memory, a stage's memory is the most it allocated on top
+    of what was already allocated, over all chunks (tracemalloc). Without
+    it, it is how much the stage raised the process's peak RSS in total,
+    which is free to measure but only sees new highs.
+    """
+    
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = {stage: StageStats() for stage in REPLAY_STAGES}
+        self.end_to_end: List[float] = []  # seconds from reading a chunk to delivering it
+        self.counts = {'read': 0, 'new': 0, 'extracted': 0, 'opportunities': 0}
+        self.started = time.perf_counter()
+        self.finished = None
+    
+    def summary(self) -> str:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rate = self.counts['read'] / elapsed if elapsed > 0 else 0.0
+        memory = 'peak alloc' if self.trace_memory else 'RSS growth'
+        lines = [
+            f"Replayed {self.counts['read']} tweets in {elapsed:.2f}s ({rate:,.0f} tweets/sec): "
+            f"{self.counts['new']} new, {self.counts['extracted']} extracted, "
+            f"{self.counts['opportunities']} opportunities",
+            f"  {'stage':>8} {'tweets':>9} {'tweets/sec':>11} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'max ms':>8} {memory:>11}",
+        ]
+        for stage, stats in self.stages.items():
+            if not stats.latencies:
+                continue
+            seconds = sum(stats.latencies)
+            stage_rate = stats.tweets / seconds if seconds > 0 else 0.0
+            lines.append(
+                f"  {stage:>8} {stats.tweets:>9} {stage_rate:>11,.0f} "
+                f"{_percentile(stats.latencies, 0.5) * 1000:>8.1f} "
+                f"{_percentile(stats.latencies, 0.95) * 1000:>8.1f} "
+                f"{_percentile(stats.latencies, 0.99) * 1000:>8.1f} "
+                f"{max(stats.latencies) * 1000:>8.1f} {stats.memory / 2 ** 20:>8.1f} MB"
+            )
+        if self.end_to_end:
+            lines.append(f"  chunk read to delivered: p50 {_percentile(self.end_to_end, 0.5) * 1000:.1f}ms, "
+                         f"p95 {_percentile(self.end_to_end, 0.95) * 1000:.1f}ms, "
+                         f"max {max(self.end_to_end) * 1000:.1f}ms")
+        steps = {dict(labels)['step']: timer[1] for (name, labels), timer in METRICS.timers.items()
+                 if name == 'airdrop_extract_step_seconds'}
+        if steps:
+            lines.append('  extract steps: ' + ', '.join(
+                f"{step} {seconds:.2f}s" for step, seconds in sorted(steps.items(), key=lambda item: -item[1])
+            ))
+        lines.append(f"  peak RSS: {_max_rss() / 2 ** 20:.1f} MB")
+        return '\n'.join(lines)
+
+class Replay:
+    """Run a corpus of raw tweets through the monitor's stages, offline.
+    
+    Each chunk goes through filter_tweets, the pre-filter and extraction,
+    is stored the way a cycle stores its tweets (merging, author stats and
+    queued notifications included) and the outbox is delivered. The
+    stages run one after another for each chunk, so the time and memory
+    measured for a stage are its own.
+    """
+    
+    def __init__(self, session: Session, outbox: Outbox,
+                 seen_cache: Optional[SeenTweetCache] = None, min_confidence: float = 70.0,
+                 max_age_days: int = MAX_TWEET_AGE_DAYS, batch_size: int = 64, n_process: int = 1,
+                 near_duplicates: Optional[NearDuplicateIndex] = None,
+                 opportunity_index: Optional[OpportunityIndex] = None,
+                 extraction_cache: Optional[ExtractionCache] = None,
+                 scorer: Optional[ScoringEngine] = None,
+                 reputation: Optional[AuthorReputation] = None,
+                 trace_memory: bool = False):
+        self.session = session
+        self.outbox = outbox
+        self.seen_cache = seen_cache
+        self.max_age_days = max_age_days
+        self.prefilter = PreFilter(min_confidence=min_confidence, scorer=scorer)
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.near_duplicates = near_duplicates
+        self.opportunity_index = opportunity_index
+        self.extraction_cache = extraction_cache
+        self.scorer = scorer
+        self.reputation = reputation
+        self.report = ReplayReport(trace_memory)
+    
+    def _begin(self) -> Tuple[float, int]:
+        if self.report.trace_memory:
+            tracemalloc.reset_peak()
+            return time.perf_counter(), tracemalloc.get_traced_memory()[0]
+        return time.perf_counter(), _max_rss()
+    
+    def _record(self, stage: str, tweets: int, begun: Tuple[float, int]):
+        start, baseline = begun
+        stats = self.report.stages[stage]
+        stats.latencies.append(time.perf_counter() - start)
+        stats.tweets += tweets
+        if self.report.trace_memory:
+            stats.memory = max(stats.memory, tracemalloc.get_traced_memory()[1] - baseline)
+        else:
+            stats.memory += _max_rss() - baseline
+    
+    async def run(self, chunks: Iterable[List[Status]]) -> ReplayReport:
+        """Replay every chunk, then deliver whatever is still due."""
+        if self.report.trace_memory:
+            tracemalloc.start()
+        if self.reputation is not None:
+            self.reputation.refresh_accounts(self.session)
+            trusted_authors = self.reputation.trusted
+        else:
+            trusted_authors = load_trusted_authors(self.session)
+        counts = self.report.counts
+        chunks = iter(chunks)
+        try:
+            while True:
+                begun = self._begin()
+                raw_tweets = next(chunks, None)
+                if raw_tweets is None:
+                    break
+                self._record('read', len(raw_tweets), begun)
+                chunk_started = begun[0]
+                counts['read'] += len(raw_tweets)
+                
+                begun = self._begin()
+                tweets = filter_tweets(raw_tweets, self.session, max_age_days=self.max_age_days,
+                                       seen_cache=self.seen_cache, reputation=self.reputation)
+                self._record('filter', len(raw_tweets), begun)
+                counts['new'] += len(tweets)
+                
+                begun = self._begin()
+                candidates = tweets
+                if self.near_duplicates is not None:
+                    candidates = self.near_duplicates.collapse(candidates)
+                candidates = self.prefilter.filter(candidates)
+                opportunities = extract_airdrop_info_batch(
+                    candidates, batch_size=self.batch_size, n_process=self.n_process, report=False,
+                    cache=self.extraction_cache, scorer=self.scorer, trusted_authors=trusted_authors,
+                    near_duplicates=self.near_duplicates, reputation=self.reputation
+                )
+                self._record('extract', len(tweets), begun)
+                counts['extracted'] += len(candidates)
+                counts['opportunities'] += len(opportunities)
+                
+                begun = self._begin()
+                if self.opportunity_index is not None:
+                    merge = self.opportunity_index.merge(opportunities, self.session)
+                    bulk_save(self.session, tweets, merge.new)
+                    merge.save(self.session)
+                else:
+                    bulk_save(self.session, tweets, opportunities)
+                if self.reputation is not None:
+                    self.reputation.record_batch(self.session, tweets, opportunities)
+                if self.near_duplicates is not None:
+                    self.near_duplicates.refresh_cluster_sizes(self.session, tweets)
+                self.outbox.enqueue(self.session)
+                with METRICS.timer('airdrop_db_commit_seconds'):
+                    self.session.commit()
+                if self.near_duplicates is not None:
+                    self.near_duplicates.save()
+                if self.seen_cache is not None:
+                    self.seen_cache.add_many(tweet.tweet_id for tweet in tweets)
+                self._record('persist', len(tweets), begun)
+                
+                begun = self._begin()
+                await self.outbox.deliver(self.session)
+                self._record('notify', len(tweets), begun)
+                self.report.end_to_end.append(time.perf_counter() - chunk_started)
+            
+            # deliver() sends a limited number per call; send the rest
+            begun = self._begin()
+            await self.outbox.drain(self.session, timeout=0)
+            self._record('notify', 0, begun)
+        finally:
+            self.report.finished = time.perf_counter()
+            if self.report.trace_memory:
+                tracemalloc.stop()
+        return self.report
+
+def build_replay(session: Session, stub_notifiers: bool = False, min_confidence: float = 70.0,
+                 near_duplicate_clustering: bool = False, merge: bool = True,
+                 cache_size: int = 50000, **options) -> Replay:
+    """A Replay with the same components as the monitor, warmed from the database.
+    
+    With stub_notifiers, notifications are queued and "delivered" to
+    NullNotifiers. Otherwise no channel is configured, so new
+    opportunities are marked notified without queuing anything, and a
+    monitor later running on the same database doesn't announce the
+    replayed history.
+    """
+    if stub_notifiers:
+        manager = NotificationManager(email_notifier=NullNotifier(), telegram_notifier=NullNotifier(),
+                                      min_confidence=min_confidence)
+        outbox = Outbox(manager, email_recipient='replay@localhost', min_confidence=min_confidence)
+    else:
+        outbox = Outbox(NotificationManager(min_confidence=min_confidence), min_confidence=min_confidence)
+    
+    seen_cache = SeenTweetCache()
+    seen_cache.warm(session)
+    reputation = AuthorReputation()
+    reputation.warm(session)
+    opportunity_index = None
+    if merge:
+        opportunity_index = OpportunityIndex(min_confidence=min_confidence)
+        opportunity_index.warm(session)
+    return Replay(
+        session,
+        outbox,
+        seen_cache=seen_cache,
+        min_confidence=min_confidence,
+        near_duplicates=NearDuplicateIndex() if near_duplicate_clustering else None,
+        opportunity_index=opportunity_index,
+        extraction_cache=ExtractionCache(max_entries=cache_size) if cache_size > 0 else None,
+        scorer=ScoringEngine(),
+        reputation=reputation,
+        **options
+    )
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Replay a JSONL corpus of tweets through the monitor, without the Twitter API.'
+    )
+    arg_parser.add_argument('corpus', help='JSONL file of Twitter v1.1 status objects')
+    arg_parser.add_argument('--database', default='sqlite:///airdrops.db')
+    arg_parser.add_argument('--chunk-size', type=int, default=REPLAY_CHUNK_SIZE)
+    arg_parser.add_argument('--max-age-days', type=int, default=MAX_TWEET_AGE_DAYS,
+                            help='drop older tweets, as a cycle would; raise it to backfill history')
+    arg_parser.add_argument('--min-confidence', type=float, default=70.0)
+    arg_parser.add_argument('--batch-size', type=int, default=64, help='tweets per nlp.pipe batch')
+    arg_parser.add_argument('--processes', type=int, default=1, help='worker processes for spaCy')
+    arg_parser.add_argument('--near-duplicates', action='store_true',
+                            help='extract only one tweet per cluster of near-duplicates')
+    arg_parser.add_argument('--no-merge', action='store_true', help='store one opportunity per tweet')
+    arg_parser.add_argument('--stub-notifiers', action='store_true',
+                            help='queue notifications and deliver them to stubs')
+    arg_parser.add_argument('--trace-memory', action='store_true',
+                            help='measure allocations per stage with tracemalloc (slower)')
+    args = arg_parser.parse_args()
+    
+    session = sessionmaker(bind=init_db(args.database))()
+    try:
+        replay = build_replay(
+            session,
+            stub_notifiers=args.stub_notifiers,
+            min_confidence=args.min_confidence,
+            near_duplicate_clustering=args.near_duplicates,
+            merge=not args.no_merge,
+            max_age_days=args.max_age_days,
+            batch_size=args.batch_size,
+            n_process=args.processes,
+            trace_memory=args.trace_memory
+        )
+        report = asyncio.run(replay.run(read_corpus(args.corpus, args.chunk_size)))
+        print(report.summary())
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import delete, or_, select, union, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import ProcessedTweet, AirdropOpportunity, OpportunitySource
+from fetch_tweets import MAX_TWEET_AGE_DAYS
+
+ARCHIVE_CHUNK_SIZE = 5000
+
+ARCHIVED_COLUMNS = [
+    ProcessedTweet.id, ProcessedTweet.tweet_id, ProcessedTweet.author_id,
+    ProcessedTweet.text, ProcessedTweet.processed_text, ProcessedTweet.created_at,
+    ProcessedTweet.processed_at, ProcessedTweet.is_retweet, ProcessedTweet.is_reply,
+]
+
+def _opportunity_tweet_ids():
+    return union(
+        select(AirdropOpportunity.tweet_id).where(AirdropOpportunity.tweet_id.isnot(None)),
+        select(OpportunitySource.tweet_id),
+    )
+
+def _write_segments(archive_dir: str, rows: List) -> Dict[str, int]:
+    """Append rows to gzip JSONL files, one per processed_at day."""
+    segments = defaultdict(list)
+    for row in rows:
+        day = (row.processed_at or datetime.utcnow()).strftime('%Y-%m-%d')
+        segments[day].append(row)
+    
+    os.makedirs(archive_dir, exist_ok=True)
+    written = {}
+    for day, day_rows in segments.items():
+        path = os.path.join(archive_dir, f"processed_tweets-{day}.jsonl.gz")
+        # Appending adds a new gzip member, which gzip readers handle transparently
+        with gzip.open(path, 'at', encoding='utf-8') as f:
+            for row in day_rows:
+                record = {
+                    'tweet_id': row.tweet_id,
+                    'author_id': row.author_id,
+                    'text': row.text,
+                    'processed_text': row.processed_text,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
+                    'processed_at': row.processed_at.isoformat() if row.processed_at else None,
+                    'is_retweet': row.is_retweet,
+                    'is_reply': row.is_reply,
+                }
+                f.write(json.dumps(record) + '\n')
+        written[path] = len(day_rows)
+    return written
+
+def archive_old_tweets(session: Session, archive_dir: str, older_than_days: int = MAX_TWEET_AGE_DAYS,
+                       chunk_size: int = ARCHIVE_CHUNK_SIZE) -> int:
+    """Move the text of old non-opportunity tweets to the archive.
+    
+    The rows stay behind as tombstones (ID, author and timestamps only)
+    so dedup keeps working. Each chunk is written to the archive before
+    its text is cleared, so a crash can at worst archive a chunk twice.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    last_id = 0
+    
+    while True:
+        rows = session.execute(
+            select(*ARCHIVED_COLUMNS)
+            .where(ProcessedTweet.id > last_id,
+                   ProcessedTweet.processed_at < cutoff,
+                   or_(ProcessedTweet.text.isnot(None), ProcessedTweet.processed_text.isnot(None)),
+                   ProcessedTweet.tweet_id.not_in(_opportunity_tweet_ids()))
+            .order_by(ProcessedTweet.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        
+        _write_segments(archive_dir, rows)
+        session.execute(
+            update(ProcessedTweet)
+            .where(ProcessedTweet.id.in_([row.id for row in rows]))
+            .values(text=None, processed_text=None)
+        )
+        session.commit()
+        
+        archived += len(rows)
+        last_id = rows[-1].id
+    
+    return archived
+
+def delete_old_tombstones(session: Session, older_than_days: int) -> int:
+    """Delete tombstones too old to matter for dedup.
+    
+    filter_tweets drops any tweet older than MAX_TWEET_AGE_DAYS before
+    checking for duplicates, so tombstones past that age are never read.
+    """
+    if older_than_days < MAX_TWEET_AGE_DAYS:
+        raise ValueError(f"Tombstones are needed for dedup for at least {MAX_TWEET_AGE_DAYS} days")
+    
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = session.execute(
+        delete(ProcessedTweet)
+        .where(ProcessedTweet.processed_at < cutoff,
+               ProcessedTweet.text.is_(None),
+               ProcessedTweet.processed_text.is_(None),
+               ProcessedTweet.tweet_id.not_in(_opportunity_tweet_ids()))
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return result.rowcount
+
+def enable_incremental_vacuum(engine: Engine):
+    """Switch an existing SQLite database to incremental auto-vacuum.
+    
+    New databases get this from init_db. Older ones need a one-time full
+    VACUUM, which rewrites the file and can take a while. Does nothing if
+    it is already enabled.
+    """
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() == 2:
+            return
+        print("Enabling incremental vacuum; the one-time VACUUM can take a while")
+        conn.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.exec_driver_sql('VACUUM')
+    # Connections opened before still report the old mode
+    engine.dispose()
+
+def incremental_vacuum(engine: Engine, max_pages: int = 0) -> bool:
+    """Return free pages to the OS; max_pages=0 frees them all."""
+    with engine.connect() as conn:
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+            print("Incremental vacuum is not enabled for this database; "
+                  "see retention.enable_incremental_vacuum")
+            return False
+        # The pragma frees one page per step and sqlite3's execute() only
+        # steps once, so run it through executescript() to completion
+        conn.connection.executescript(f'PRAGMA incremental_vacuum({max_pages});')
+    return True
+
+def run_retention(engine: Engine, session: Session, archive_dir: str,
+                  text_retention_days: int = MAX_TWEET_AGE_DAYS,
+                  tombstone_retention_days: int = 0, vacuum_pages: int = 0):
+    """Archive old tweet text, prune tombstones (if enabled) and vacuum."""
+    archived = archive_old_tweets(session, archive_dir, older_than_days=text_retention_days)
+    deleted = 0
+    if tombstone_retention_days:
+        deleted = delete_old_tombstones(session, tombstone_retention_days)
+    vacuumed = incremental_vacuum(engine, vacuum_pages)
+    print(f"Retention: archived {archived} tweets, deleted {deleted} tombstones"
+          f"{', vacuumed' if vacuumed else ''}")
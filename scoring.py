@@ -0,0 +1,208 @@
+import json
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from author_reputation import DEFAULT_REPUTATION
+from models import AirdropOpportunity, OpportunityRecord, ProcessedTweet, TweetRecord, TwitterAccount
+from text_scan import SPAM_KEYWORDS, count_spam
+
+# Columns of the feature matrix
+FEATURES = [
+    'project_name',         # 1 if NER found a project
+    'token_symbol',         # 1 if a token symbol was found
+    'deadline',             # 1 if a deadline was parsed
+    'participation_steps',  # 1 if participation steps were found
+    'spam_terms',           # distinct spam keywords in the text
+    'trusted_author',       # 1 if the author is a trusted TwitterAccount
+    'cluster_size',         # log2 of the near-duplicate cluster size
+    'age_hours',            # hours between the tweet and its scoring
+    'author_reputation',    # 0-1, see author_reputation.AuthorReputation
+]
+
+# The original hard-coded score; the newer features are off by default
+DEFAULT_WEIGHTS = {
+    'project_name': 20.0,
+    'token_symbol': 20.0,
+    'deadline': 15.0,
+    'participation_steps': 15.0,
+    'spam_terms': -5.0,
+    'trusted_author': 0.0,
+    'cluster_size': 0.0,
+    'age_hours': 0.0,
+    'author_reputation': 0.0,
+}
+
+MAX_CLUSTER_DOUBLINGS = 10.0
+# Older tweets are dropped before extraction anyway
+MAX_AGE_HOURS = 7 * 24.0
+
+# Range of each feature, for upper bounds on the score
+FEATURE_RANGES = {
+    'project_name': (0.0, 1.0),
+    'token_symbol': (0.0, 1.0),
+    'deadline': (0.0, 1.0),
+    'participation_steps': (0.0, 1.0),
+    'spam_terms': (0.0, float(len(SPAM_KEYWORDS))),
+    'trusted_author': (0.0, 1.0),
+    'cluster_size': (0.0, MAX_CLUSTER_DOUBLINGS),
+    'age_hours': (0.0, MAX_AGE_HOURS),
+    'author_reputation': (0.0, 1.0),
+}
+
+RESCORE_BATCH_SIZE = 5000
+
+def load_trusted_authors(session: Session) -> Set[str]:
+    """Lowercased usernames of trusted accounts."""
+    rows = session.query(TwitterAccount.username).filter(TwitterAccount.is_trusted.is_(True))
+    return {username.lower() for (username,) in rows}
+
+def feature_row(project_name, token_symbol, deadline, participation_steps,
+                text: Optional[str], author_username: Optional[str], cluster_size: Optional[int],
+                posted_at: Optional[datetime], scored_at: datetime,
+                trusted_authors: Set[str],
+                author_reputation: float = DEFAULT_REPUTATION) -> List[float]:
+    """Feature values for one opportunity, in FEATURES order."""
+    age_hours = 0.0
+    if posted_at is not None:
+        age_hours = min(max((scored_at - posted_at).total_seconds() / 3600, 0.0), MAX_AGE_HOURS)
+    return [
+        1.0 if project_name else 0.0,
+        1.0 if token_symbol else 0.0,
+        1.0 if deadline else 0.0,
+        1.0 if participation_steps else 0.0,
+        float(count_spam(text or '')),
+        1.0 if author_username and author_username.lower() in trusted_authors else 0.0,
+        min(math.log2(max(cluster_size or 1, 1)), MAX_CLUSTER_DOUBLINGS),
+        age_hours,
+        author_reputation,
+    ]
+
+class ScoringEngine:
+    """Confidence score as a weighted sum of features, clipped to 0-100.
+    
+    A batch of opportunities is turned into a feature matrix and scored
+    with one matrix-vector product.
+    """
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None, bias: float = 0.0):
+        unknown = set(weights or {}) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown scoring features: {', '.join(sorted(unknown))}")
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.bias = float(bias)
+        self.vector = np.array([self.weights[feature] for feature in FEATURES], dtype=np.float64)
+    
+    @classmethod
+    def from_file(cls, path: str) -> 'ScoringEngine':
+        """Load {"weights": {feature: weight}, "bias": 0} from a JSON file."""
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config.get('weights'), config.get('bias', 0.0))
+    
+    def score_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        return np.clip(matrix @ self.vector + self.bias, 0.0, 100.0)
+    
+    def feature_matrix(self, opportunities: List[OpportunityRecord],
+                       tweets: Dict[str, TweetRecord], trusted_authors: Set[str] = frozenset(),
+                       now: Optional[datetime] = None, reputation=None) -> np.ndarray:
+        now = now or datetime.utcnow()
+        rows = []
+        for opportunity in opportunities:
+            tweet = tweets.get(opportunity.tweet_id)
+            author_reputation = DEFAULT_REPUTATION
+            if reputation is not None and tweet is not None:
+                author_reputation = reputation.reputation(tweet.author_id, tweet.author_username)
+            rows.append(feature_row(
+                opportunity.project_name, opportunity.token_symbol, opportunity.deadline,
+                opportunity.participation_steps,
+                tweet.processed_text if tweet is not None else None,
+                tweet.author_username if tweet is not None else None,
+                opportunity.cluster_size,
+                tweet.created_at if tweet is not None else None,
+                opportunity.created_at or now,
+                trusted_authors,
+                author_reputation
+            ))
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(FEATURES))
+    
+    def score_opportunities(self, opportunities: List[OpportunityRecord],
+                            tweets: Iterable[TweetRecord], trusted_authors: Set[str] = frozenset(),
+                            now: Optional[datetime] = None, reputation=None):
+        """Set confidence_score on every opportunity from its tweet's features.
+        
+        reputation is an AuthorReputation; without one every author gets
+        the reputation of an author never seen before.
+        """
+        if not opportunities:
+            return
+        tweets_by_id = {tweet.tweet_id: tweet for tweet in tweets}
+        matrix = self.feature_matrix(opportunities, tweets_by_id, trusted_authors, now, reputation)
+        scores = self.score_matrix(matrix)
+        for opportunity, score in zip(opportunities, scores.tolist()):
+            opportunity.confidence_score = score
+    
+    def max_possible_score(self, known: Dict[str, float]) -> float:
+        """Highest score reachable when only the known features are fixed."""
+        score = self.bias
+        for feature in FEATURES:
+            weight = self.weights[feature]
+            if feature in known:
+                score += weight * known[feature]
+            else:
+                low, high = FEATURE_RANGES[feature]
+                score += max(weight * low, weight * high)
+        return max(0.0, min(100.0, score))
+
+DEFAULT_SCORER = ScoringEngine()
+
+def rescore_opportunities(session: Session, engine: ScoringEngine,
+                          batch_size: int = RESCORE_BATCH_SIZE, reputation=None) -> int:
+    """Recompute stored confidence scores with the engine's weights.
+    
+    Reads opportunities in primary key order, batch_size at a time, and
+    writes back the scores that changed. Returns how many did. Pass the
+    loaded AuthorReputation as reputation when author_reputation has a weight.
+    """
+    trusted_authors = load_trusted_authors(session)
+    now = datetime.utcnow()
+    query = (
+        select(AirdropOpportunity.id, AirdropOpportunity.project_name, AirdropOpportunity.token_symbol,
+               AirdropOpportunity.deadline, AirdropOpportunity.participation_steps,
+               AirdropOpportunity.cluster_size, AirdropOpportunity.created_at,
+               AirdropOpportunity.confidence_score, ProcessedTweet.processed_text,
+               ProcessedTweet.author_id, ProcessedTweet.author_username,
+               ProcessedTweet.created_at.label('posted_at'))
+        .outerjoin(ProcessedTweet, ProcessedTweet.tweet_id == AirdropOpportunity.tweet_id)
+        .order_by(AirdropOpportunity.id)
+        .limit(batch_size)
+    )
+    changed = 0
+    last_id = 0
+    while True:
+        rows = session.execute(query.where(AirdropOpportunity.id > last_id)).all()
+        if not rows:
+            break
+        features = []
+        for row in rows:
+            author_reputation = DEFAULT_REPUTATION
+            if reputation is not None and row.author_id is not None:
+                author_reputation = reputation.reputation(row.author_id, row.author_username)
+            features.append(feature_row(
+                row.project_name, row.token_symbol, row.deadline, row.participation_steps,
+                row.processed_text, row.author_username, row.cluster_size,
+                row.posted_at, row.created_at or now, trusted_authors, author_reputation
+            ))
+        matrix = np.array(features, dtype=np.float64)
+        scores = engine.score_matrix(matrix).tolist()
+        updates = [{'id': row.id, 'confidence_score': score}
+                   for row, score in zip(rows, scores) if row.confidence_score != score]
+        if updates:
+            session.execute(update(AirdropOpportunity), updates)
+            changed += len(updates)
+        last_id = rows[-1].id
+    return changed
@@ -0,0 +1,486 @@
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import queue
+import signal
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from models import TweetRecord, OpportunityRecord, init_db, bulk_save
+from fetch_tweets import (SeenTweetCache, filter_tweets, find_processed_ids, get_cursor,
+                          get_sources, load_cursors, move_cursor)
+from extract_info import PreFilter, extract_airdrop_info_batch
+from extraction_cache import ExtractionCache
+from scoring import ScoringEngine
+from author_reputation import AuthorReputation, MIN_AUTHOR_TWEETS
+from opportunity_index import OpportunityIndex
+from outbox import Outbox
+from metrics import METRICS
+
+# Points per worker on the hash ring; more points spread sources more evenly
+RING_REPLICAS = 100
+# How often the coordinator checks on its workers while waiting for results
+POLL_SECONDS = 1.0
+# Sources not back by then are dropped for the cycle and fetched again next time
+CYCLE_TIMEOUT_SECONDS = 600.0
+# How long to wait for a new worker to load the model
+WORKER_START_TIMEOUT_SECONDS = 300.0
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def source_key(source_type: str, source: str) -> str:
+    return f"{source_type}:{source.lower()}"
+
+class HashRing:
+    """Consistent hashing of keys onto nodes.
+    
+    Every node owns `replicas` points on a 64-bit ring and a key belongs to
+    the node with the next point after the key's hash, so adding or
+    removing one of N nodes only moves about 1/N of the keys.
+    """
+    
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = RING_REPLICAS):
+        self.replicas = replicas
+        self.nodes = set()
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+    
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for replica in range(self.replicas):
+            point = _hash64(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+    
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+    
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash64(key)) % len(self._points)
+        return self._owners[index]
+    
+    def assign(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """Group keys by the node that owns them."""
+        assignment: Dict[str, List[str]] = {}
+        for key in keys:
+            assignment.setdefault(self.owner(key), []).append(key)
+        return assignment
+
+class WorkerConfig:
+    """Everything a worker process needs; sent to it when it is spawned."""
+    
+    def __init__(self, db_url: str, twitter_credentials: Tuple[str, str, str, str],
+                 async_fetch: bool = True, fetch_concurrency: int = 8,
+                 twitter_base_url: Optional[str] = None, min_confidence: float = 70.0,
+                 scoring_weights_path: str = '', min_author_reputation: float = 0.0,
+                 min_author_tweets: int = MIN_AUTHOR_TWEETS, batch_size: int = 64,
+                 seen_cache_size: int = 100000, extraction_cache_size: int = 50000,
+                 extraction_cache_ttl_hours: float = 24.0, blank_model: bool = False):
+        self.db_url = db_url
+        self.twitter_credentials = twitter_credentials
+        self.async_fetch = async_fetch
+        self.fetch_concurrency = fetch_concurrency
+        self.twitter_base_url = twitter_base_url
+        self.min_confidence = min_confidence
+        self.scoring_weights_path = scoring_weights_path
+        self.min_author_reputation = min_author_reputation
+        self.min_author_tweets = min_author_tweets
+        self.batch_size = batch_size
+        self.seen_cache_size = seen_cache_size
+        self.extraction_cache_size = extraction_cache_size
+        self.extraction_cache_ttl_hours = extraction_cache_ttl_hours
+        # A blank spaCy pipeline instead of the model, for benchmarks
+        self.blank_model = blank_model
+
+class IngestBatch:
+    """One source's new tweets and opportunities, sent from a worker to the writer."""
+    
+    def __init__(self, worker_id: str, cycle_id: int, source_type: str, source: str,
+                 newest_id: Optional[int] = None, tweets: List[TweetRecord] = (),
+                 opportunities: List[OpportunityRecord] = (), fetch_seconds: float = 0.0,
+                 extract_seconds: float = 0.0, error: Optional[str] = None):
+        self.worker_id = worker_id
+        self.cycle_id = cycle_id
+        self.source_type = source_type
+        self.source = source
+        self.newest_id = newest_id
+        self.tweets = list(tweets)
+        self.opportunities = list(opportunities)
+        self.fetch_seconds = fetch_seconds
+        self.extract_seconds = extract_seconds
+        self.error = error
+
+class ShardWorker:
+    """Fetches, filters and extracts the sources it is given, in its own process.
+    
+    It only reads the database: for dedup, author flags and stats. What
+    it finds goes back to the coordinator as IngestBatches.
+    """
+    
+    def __init__(self, worker_id: str, config: WorkerConfig):
+        self.worker_id = worker_id
+        self.config = config
+        self.Session = sessionmaker(bind=init_db(config.db_url))
+        self.scorer = (ScoringEngine.from_file(config.scoring_weights_path)
+                       if config.scoring_weights_path else ScoringEngine())
+        self.prefilter = PreFilter(min_confidence=config.min_confidence, scorer=self.scorer)
+        self.reputation = AuthorReputation(min_reputation=config.min_author_reputation,
+                                           min_tweets=config.min_author_tweets)
+        self.seen_cache = SeenTweetCache(config.seen_cache_size) if config.seen_cache_size > 0 else None
+        # Memory only: an SQLite tier shared by every worker would be written concurrently
+        self.extraction_cache = ExtractionCache(
+            max_entries=config.extraction_cache_size,
+            ttl_seconds=config.extraction_cache_ttl_hours * 3600
+        ) if config.extraction_cache_size > 0 else None
+        self.fetcher = None
+        self.fetcher_share = None
+        self.twitter_client = None
+    
+    def warm(self):
+        """Load author stats, recent tweet IDs and the spaCy model."""
+        import extract_info
+        session = self.Session()
+        try:
+            self.reputation.warm(session)
+            if self.seen_cache is not None:
+                self.seen_cache.warm(session)
+        finally:
+            session.close()
+        if self.config.blank_model:
+            import spacy
+            extract_info._nlp = spacy.blank('en')
+            extract_info._nlp.add_pipe('sentencizer')
+        else:
+            extract_info.get_nlp()
+    
+    async def _fetch(self, source_type: str, source: str, since_id: Optional[str],
+                     rate_limit_share: float):
+        start = time.perf_counter()
+        try:
+            if self.config.async_fetch:
+                if self.fetcher_share != rate_limit_share:
+                    # The worker count changed; resize this worker's share of the quotas
+                    from async_fetch import AsyncTwitterFetcher
+                    if self.fetcher is not None:
+                        await self.fetcher.aclose()
+                    options = {'base_url': self.config.twitter_base_url} if self.config.twitter_base_url else {}
+                    self.fetcher = AsyncTwitterFetcher(
+                        *self.config.twitter_credentials,
+                        max_concurrency=self.config.fetch_concurrency,
+                        rate_limit_share=rate_limit_share,
+                        **options
+                    )
+                    self.fetcher_share = rate_limit_share
+                _, _, tweets = await self.fetcher.fetch_source(source_type, source, since_id=since_id)
+            else:
+                from fetch_tweets import TwitterClient
+                if self.twitter_client is None:
+                    self.twitter_client = TwitterClient(*self.config.twitter_credentials)
+                if source_type == 'account':
+                    tweets = self.twitter_client.get_user_tweets(source, since_id)
+                else:
+                    tweets = self.twitter_client.search_tweets(source, since_id)
+            return source_type, source, tweets, time.perf_counter() - start, None
+        except Exception as e:
+            return source_type, source, [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    
+    async def process(self, cycle_id: int, sources: List[Tuple[str, str, Optional[str]]],
+                      rate_limit_share: float, results):
+        """Fetch every source, then filter and extract each one as its fetch completes."""
+        session = self.Session()
+        try:
+            if self.config.min_author_reputation > 0:
+                # Stats are written by the coordinator; reload them for the reputation cutoff
+                self.reputation.warm(session)
+            else:
+                self.reputation.refresh_accounts(session)
+            fetches = [asyncio.ensure_future(self._fetch(source_type, source, since_id, rate_limit_share))
+                       for source_type, source, since_id in sources]
+            # A tweet can appear in several of this worker's sources; only pass it on once
+            passed_ids = set()
+            for next_result in asyncio.as_completed(fetches):
+                source_type, source, raw_tweets, fetch_seconds, error = await next_result
+                if error is not None:
+                    results.put(IngestBatch(self.worker_id, cycle_id, source_type, source,
+                                            fetch_seconds=fetch_seconds, error=error))
+                    continue
+                start = time.perf_counter()
+                newest_id = max((tweet.id for tweet in raw_tweets), default=None)
+                raw_tweets = [tweet for tweet in raw_tweets if str(tweet.id) not in passed_ids]
+                passed_ids.update(str(tweet.id) for tweet in raw_tweets)
+                tweets = filter_tweets(raw_tweets, session, seen_cache=self.seen_cache,
+                                       reputation=self.reputation)
+                opportunities = extract_airdrop_info_batch(
+                    self.prefilter.filter(tweets), batch_size=self.config.batch_size, report=False,
+                    cache=self.extraction_cache, scorer=self.scorer,
+                    trusted_authors=self.reputation.trusted, reputation=self.reputation
+                )
+                # Not added to seen_cache: only the coordinator knows whether the
+                # batch was committed, and a failed one is fetched again. Stored
+                # tweets are still skipped by filter_tweets' database check.
+                results.put(IngestBatch(self.worker_id, cycle_id, source_type, source, newest_id,
+                                        tweets, opportunities, fetch_seconds,
+                                        time.perf_counter() - start))
+        finally:
+            session.close()
+    
+    def run(self, tasks, results, ready):
+        """Serve tasks until a None arrives."""
+        self.warm()
+        ready.set()
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                task = tasks.get()
+                if task is None:
+                    break
+                cycle_id, sources, rate_limit_share = task
+                loop.run_until_complete(self.process(cycle_id, sources, rate_limit_share, results))
+        finally:
+            if self.fetcher is not None:
+                loop.run_until_complete(self.fetcher.aclose())
+            loop.close()
+
+def run_worker(worker_id: str, config: WorkerConfig, tasks, results, ready):
+    """Entry point of a worker process."""
+    # Ctrl+C reaches the whole process group; the coordinator stops workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ShardWorker(worker_id, config).run(tasks, results, ready)
+
+class IngestWriter:
+    """Stores workers' batches; the coordinator's single connection that writes.
+    
+    A tweet can come back from sources owned by different workers, so the
+    tweets of every batch are checked against the database again before
+    they are stored. Each batch is committed with its since_id cursor and
+    queued notifications, as in the streaming pipeline.
+    """
+    
+    def __init__(self, session: Session, outbox: Outbox,
+                 seen_cache: Optional[SeenTweetCache] = None,
+                 opportunity_index: Optional[OpportunityIndex] = None,
+                 reputation: Optional[AuthorReputation] = None):
+        self.session = session
+        self.outbox = outbox
+        self.seen_cache = seen_cache
+        self.opportunity_index = opportunity_index
+        self.reputation = reputation
+        self.cursors = load_cursors(session)
+        self.stats = {'batches': 0, 'tweets': 0, 'duplicates': 0, 'opportunities': 0}
+    
+    def write(self, batch: IngestBatch) -> int:
+        """Store one batch and commit; returns how many opportunities were queued."""
+        tweets = batch.tweets
+        if self.seen_cache is not None:
+            tweets = [tweet for tweet in tweets if tweet.tweet_id not in self.seen_cache]
+        existing = find_processed_ids([tweet.tweet_id for tweet in tweets], self.session)
+        tweets = [tweet for tweet in tweets if tweet.tweet_id not in existing]
+        kept_ids = {tweet.tweet_id for tweet in tweets}
+        opportunities = [opportunity for opportunity in batch.opportunities
+                         if opportunity.tweet_id in kept_ids]
+        
+        if self.opportunity_index is not None:
+            merge = self.opportunity_index.merge(opportunities, self.session)
+            bulk_save(self.session, tweets, merge.new)
+            merge.save(self.session)
+        else:
+            bulk_save(self.session, tweets, opportunities)
+        if self.reputation is not None:
+            self.reputation.record_batch(self.session, tweets, opportunities)
+        if batch.newest_id is not None:
+            cursor = get_cursor(self.session, self.cursors, batch.source_type, batch.source)
+            move_cursor(cursor, batch.newest_id)
+        queued = self.outbox.enqueue(self.session)
+        with METRICS.timer('airdrop_db_commit_seconds'):
+            self.session.commit()
+        if self.seen_cache is not None:
+            self.seen_cache.add_many(kept_ids)
+        
+        self.stats['batches'] += 1
+        self.stats['tweets'] += len(tweets)
+        self.stats['duplicates'] += len(batch.tweets) - len(tweets)
+        self.stats['opportunities'] += len(opportunities)
+        return queued
+
+class _WorkerHandle:
+    def __init__(self, process, tasks, ready):
+        self.process = process
+        self.tasks = tasks
+        self.ready = ready
+
+class ShardCoordinator:
+    """Spreads each cycle's sources over worker processes and writes their results.
+    
+    Sources are assigned by consistent hashing of their names onto the
+    workers that are up, so a worker joining or leaving only moves the
+    sources it gains or loses. Workers fetch, filter and extract in
+    parallel and send back one IngestBatch per source over a shared queue.
+    The coordinator writes them one at a time, so SQLite keeps a single
+    writer while the workers only read (WAL lets them read during writes).
+    A worker that dies is taken off the ring and its unfinished sources
+    are handed to the others in the same cycle; a replacement is started
+    for the next one.
+    """
+    
+    def __init__(self, config: WorkerConfig, workers: int, replicas: int = RING_REPLICAS,
+                 cycle_timeout: float = CYCLE_TIMEOUT_SECONDS):
+        self.config = config
+        self.target_workers = max(1, workers)
+        self.ring = HashRing(replicas=replicas)
+        self.cycle_timeout = cycle_timeout
+        # Workers are spawned, not forked: the coordinator has threads and open connections
+        self.context = multiprocessing.get_context('spawn')
+        self.results = self.context.Queue()
+        self.workers: Dict[str, _WorkerHandle] = {}
+        self.owners: Dict[str, str] = {}  # source key -> worker it was last assigned to
+        self.cycle_id = 0
+        self._started = 0
+        self.stats = {'cycles': 0, 'workers_started': 0, 'workers_lost': 0, 'moved': 0, 'reassigned': 0,
+                      'errors': 0, 'timed_out': 0}
+    
+    def _start_worker(self) -> str:
+        self._started += 1
+        worker_id = f"worker-{self._started}"
+        tasks = self.context.Queue()
+        ready = self.context.Event()
+        process = self.context.Process(target=run_worker, name=worker_id, daemon=True,
+                                       args=(worker_id, self.config, tasks, self.results, ready))
+        process.start()
+        self.workers[worker_id] = _WorkerHandle(process, tasks, ready)
+        self.stats['workers_started'] += 1
+        return worker_id
+    
+    def _stop_worker(self, worker_id: str):
+        handle = self.workers.pop(worker_id)
+        self.ring.remove(worker_id)
+        if handle.process.is_alive():
+            # Finishes the tasks it already has, then exits
+            handle.tasks.put(None)
+    
+    def scale(self, workers: int):
+        """Change the number of workers from the next cycle on."""
+        self.target_workers = max(1, workers)
+    
+    def sync_workers(self):
+        """Drop dead workers, start or stop workers to match the target, and put ready ones on the ring."""
+        for worker_id, handle in list(self.workers.items()):
+            if not handle.process.is_alive():
+                print(f"Shard {worker_id} exited with code {handle.process.exitcode}")
+                self.workers.pop(worker_id)
+                self.ring.remove(worker_id)
+                self.stats['workers_lost'] += 1
+        while len(self.workers) < self.target_workers:
+            self._start_worker()
+        while len(self.workers) > self.target_workers:
+            self._stop_worker(max(self.workers, key=lambda worker_id: int(worker_id.split('-')[1])))
+        for worker_id, handle in self.workers.items():
+            if handle.ready.is_set():
+                self.ring.add(worker_id)
+    
+    def start(self, timeout: float = WORKER_START_TIMEOUT_SECONDS):
+        """Start the workers and wait until they have loaded the model."""
+        self.sync_workers()
+        deadline = time.monotonic() + timeout
+        # Stop waiting early for workers that crashed while loading
+        while time.monotonic() < deadline and any(
+                not handle.ready.is_set() and handle.process.is_alive() for handle in self.workers.values()):
+            time.sleep(0.1)
+        self.sync_workers()
+        if not self.ring:
+            raise RuntimeError(f"No shard worker became ready within {timeout:g}s")
+    
+    def stop(self, timeout: float = 10.0):
+        for worker_id in list(self.workers):
+            handle = self.workers[worker_id]
+            self._stop_worker(worker_id)
+            handle.process.join(timeout)
+            if handle.process.is_alive():
+                handle.process.terminate()
+    
+    def _dispatch(self, keys: List[str], sources: Dict[str, Tuple[str, str, Optional[str]]],
+                  pending: Dict[str, Optional[str]]):
+        if not self.ring:
+            for key in keys:
+                pending[key] = None
+            return
+        rate_limit_share = 1.0 / len(self.ring)
+        for worker_id, worker_keys in self.ring.assign(keys).items():
+            self.workers[worker_id].tasks.put(
+                (self.cycle_id, [sources[key] for key in worker_keys], rate_limit_share)
+            )
+            for key in worker_keys:
+                if self.owners.get(key, worker_id) != worker_id:
+                    self.stats['moved'] += 1
+                self.owners[key] = worker_id
+                pending[key] = worker_id
+    
+    def _check_workers(self, sources, pending: Dict[str, Optional[str]]):
+        """Hand the pending sources of workers that died to the ones still up."""
+        self.sync_workers()
+        orphaned = [key for key, worker_id in pending.items() if worker_id not in self.ring.nodes]
+        if orphaned and self.ring:
+            self.stats['reassigned'] += len(orphaned)
+            self._dispatch(orphaned, sources, pending)
+    
+    async def run_cycle(self, writer: IngestWriter) -> Dict[str, int]:
+        """Fetch and extract every source on the workers and write the results; returns the writer's stats."""
+        self.sync_workers()
+        self.cycle_id += 1
+        self.stats['cycles'] += 1
+        sources = {}
+        for source_type, source in get_sources(writer.session):
+            cursor = get_cursor(writer.session, writer.cursors, source_type, source)
+            sources[source_key(source_type, source)] = (source_type, source, cursor.since_id)
+        pending: Dict[str, Optional[str]] = {}
+        self._dispatch(list(sources), sources, pending)
+        
+        deadline = time.monotonic() + self.cycle_timeout
+        next_check = time.monotonic() + POLL_SECONDS
+        while pending and time.monotonic() < deadline:
+            if time.monotonic() >= next_check:
+                self._check_workers(sources, pending)
+                next_check = time.monotonic() + POLL_SECONDS
+            try:
+                batch = await asyncio.to_thread(self.results.get, True, POLL_SECONDS)
+            except queue.Empty:
+                continue
+            key = source_key(batch.source_type, batch.source)
+            # Late answers from an earlier cycle, or a source answered after it was reassigned
+            if batch.cycle_id != self.cycle_id or key not in pending:
+                continue
+            del pending[key]
+            METRICS.observe('airdrop_stage_seconds', batch.fetch_seconds, stage='fetch')
+            if batch.error is not None:
+                print(f"Shard {batch.worker_id} failed to fetch {batch.source}: {batch.error}")
+                self.stats['errors'] += 1
+                continue
+            METRICS.observe('airdrop_stage_seconds', batch.extract_seconds, stage='extract')
+            with METRICS.timer('airdrop_stage_seconds', stage='persist'):
+                queued = writer.write(batch)
+            if queued:
+                with METRICS.timer('airdrop_stage_seconds', stage='notify'):
+                    await writer.outbox.deliver(writer.session)
+        if pending:
+            print(f"{len(pending)} sources not finished within {self.cycle_timeout:g}s; "
+                  f"they are fetched again next cycle")
+            self.stats['timed_out'] += len(pending)
+        return writer.stats
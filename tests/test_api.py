@@ -0,0 +1,51 @@
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from api import create_app
+from models import AirdropOpportunity, init_db
+
+def make_client(tmp_path, rows):
+    engine = init_db(f"sqlite:///{tmp_path / 'api.db'}")
+    with engine.begin() as conn:
+        conn.execute(insert(AirdropOpportunity), rows)
+    return create_app(engine).test_client()
+
+def test_dashboard_links_escape_project_names(tmp_path):
+    client = make_client(tmp_path, [{'tweet_id': '1', 'project_name': 'Salt & Pepper #1', 'confidence_score': 90.0}])
+    html = client.get('/').get_data(as_text=True)
+    assert 'href="/?project=Salt+%26+Pepper+%231"' in html
+    listed = client.get('/?project=Salt+%26+Pepper+%231').get_data(as_text=True)
+    assert 'Salt &amp; Pepper #1</a>' in listed
+
+def follow(client, params):
+    ids, cursor = [], None
+    while True:
+        body = client.get('/api/opportunities', query_string={**params, **({'cursor': cursor} if cursor else {})}).get_json()
+        ids += [opportunity['id'] for opportunity in body['opportunities']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            return ids
+
+def test_pages_continue_past_rows_without_a_deadline(tmp_path):
+    now = datetime.utcnow()
+    deadlines = [now + timedelta(days=3), None, now + timedelta(days=1), None, None, now + timedelta(days=2)]
+    scores = [50.0, None, 70.0, 60.0, None, 70.0]
+    client = make_client(tmp_path, [
+        {'tweet_id': str(i), 'project_name': f"Project {i}", 'deadline': deadline, 'confidence_score': score}
+        for i, (deadline, score) in enumerate(zip(deadlines, scores))
+    ])
+    # ids are 1-based; rows without a deadline or score come last, by id
+    assert follow(client, {'sort': 'deadline', 'limit': '2'}) == [3, 6, 1, 2, 4, 5]
+    assert follow(client, {'sort': 'deadline', 'limit': '1'}) == [3, 6, 1, 2, 4, 5]
+    assert follow(client, {'sort': 'confidence', 'limit': '2'}) == [6, 3, 4, 1, 5, 2]
+    assert follow(client, {'limit': '4'}) == [6, 5, 4, 3, 2, 1]
+
+def test_malformed_cursors_are_rejected(tmp_path):
+    client = make_client(tmp_path, [{'tweet_id': '1', 'project_name': 'Zeta'}])
+    for raw in ['["deadline", 5, null]', '["deadline", "soon", 1]', '["deadline", null, "x"]', '[1, 2]', '7']:
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+        response = client.get('/api/opportunities', query_string={'sort': 'deadline', 'cursor': cursor})
+        assert response.status_code == 400, raw
+    assert client.get('/api/opportunities', query_string={'cursor': 'not base64!'}).status_code == 400
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from async_fetch import AsyncTwitterFetcher
+
+def tweet(tweet_id):
+    return {'id': tweet_id, 'id_str': str(tweet_id), 'full_text': 'Claim the $ZETA airdrop',
+            'created_at': 'Fri Oct 16 12:00:00 +0000 2026', 'in_reply_to_status_id': None,
+            'user': {'id': 1, 'id_str': '1', 'screen_name': 'zeta'}}
+
+def fetcher_for(handler, **options):
+    fetcher = AsyncTwitterFetcher('key', 'secret', 'token', 'token_secret', base_url='http://api.test/1.1',
+                                  **options)
+    fetcher.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+def test_rate_limited_request_is_retried_after_retry_after():
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(429, headers={'retry-after': '0.1'})
+        return httpx.Response(200, json=[tweet(2), tweet(1)])
+    
+    async def fetch():
+        fetcher = fetcher_for(handler)
+        try:
+            return await fetcher.get_user_tweets('zeta', since_id='1')
+        finally:
+            await fetcher.aclose()
+    
+    tweets = asyncio.run(fetch())
+    assert [tweet.id for tweet in tweets] == [2, 1]
+    assert len(requests) == 2
+    assert requests[0].url.params['since_id'] == '1'
+    assert requests[0].headers['authorization'].startswith('OAuth ')
+
+def test_gives_up_after_max_retries():
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(429, headers={'retry-after': '0'})
+    
+    async def fetch():
+        fetcher = fetcher_for(handler, max_retries=2)
+        try:
+            return await fetcher.search_tweets('#airdrop')
+        finally:
+            await fetcher.aclose()
+    
+    assert asyncio.run(fetch()) == []
+    assert len(requests) == 3
@@ -0,0 +1,27 @@
+from sqlalchemy.orm import sessionmaker
+
+from author_reputation import AuthorReputation
+from models import AuthorStats, TweetRecord, init_db
+
+def tweets(*author_ids):
+    return [TweetRecord(tweet_id=str(i), author_id=author_id, processed_text='claim the airdrop')
+            for i, author_id in enumerate(author_ids)]
+
+def test_rolled_back_batch_is_not_counted():
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    reputation = AuthorReputation()
+    reputation.warm(session)
+    reputation.record_batch(session, tweets('a'), [])
+    session.commit()
+    
+    reputation.record_batch(session, tweets('a', 'b'), [])
+    session.rollback()
+    assert reputation.authors['a'].tweets_seen == 1
+    assert 'b' not in reputation.authors
+    
+    reputation.record_batch(session, tweets('a', 'b'), [])
+    session.commit()
+    stored = {row.author_id: row.tweets_seen for row in session.query(AuthorStats)}
+    assert stored == {'a': 2, 'b': 1}
+    assert {author_id: record.tweets_seen for author_id, record in reputation.authors.items()} == stored
+    session.close()
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from deadlines import match_deadline, parse_deadline
+
+# A Thursday morning
+NOW = datetime(2026, 10, 15, 10, 30)
+
+@pytest.mark.parametrize('text, expected', [
+    ('ends oct 20', datetime(2026, 10, 20)),
+    ('ends Oct. 20th 2027', datetime(2027, 10, 20)),
+    ('by 20th of October 2026', datetime(2026, 10, 20)),
+    ('deadline 2026-11-02', datetime(2026, 11, 2)),
+    ('closes 10/20', datetime(2026, 10, 20)),
+    ('closes 20/10/26', datetime(2026, 10, 20)),
+    ('closes 20.10.2026', datetime(2026, 10, 20)),
+    # Months well behind us are next year's
+    ('snapshot jan 5', datetime(2027, 1, 5)),
+    ('snapshot sep 30', datetime(2026, 9, 30)),
+])
+def test_calendar_dates(text, expected):
+    assert match_deadline(text, NOW) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('oct 20 12:00 utc', datetime(2026, 10, 20, 12)),
+    ('oct 20 at 3pm est', datetime(2026, 10, 20, 20)),
+    ('oct 20, 9:30 a.m. jst', datetime(2026, 10, 20, 0, 30)),
+    ('oct 20 noon', datetime(2026, 10, 20, 12)),
+    ('oct 20 midnight', datetime(2026, 10, 20)),
+    ('oct 20 18:00 utc+2', datetime(2026, 10, 20, 16)),
+])
+def test_times_and_timezones(text, expected):
+    assert match_deadline(text, NOW) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('ends in 3 days', datetime(2026, 10, 18, 10, 30)),
+    ('in two weeks', datetime(2026, 10, 29, 10, 30)),
+    ('48h left', datetime(2026, 10, 17, 10, 30)),
+    ('30 mins remaining', datetime(2026, 10, 15, 11)),
+    ('in 1 month', datetime(2026, 11, 15, 10, 30)),
+])
+def test_relative_times(text, expected):
+    assert match_deadline(text, NOW) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('ends today', datetime(2026, 10, 15)),
+    ('ends tonight', datetime(2026, 10, 15, 23, 59)),
+    ('tomorrow 12:00 UTC', datetime(2026, 10, 16, 12)),
+    ('closes saturday', datetime(2026, 10, 17)),
+    ('closes Thurs 18:00', datetime(2026, 10, 15, 18)),
+    # A time alone is the next time the clock shows it
+    ('claim by 09:00 utc', datetime(2026, 10, 16, 9)),
+    ('claim by 11pm', datetime(2026, 10, 15, 23)),
+])
+def test_day_words_and_weekdays(text, expected):
+    assert match_deadline(text, NOW) == expected
+
+@pytest.mark.parametrize('text', [
+    'join the discord',
+    '3 winners',
+    'top 100 holders',
+    'closes 31/31',
+    'claim by 25:00',
+])
+def test_not_deadlines(text):
+    assert match_deadline(text, NOW) is None
+
+def test_parse_deadline_prefers_grammar_over_fallback():
+    assert parse_deadline(['ends 2026.11.20', 'oct 20'], NOW) == datetime(2026, 10, 20)
+
+def test_parse_deadline_falls_back_to_dateutil():
+    assert parse_deadline(['ends 2026.11.20'], NOW) == datetime(2026, 11, 20)
+    assert parse_deadline(['3 winners', 'no date here'], NOW) is None
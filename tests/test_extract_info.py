@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+
+import extract_info
+from extract_info import PreFilter, extract_airdrop_info, extract_airdrop_info_batch
+from extraction_cache import ExtractionCache
+from fetch_tweets import preprocess_tweet_text
+from models import TweetRecord
+from scoring import ScoringEngine
+
+@pytest.fixture(autouse=True)
+def blank_model(monkeypatch):
+    import spacy
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+    monkeypatch.setattr(extract_info, '_nlp', nlp)
+
+def tweet(tweet_id, text):
+    return TweetRecord(tweet_id=tweet_id, author_id='1', text=text, processed_text=preprocess_tweet_text(text),
+                       created_at=datetime.utcnow())
+
+def test_cashtag_casing_is_not_shared_through_the_cache():
+    cache = ExtractionCache()
+    lower = tweet('1', 'Claim the $zeta airdrop now, testnet is live')
+    upper = tweet('2', 'Claim the $ZETA airdrop now, testnet is live')
+    assert lower.processed_text == upper.processed_text
+    
+    uncached = {o.tweet_id: o.token_symbol for o in extract_airdrop_info_batch([lower, upper], report=False)}
+    same_batch = {o.tweet_id: o.token_symbol
+                  for o in extract_airdrop_info_batch([lower, upper], report=False, cache=cache)}
+    later_batch = {o.tweet_id: o.token_symbol
+                   for o in extract_airdrop_info_batch([upper], report=False, cache=cache)}
+    assert uncached['2'] == 'ZETA'
+    assert same_batch == uncached
+    assert later_batch == {'2': 'ZETA'}
+
+def test_cached_relative_deadline_counts_from_each_tweet():
+    cache = ExtractionCache()
+    text = 'Claim the $ZETA airdrop now. Deadline: tomorrow 12:00 UTC'
+    first = tweet('1', text)
+    first.created_at = datetime(2026, 10, 16, 14, 0)
+    second = tweet('2', text)
+    second.created_at = datetime(2026, 10, 17, 10, 0)
+    
+    uncached = extract_airdrop_info_batch([second], report=False)
+    extract_airdrop_info_batch([first], report=False, cache=cache)
+    cached = extract_airdrop_info_batch([second], report=False, cache=cache)
+    same_batch = extract_airdrop_info_batch([first, second], report=False, cache=ExtractionCache())
+    assert uncached[0].deadline == datetime(2026, 10, 18, 12, 0)
+    assert cached[0].deadline == uncached[0].deadline
+    assert [o.deadline for o in same_batch] == [datetime(2026, 10, 17, 12, 0), datetime(2026, 10, 18, 12, 0)]
+    assert cache.stats['hits'] == 1
+
+def test_batch_matches_one_at_a_time_extraction():
+    tweets = [tweet('1', 'Claim the $ZETA airdrop. Deadline: oct 20. Steps: follow, retweet and join the discord'),
+              tweet('2', 'gm everyone, coffee first'),
+              tweet('3', 'Orbit testnet is live, bridge and swap to earn $ORB points. Ends in 3 days'),
+              tweet('4', 'Claim the $ZETA airdrop. Deadline: oct 20. Steps: follow, retweet and join the discord')]
+    batch = extract_airdrop_info_batch(tweets, batch_size=2, report=False)
+    one_by_one = [extract_airdrop_info(t) for t in tweets]
+    assert [o.tweet_id for o in batch] == ['1', '3', '4']
+    assert one_by_one[1] is None
+    fields = ['tweet_id', 'project_name', 'token_symbol', 'description', 'deadline',
+              'participation_steps', 'confidence_score']
+    assert ([[getattr(o, field) for field in fields] for o in batch]
+            == [[getattr(o, field) for field in fields] for o in one_by_one if o is not None])
+
+def test_prefilter_defaults_pass_a_complete_announcement():
+    complete = tweet('1', 'Claim the $ZETA airdrop. Deadline: oct 20. Steps: follow, retweet and join the discord')
+    assert PreFilter().filter([complete]) == [complete]
+    assert ScoringEngine().max_possible_score({}) >= PreFilter().min_confidence
+
+def test_prefilter_only_rejects_what_could_never_be_notified():
+    tweets = [tweet('1', 'Claim the $ZETA airdrop. Deadline: oct 20. Steps: follow, retweet and join the discord'),
+              tweet('2', 'gm everyone, coffee first'),
+              tweet('3', 'Orbit testnet is live, bridge and swap to earn $ORB points. Ends in 3 days'),
+              tweet('4', '$ZETA to the moon'),
+              tweet('5', 'FREE $ZETA giveaway, 100x guaranteed, send 1 ETH to claim before oct 20'),
+              tweet('6', '   ')]
+    for min_confidence in (0.0, 35.0, 50.0, 70.0):
+        prefilter = PreFilter(min_confidence=min_confidence)
+        passed = {t.tweet_id for t in prefilter.filter(tweets)}
+        notified = {o.tweet_id for o in extract_airdrop_info_batch(tweets, report=False)
+                    if o.confidence_score >= min_confidence}
+        assert notified <= passed
+        assert '6' not in passed
+    assert prefilter.stats['rejected_score'] > 0
+
+def test_prefilter_uses_the_scorers_weights():
+    text = tweet('1', '$ZETA to the moon')
+    assert PreFilter(min_confidence=50.0).filter([text]) == []
+    generous = ScoringEngine({'token_symbol': 60.0})
+    assert PreFilter(min_confidence=50.0, scorer=generous).filter([text]) == [text]
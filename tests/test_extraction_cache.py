@@ -0,0 +1,55 @@
+import time
+from datetime import datetime
+
+from extraction_cache import MISSING, ExtractionCache
+
+FIELDS = {'project_name': 'Zeta', 'token_symbol': 'ZETA', 'description': 'Zeta airdrop',
+          'deadline_candidates': ['oct 20'], 'participation_steps': None}
+
+def test_none_is_a_cached_result():
+    cache = ExtractionCache()
+    assert cache.get('a') is MISSING
+    cache.put('a', None)
+    assert cache.get('a') is None
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ExtractionCache(max_entries=2)
+    cache.put_many([('a', FIELDS), ('b', FIELDS)])
+    cache.get('a')
+    cache.put('c', FIELDS)
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == FIELDS and cache.get('c') == FIELDS
+    assert cache.stats['evictions'] == 1
+
+def test_expired_entries_are_ignored(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('extraction_cache.time.time', lambda: now[0])
+    cache = ExtractionCache(ttl_seconds=60)
+    cache.put('a', FIELDS)
+    now[0] += 59
+    assert cache.get('a') == FIELDS
+    now[0] += 2
+    assert cache.get('a') is MISSING
+    assert cache.stats['expired'] == 1
+
+def test_disk_tier_survives_a_restart(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.db')
+    cache = ExtractionCache(path=path)
+    cache.put_many([('a', {**FIELDS, 'seen': datetime(2026, 10, 16, 12, 0)}), ('b', None)])
+    cache.close()
+    
+    reopened = ExtractionCache(path=path)
+    assert reopened.get('a')['seen'] == datetime(2026, 10, 16, 12, 0)
+    assert reopened.get('b') is None
+    assert reopened.stats['disk_hits'] == 2
+    # Now in memory as well
+    assert reopened.get('a')['token_symbol'] == 'ZETA'
+    assert reopened.stats['hits'] == 1
+    
+    # Past the default TTL of a day
+    later = time.time() + 90000
+    monkeypatch.setattr('extraction_cache.time.time', lambda: later)
+    assert ExtractionCache(path=path).get('a') is MISSING
+    assert reopened.prune() == 2
+    reopened.close()
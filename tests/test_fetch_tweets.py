@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import sessionmaker
+from tweepy.models import Status
+
+import fetch_tweets
+from fetch_tweets import (SeenTweetCache, fetch_new_tweets, filter_tweets, find_processed_ids,
+                          load_cursors, move_cursor)
+from models import FetchCursor, TwitterAccount, TweetRecord, bulk_save, init_db
+
+def status(tweet_id, days_ago=0):
+    created_at = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return Status.parse(None, {
+        'id': tweet_id, 'id_str': str(tweet_id), 'full_text': f'Claim the $ZETA airdrop #{tweet_id}',
+        'created_at': created_at.strftime('%a %b %d %H:%M:%S +0000 %Y'),
+        'user': {'id': 1, 'id_str': '1', 'screen_name': 'zeta'},
+        'in_reply_to_status_id': None,
+    })
+
+def session_with(*tweet_ids):
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    bulk_save(session, [TweetRecord(tweet_id=str(tweet_id), author_id='1', text='stored')
+                        for tweet_id in tweet_ids], [])
+    session.commit()
+    return session
+
+def test_filter_drops_stored_repeated_and_old_tweets():
+    session = session_with(2)
+    tweets = filter_tweets([status(1), status(2), status(3), status(1), status(4, days_ago=8)], session)
+    assert [tweet.tweet_id for tweet in tweets] == ['1', '3']
+    assert tweets[0].created_at.tzinfo is None
+    assert tweets[0].processed_text == 'claim the $zeta airdrop 1'
+
+def test_find_processed_ids_in_chunks(monkeypatch):
+    monkeypatch.setattr(fetch_tweets, 'DEDUP_CHUNK_SIZE', 3)
+    session = session_with(*range(0, 20, 2))
+    assert find_processed_ids([str(i) for i in range(10)], session) == {'0', '2', '4', '6', '8'}
+
+def test_seen_cache_skips_the_database_and_learns_stored_ids():
+    session = session_with(2)
+    cache = SeenTweetCache()
+    cache.add('1')
+    tweets = filter_tweets([status(1), status(2), status(3)], session, seen_cache=cache)
+    assert [tweet.tweet_id for tweet in tweets] == ['3']
+    # Stored tweets found in the database are remembered, new ones only once stored
+    assert '2' in cache and '3' not in cache
+
+def test_seen_cache_evicts_least_recently_used():
+    cache = SeenTweetCache(capacity=2)
+    cache.add_many(['1', '2'])
+    assert '1' in cache
+    cache.add('3')
+    assert '1' in cache and '3' in cache and '2' not in cache
+    assert len(cache) == 2
+
+class FakeClient:
+    """Returns the queued tweets for each source and records the since_id it was asked for."""
+    
+    def __init__(self, tweets):
+        self.tweets = tweets
+        self.since_ids = {}
+    
+    def get_user_tweets(self, username, since_id=None):
+        self.since_ids[username] = since_id
+        return self.tweets.pop(username, [])
+    
+    def search_tweets(self, query, since_id=None):
+        self.since_ids[query] = since_id
+        return self.tweets.pop(query, [])
+
+def test_cursors_resume_from_the_newest_committed_tweet():
+    session = session_with()
+    session.add(TwitterAccount(username='zeta', is_trusted=True))
+    session.commit()
+    client = FakeClient({'zeta': [status(10), status(12)], '#airdrop': [status(11)]})
+    tweets = fetch_new_tweets(client, session)
+    assert sorted(tweet.tweet_id for tweet in tweets) == ['10', '11', '12']
+    assert client.since_ids['zeta'] is None
+    session.commit()
+    
+    fetch_new_tweets(client, session)
+    assert client.since_ids['zeta'] == '12'
+    assert client.since_ids['#airdrop'] == '11'
+    assert client.since_ids['devnet'] is None
+
+def test_cursors_do_not_move_when_the_cycle_rolls_back():
+    session = session_with()
+    client = FakeClient({'#airdrop': [status(11)]})
+    fetch_new_tweets(client, session)
+    session.rollback()
+    fetch_new_tweets(client, session)
+    assert client.since_ids['#airdrop'] is None
+    assert load_cursors(session)[('query', '#airdrop')].since_id is None
+
+def test_cursor_only_moves_forward():
+    cursor = FetchCursor(source_type='query', source='#airdrop', since_id='99')
+    move_cursor(cursor, 100)
+    assert cursor.since_id == '100'
+    move_cursor(cursor, 98)
+    assert cursor.since_id == '100'
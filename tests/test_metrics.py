@@ -0,0 +1,49 @@
+import pytest
+
+from metrics import CycleHealth, Metrics, create_app
+
+def test_render_prometheus_text():
+    metrics = Metrics()
+    metrics.inc('airdrop_tweets_total', 3, stage='fetched')
+    metrics.inc('airdrop_tweets_total', 2, stage='fetched')
+    metrics.inc('airdrop_tweets_total', stage='new')
+    metrics.set('airdrop_last_cycle_timestamp_seconds', 1760000000.5)
+    metrics.observe('airdrop_extract_step_seconds', 0.25, count=10, step='spacy')
+    lines = metrics.render().splitlines()
+    assert '# TYPE airdrop_tweets_total counter' in lines
+    assert 'airdrop_tweets_total{stage="fetched"} 5' in lines
+    assert 'airdrop_tweets_total{stage="new"} 1' in lines
+    assert 'airdrop_last_cycle_timestamp_seconds 1760000000.5' in lines
+    assert '# TYPE airdrop_extract_step_seconds summary' in lines
+    assert 'airdrop_extract_step_seconds_count{step="spacy"} 10' in lines
+    assert 'airdrop_extract_step_seconds_sum{step="spacy"} 0.250000' in lines
+
+def test_timer_records_failures_too():
+    metrics = Metrics()
+    
+    @metrics.timed('airdrop_filter_seconds')
+    def fails():
+        raise RuntimeError('boom')
+    
+    with pytest.raises(RuntimeError):
+        fails()
+    with metrics.timer('airdrop_filter_seconds'):
+        pass
+    assert metrics.timers[('airdrop_filter_seconds', ())][0] == 2
+
+def test_health_goes_stale_without_a_successful_cycle(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('metrics.time.time', lambda: now[0])
+    health = CycleHealth(stale_after=60)
+    client = create_app(health).test_client()
+    assert client.get('/health').status_code == 200
+    
+    now[0] += 61
+    health.record(1.0, error=ValueError('twitter is down'))
+    response = client.get('/health')
+    assert response.status_code == 503
+    assert response.get_json()['last_error'] == 'ValueError: twitter is down'
+    
+    health.record(1.0)
+    assert client.get('/health').get_json()['status'] == 'ok'
+    assert 'airdrop_cycles_total{outcome="error"}' in client.get('/metrics').get_data(as_text=True)
@@ -0,0 +1,78 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+import models
+from models import (AirdropOpportunity, OpportunityRecord, ProcessedTweet, TweetRecord, bulk_save,
+                    init_db, load_opportunities)
+
+def test_sqlite_connections_are_tuned(tmp_path):
+    engine = init_db(f"sqlite:///{tmp_path / 'airdrops.db'}", synchronous='FULL', cache_size_mb=8)
+    with engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 2
+        assert pragma('cache_size') == -8 * 1024
+        assert pragma('auto_vacuum') == 2
+    engine.dispose()
+
+def test_older_database_gets_new_columns_and_indexes(tmp_path):
+    path = tmp_path / 'airdrops.db'
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE processed_tweets (id INTEGER PRIMARY KEY, tweet_id VARCHAR UNIQUE NOT NULL, '
+                     'author_id VARCHAR NOT NULL, text VARCHAR, processed_text VARCHAR, created_at DATETIME, '
+                     'processed_at DATETIME, is_retweet BOOLEAN, is_reply BOOLEAN)')
+        conn.execute("INSERT INTO processed_tweets (tweet_id, author_id) VALUES ('1', '1')")
+    
+    engine = init_db(f'sqlite:///{path}')
+    inspector = inspect(engine)
+    columns = {column['name'] for column in inspector.get_columns('processed_tweets')}
+    assert {'author_username', 'cluster_id'} <= columns
+    indexes = {index['name'] for index in inspector.get_indexes('processed_tweets')}
+    assert {'ix_processed_tweets_author_id', 'ix_processed_tweets_processed_at'} <= indexes
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('SELECT tweet_id FROM processed_tweets').scalars().all() == ['1']
+    # Running it again changes nothing
+    init_db(f'sqlite:///{path}').dispose()
+    engine.dispose()
+
+def test_hot_queries_use_indexes():
+    engine = init_db('sqlite://')
+    with engine.connect() as conn:
+        plan = lambda sql: ' '.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}'))
+        assert 'ix_airdrop_opportunities_notified_confidence' in plan(
+            'SELECT id FROM airdrop_opportunities WHERE notified = 0 AND confidence_score >= 70')
+        assert 'ix_airdrop_opportunities_project_created' in plan(
+            "SELECT id FROM airdrop_opportunities WHERE project_name = 'Zeta' AND created_at > '2026-10-01'")
+        assert 'ix_processed_tweets_processed_at' in plan(
+            "SELECT id FROM processed_tweets WHERE processed_at < '2026-10-01'")
+
+def test_bulk_save_inserts_records_in_chunks_with_defaults(monkeypatch):
+    monkeypatch.setattr(models, 'BULK_INSERT_CHUNK_SIZE', 3)
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    tweets = [TweetRecord(tweet_id=str(i), author_id='1', text=f'tweet {i}') for i in range(7)]
+    opportunities = [OpportunityRecord(tweet_id=str(i), project_name=f'Project {i}', confidence_score=70.0)
+                     for i in range(0, 7, 2)]
+    bulk_save(session, tweets, opportunities)
+    # Core inserts: nothing is tracked by the session
+    assert not session.new
+    session.commit()
+    
+    assert session.query(ProcessedTweet).count() == 7
+    assert isinstance(session.query(ProcessedTweet).first().processed_at, datetime)
+    stored = load_opportunities(session)
+    assert [o.id for o in opportunities] == [o.id for o in stored]
+    assert all(isinstance(o, OpportunityRecord) for o in stored)
+    assert [(o.tweet_id, o.notified, o.cluster_size, o.source_count) for o in stored] == [
+        ('0', False, 1, 1), ('2', False, 1, 1), ('4', False, 1, 1), ('6', False, 1, 1)]
+    assert [o.project_name for o in load_opportunities(session, AirdropOpportunity.id > stored[1].id)] == [
+        'Project 4', 'Project 6']
+
+def test_records_have_no_instance_dict():
+    record = OpportunityRecord(tweet_id='1')
+    with pytest.raises(AttributeError):
+        record.unknown = 1
+    assert not hasattr(TweetRecord(tweet_id='1', author_id='1'), '__dict__')
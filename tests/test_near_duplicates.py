@@ -0,0 +1,83 @@
+from sqlalchemy.orm import sessionmaker
+
+from fetch_tweets import preprocess_tweet_text
+from models import TweetRecord, init_db
+from near_duplicates import NearDuplicateIndex
+
+TEXT = 'Zeta airdrop is live! Claim $ZETA at https://zeta.xyz, follow @zeta_io and retweet to qualify'
+
+def tweet(tweet_id, text):
+    return TweetRecord(tweet_id=tweet_id, author_id='1', text=text, processed_text=preprocess_tweet_text(text))
+
+def test_templates_for_different_projects_are_not_collapsed():
+    tweets = [
+        tweet('1', 'Zeta airdrop is live! Claim your free tokens at https://zeta.xyz before Friday. '
+                   'Follow @zeta_io and retweet to qualify'),
+        tweet('2', 'Zeta airdrop is live!! Claim your free tokens at https://zeta.xyz before Friday, '
+                   'follow @zeta_io and retweet to qualify'),
+        # The same template for another project, without a cashtag
+        tweet('3', 'Orbit airdrop is live! Claim your free tokens at https://orbit.fi before Friday. '
+                   'Follow @orbit_fi and retweet to qualify'),
+        # The same cashtag for two projects
+        tweet('4', 'New $DROP airdrop from Nova: claim your free tokens before Friday, follow and retweet to qualify'),
+        tweet('5', 'New $DROP airdrop from Lumen: claim your free tokens before Friday, follow and retweet to qualify'),
+    ]
+    index = NearDuplicateIndex()
+    heads = index.collapse(tweets)
+    assert [head.tweet_id for head in heads] == ['1', '3', '4', '5']
+    assert tweets[1].cluster_id == '1'
+    assert index.cluster_size('1') == 2
+
+def test_tweets_without_entities_are_not_collapsed():
+    tweets = [tweet('1', 'huge airdrop is live! claim your free tokens before friday, follow and retweet to qualify'),
+              tweet('2', 'huge airdrop is live! claim your free tokens before friday, follow and retweet to qualify')]
+    assert len(NearDuplicateIndex().collapse(tweets)) == 2
+
+def store(index, session, tweets, commit=True):
+    """Collapse and store tweets as a cycle would."""
+    heads = index.collapse(tweets)
+    index.refresh_cluster_sizes(session, tweets)
+    if commit:
+        session.commit()
+    else:
+        session.rollback()
+    index.save()
+    return heads
+
+def test_log_round_trip(tmp_path):
+    path = str(tmp_path / 'near_duplicates.log')
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    index = NearDuplicateIndex(path)
+    store(index, session, [tweet('1', TEXT), tweet('2', TEXT + '!')])
+    loaded = NearDuplicateIndex.load(path)
+    assert loaded.collapse([tweet('3', TEXT + '!!')]) == []
+    assert loaded.cluster_size('1') == 3
+
+def test_rolled_back_tweets_are_undone_and_not_logged(tmp_path):
+    path = str(tmp_path / 'near_duplicates.log')
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    index = NearDuplicateIndex(path)
+    store(index, session, [tweet('1', TEXT)])
+    
+    other = 'Orbit testnet is live! Bridge to https://orbit.fi and follow @orbit_fi for the $ORB drop'
+    heads = store(index, session, [tweet('2', TEXT + '!'), tweet('3', other)], commit=False)
+    assert [head.tweet_id for head in heads] == ['3']
+    assert index.cluster_size('1') == 1
+    assert len(index) == 1
+    
+    # Refetched and stored the next cycle
+    heads = store(index, session, [tweet('3', other), tweet('2', TEXT + '!')])
+    assert [head.tweet_id for head in heads] == ['3']
+    assert index.cluster_size('1') == 2
+    loaded = NearDuplicateIndex.load(path)
+    assert len(loaded) == 2
+    assert loaded.cluster_size('1') == 2
+    assert loaded.cluster_size('3') == 1
+
+def test_refetched_before_stored_keeps_its_cluster():
+    index = NearDuplicateIndex()
+    index.collapse([tweet('1', TEXT), tweet('2', TEXT + '!')])
+    # The cycle failed before storing them
+    heads = index.collapse([tweet('1', TEXT), tweet('2', TEXT + '!')])
+    assert [head.tweet_id for head in heads] == ['1']
+    assert index.cluster_size('1') == 2
@@ -0,0 +1,80 @@
+import asyncio
+import smtplib
+
+import pytest
+
+import notifications
+from models import OpportunityRecord
+from notifications import EmailNotifier
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP, recording every connection opened."""
+    
+    connections = []
+    
+    def __init__(self, host, port):
+        self.sent = []
+        self.closed = False
+        self.dropped = False
+        FakeSMTP.connections.append(self)
+    
+    def starttls(self):
+        pass
+    
+    def login(self, username, password):
+        pass
+    
+    def send_message(self, msg):
+        if self.dropped:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(msg['Subject'])
+    
+    def quit(self):
+        self.closed = True
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.quit()
+
+@pytest.fixture(autouse=True)
+def fake_smtp(monkeypatch):
+    FakeSMTP.connections = []
+    monkeypatch.setattr(notifications.smtplib, 'SMTP', FakeSMTP)
+
+def opportunities(count):
+    return [OpportunityRecord(tweet_id=str(i), project_name=f"Project {i}", confidence_score=90.0)
+            for i in range(count)]
+
+def test_connection_per_email_by_default():
+    notifier = EmailNotifier('smtp.example.com', 587, 'bot@example.com', 'secret', digest_size=1)
+    results = asyncio.run(notifier.deliver('me@example.com', opportunities(2)))
+    notifier.shutdown()
+    
+    assert [error for _, error in results] == [None, None]
+    assert len(FakeSMTP.connections) == 2
+    assert all(server.closed for server in FakeSMTP.connections)
+
+def test_kept_alive_connection_is_reused_across_cycles():
+    notifier = EmailNotifier('smtp.example.com', 587, 'bot@example.com', 'secret',
+                             keep_alive=True, digest_size=1)
+    for _ in range(2):
+        asyncio.run(notifier.deliver('me@example.com', opportunities(2)))
+    
+    [server] = FakeSMTP.connections
+    assert len(server.sent) == 4
+    assert not server.closed
+    notifier.shutdown()
+    assert server.closed
+
+def test_dropped_connection_is_reopened_once():
+    notifier = EmailNotifier('smtp.example.com', 587, 'bot@example.com', 'secret', keep_alive=True)
+    assert notifier.send_notification('me@example.com', opportunities(1))
+    FakeSMTP.connections[0].dropped = True
+    
+    assert notifier.send_notification('me@example.com', opportunities(1))
+    first, second = FakeSMTP.connections
+    assert first.closed and not second.closed
+    assert len(second.sent) == 1
+    notifier.shutdown()
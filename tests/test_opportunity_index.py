@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from deadlines import parse_deadline
+from models import OpportunityRecord, bulk_save, init_db, load_opportunities
+from opportunity_index import OpportunityIndex
+
+def opportunity(tweet_id, deadline=None, steps=None, confidence=90.0):
+    return OpportunityRecord(tweet_id=tweet_id, project_name='Zeta Network', token_symbol='ZETA',
+                             description='Zeta airdrop is live', deadline=deadline,
+                             participation_steps=steps, confidence_score=confidence)
+
+def merge_stored(index, record):
+    """Merge one opportunity as a cycle would; returns how many are to notify."""
+    result = index.merge([record])
+    for new in result.new:
+        new.id = int(new.tweet_id)
+    return len(result.to_notify)
+
+def test_reposted_relative_deadline_notifies_once():
+    index = OpportunityIndex()
+    posted = datetime.utcnow()
+    notified = 0
+    for repost in range(4):
+        created_at = posted + timedelta(hours=5 * repost)
+        deadline = parse_deadline(['in 3 days'], now=created_at)
+        notified += merge_stored(index, opportunity(str(repost + 1), deadline))
+    assert notified == 1
+    assert len(index) == 1
+
+def test_alternating_deadlines_do_not_renotify():
+    index = OpportunityIndex()
+    first = datetime.utcnow() + timedelta(days=10)
+    extended = first + timedelta(days=3)
+    deadlines = [first, extended, first, extended, first]
+    notified = [merge_stored(index, opportunity(str(i + 1), deadline)) for i, deadline in enumerate(deadlines)]
+    # The first post and the extension
+    assert notified == [1, 1, 0, 0, 0]
+    assert index.find(opportunity('9')).deadline == extended
+
+def test_longer_steps_are_kept_without_notifying():
+    index = OpportunityIndex()
+    merge_stored(index, opportunity('1', steps='Follow'))
+    assert merge_stored(index, opportunity('2', steps='Follow, retweet and join the Discord')) == 0
+    assert index.find(opportunity('9')).participation_steps == 'Follow, retweet and join the Discord'
+
+def test_rolled_back_merge_leaves_index_unchanged():
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    deadline = datetime.utcnow() + timedelta(days=10)
+    bulk_save(session, [], [opportunity('1', deadline)])
+    session.commit()
+    index = OpportunityIndex()
+    index.warm(session)
+    
+    extended = opportunity('2', deadline + timedelta(days=5))
+    other = OpportunityRecord(tweet_id='3', project_name='Orbit', confidence_score=90.0)
+    result = index.merge([extended, other], session)
+    bulk_save(session, [], result.new)
+    result.save(session)
+    session.rollback()
+    
+    assert len(index) == 1
+    assert index.find(opportunity('9')).deadline == deadline
+    assert index.find(OpportunityRecord(project_name='Orbit')) is None
+    
+    result = index.merge([extended, other], session)
+    bulk_save(session, [], result.new)
+    result.save(session)
+    session.commit()
+    stored = {row.project_name: row for row in load_opportunities(session)}
+    assert len(index) == 2
+    assert index.find(opportunity('9')).deadline == stored['Zeta Network'].deadline == extended.deadline
+    assert index.find(OpportunityRecord(project_name='Orbit')).id == stored['Orbit'].id
+    session.close()
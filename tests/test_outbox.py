@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+
+from models import AirdropOpportunity, NotificationDelivery, OpportunityRecord, bulk_save, init_db
+from outbox import Outbox
+
+class FakeManager:
+    """Stands in for NotificationManager: one digest per send, optionally failing."""
+    
+    def __init__(self, channels=('telegram',)):
+        self._channels = list(channels)
+        self.sent = []
+        self.errors = []
+    
+    def channels(self, email_recipient=None):
+        return self._channels
+    
+    async def send(self, channel, opportunities, email_recipient=None):
+        error = self.errors.pop(0) if self.errors else None
+        if error is None:
+            self.sent.append([opportunity.id for opportunity in opportunities])
+        return [(opportunities, error)]
+
+def setup(count=1):
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    records = [OpportunityRecord(tweet_id=str(i), project_name=f"Project {i}", token_symbol='ZETA',
+                                 description='Zeta airdrop is live', confidence_score=90.0,
+                                 created_at=datetime.utcnow())
+               for i in range(1, count + 1)]
+    bulk_save(session, [], records)
+    session.commit()
+    return session, [record.id for record in records]
+
+def deliveries(session):
+    return session.query(NotificationDelivery).order_by(NotificationDelivery.id).all()
+
+def test_requeued_opportunity_pending_is_queued_once():
+    session, [opportunity_id] = setup()
+    manager = FakeManager()
+    outbox = Outbox(manager)
+    assert outbox.enqueue(session) == 1
+    session.commit()
+    # A material merge update clears the flag while the first delivery is pending
+    session.execute(update(AirdropOpportunity).values(notified=False))
+    assert outbox.enqueue(session) == 1
+    session.commit()
+    assert len(deliveries(session)) == 1
+    
+    assert asyncio.run(outbox.deliver(session)) == 1
+    assert manager.sent == [[opportunity_id]]
+    assert [row.status for row in deliveries(session)] == ['sent']
+
+def test_requeued_opportunity_sent_is_queued_again():
+    session, [opportunity_id] = setup()
+    manager = FakeManager()
+    outbox = Outbox(manager)
+    outbox.enqueue(session)
+    session.commit()
+    asyncio.run(outbox.deliver(session))
+    session.execute(update(AirdropOpportunity).values(notified=False))
+    outbox.enqueue(session)
+    session.commit()
+    asyncio.run(outbox.deliver(session))
+    assert manager.sent == [[opportunity_id], [opportunity_id]]
+    assert [row.status for row in deliveries(session)] == ['sent', 'sent']
+
+def test_duplicate_pending_rows_are_sent_once():
+    session, [first, second] = setup(2)
+    now = datetime.utcnow()
+    session.execute(insert(NotificationDelivery), [
+        {'opportunity_id': opportunity_id, 'channel': 'telegram', 'status': 'pending',
+         'attempts': 0, 'next_attempt_at': now, 'created_at': now}
+        for opportunity_id in [first, first, second]
+    ])
+    session.commit()
+    manager = FakeManager()
+    
+    assert asyncio.run(Outbox(manager).deliver(session)) == 3
+    assert manager.sent == [[first, second]]
+    assert [row.status for row in deliveries(session)] == ['sent', 'sent', 'sent']
+
+def test_failed_send_is_retried_then_given_up():
+    session, _ = setup()
+    manager = FakeManager()
+    manager.errors = [RuntimeError('rate limited'), RuntimeError('still down')]
+    outbox = Outbox(manager, max_attempts=2, backoff_seconds=0.0)
+    outbox.enqueue(session)
+    session.commit()
+    
+    assert asyncio.run(outbox.deliver(session)) == 0
+    [row] = deliveries(session)
+    assert (row.status, row.attempts, row.last_error) == ('pending', 1, 'rate limited')
+    assert asyncio.run(outbox.deliver(session)) == 0
+    session.refresh(row)
+    assert (row.status, row.attempts, row.last_error) == ('failed', 2, 'still down')
+    assert manager.sent == []
+
+def test_unconfigured_channel_is_not_sent():
+    session, _ = setup()
+    outbox = Outbox(FakeManager(channels=['telegram', 'email']))
+    outbox.enqueue(session)
+    session.commit()
+    manager = FakeManager(channels=['telegram'])
+    outbox.notification_manager = manager
+    
+    assert asyncio.run(outbox.deliver(session)) == 1
+    statuses = {row.channel: (row.status, row.last_error) for row in deliveries(session)}
+    assert statuses == {'telegram': ('sent', None),
+                        'email': ('pending', 'channel email is not configured')}
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+from tweepy.models import Status
+
+import extract_info
+from fetch_tweets import load_cursors
+from models import ProcessedTweet, init_db
+from outbox import Outbox
+from pipeline import StreamingPipeline
+
+@pytest.fixture(autouse=True)
+def blank_model(monkeypatch):
+    import spacy
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+    monkeypatch.setattr(extract_info, '_nlp', nlp)
+
+class NoChannels:
+    def channels(self, email_recipient=None):
+        return []
+
+def status(tweet_id, text='gm, nothing to see here'):
+    return Status.parse(None, {
+        'id': tweet_id, 'id_str': str(tweet_id), 'full_text': text,
+        'created_at': datetime.utcnow().strftime('%a %b %d %H:%M:%S +0000 %Y'),
+        'user': {'id': 1, 'id_str': '1', 'screen_name': 'someone'},
+        'in_reply_to_status_id': None,
+    })
+
+def run(session, results):
+    """Run a cycle where each query returns results[query] (default none), in the order given."""
+    order = list(results)
+    
+    async def fetch_source(source_type, source, since_id):
+        if source in results:
+            # Finish in the order given
+            await asyncio.sleep(0.01 * order.index(source))
+        return results.get(source, [])
+    
+    pipeline = StreamingPipeline(session, fetch_source, Outbox(NoChannels()))
+    asyncio.run(pipeline.run())
+    return {source: cursor.since_id for (_, source), cursor in load_cursors(session).items()}
+
+def test_cursor_moves_when_every_tweet_came_with_another_source():
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    cursors = run(session, {'#airdrop': [status(100), status(101)],
+                            '$airdrop': [status(101)]})
+    assert cursors['#airdrop'] == '101'
+    assert cursors['$airdrop'] == '101'
+    assert cursors['devnet'] is None
+    assert session.query(ProcessedTweet).count() == 2
+
+def test_cursor_moves_when_every_tweet_was_stored_before():
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    run(session, {'#airdrop': [status(100)]})
+    cursors = run(session, {'devnet': [status(100)]})
+    assert cursors['devnet'] == '100'
+    assert session.query(ProcessedTweet).count() == 1
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import httpx
+
+from rate_limit import TokenBucket
+
+def timed_acquires(bucket, count):
+    async def acquire_all():
+        start = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - start
+    return asyncio.run(acquire_all())
+
+def test_capacity_is_available_at_once_then_refills_at_the_window_rate():
+    bucket = TokenBucket(5, window_seconds=0.5)
+    assert timed_acquires(bucket, 5) < 0.05
+    # One token every 0.1s
+    assert 0.15 < timed_acquires(bucket, 2) < 0.5
+
+def test_reported_quota_replaces_the_estimate_until_the_window_resets():
+    bucket = TokenBucket(100, window_seconds=900)
+    bucket.update_from_headers(httpx.Headers({'x-rate-limit-remaining': '2',
+                                              'x-rate-limit-reset': str(int(time.time()) + 600)}))
+    assert bucket.tokens == 2
+    timed_acquires(bucket, 2)
+    bucket._refill()
+    # No continuous refill while the API's window is running
+    assert bucket.tokens == 0
+    assert bucket.reset_at - time.monotonic() > 500
+
+def test_reported_remaining_never_exceeds_capacity():
+    bucket = TokenBucket(10, window_seconds=900)
+    bucket.update_from_headers(httpx.Headers({'x-rate-limit-remaining': '450'}))
+    assert bucket.tokens == 10
+
+def test_exhausted_bucket_waits_then_refills_fully():
+    bucket = TokenBucket(3, window_seconds=900)
+    bucket.exhaust(0.2)
+    assert timed_acquires(bucket, 1) >= 0.15
+    assert bucket.tokens == 2
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import extract_info
+from models import AirdropOpportunity, NotificationDelivery, ProcessedTweet, init_db
+from replay import build_replay, read_corpus
+
+@pytest.fixture(autouse=True)
+def blank_model(monkeypatch):
+    import spacy
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+    monkeypatch.setattr(extract_info, '_nlp', nlp)
+
+TEXTS = [
+    'Claim the $ZETA airdrop. Deadline: oct 20. Steps: follow, retweet and join the discord',
+    'gm everyone, coffee first',
+    'Orbit testnet is live, bridge to earn $ORB. Ends oct 25. Steps: bridge, swap and provide liquidity',
+    'Claim the $ZETA airdrop. Deadline: oct 20. Steps: follow, retweet and join the discord',
+    'what a week for the markets',
+]
+
+def write_corpus(path, days_ago=0):
+    created_at = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, text in enumerate(TEXTS):
+            f.write(json.dumps({
+                'id': 100 + i, 'id_str': str(100 + i), 'full_text': text,
+                'created_at': created_at.strftime('%a %b %d %H:%M:%S +0000 %Y'),
+                'user': {'id': i, 'id_str': str(i), 'screen_name': f'user{i}'},
+                'in_reply_to_status_id': None,
+            }) + '\n')
+        # A line repeated, as in an appended corpus
+        f.write(json.dumps({'id': 100, 'id_str': '100', 'full_text': TEXTS[0],
+                            'created_at': created_at.strftime('%a %b %d %H:%M:%S +0000 %Y'),
+                            'user': {'id': 0, 'id_str': '0', 'screen_name': 'user0'},
+                            'in_reply_to_status_id': None}) + '\n\n')
+
+def replay(session, path, **options):
+    return asyncio.run(build_replay(session, **options).run(read_corpus(path, chunk_size=2)))
+
+def test_corpus_is_read_in_chunks(tmp_path):
+    path = tmp_path / 'corpus.jsonl'
+    write_corpus(path)
+    chunks = list(read_corpus(str(path), chunk_size=4))
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    assert chunks[0][0].full_text == TEXTS[0]
+
+def test_replay_stores_merges_and_delivers(tmp_path):
+    path = tmp_path / 'corpus.jsonl'
+    write_corpus(path)
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    report = replay(session, str(path), stub_notifiers=True, min_confidence=50.0)
+    
+    assert report.counts['read'] == 6
+    assert report.counts['new'] == 5
+    assert session.query(ProcessedTweet).count() == 5
+    # The two $ZETA tweets are one opportunity
+    assert sorted(row.token_symbol for row in session.query(AirdropOpportunity)) == ['ORB', 'ZETA']
+    assert {row.status for row in session.query(NotificationDelivery)} == {'sent'}
+    assert session.query(NotificationDelivery).count() == 4
+    assert 'Replayed 6 tweets' in report.summary()
+    
+    # Replaying the same corpus finds nothing new
+    again = replay(session, str(path), stub_notifiers=True, min_confidence=50.0)
+    assert again.counts['new'] == 0
+    assert session.query(ProcessedTweet).count() == 5
+
+def test_replay_without_stubs_queues_nothing(tmp_path):
+    path = tmp_path / 'corpus.jsonl'
+    write_corpus(path)
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    replay(session, str(path), min_confidence=50.0)
+    assert session.query(NotificationDelivery).count() == 0
+    assert all(row.notified for row in session.query(AirdropOpportunity))
+
+def test_old_tweets_need_max_age_days(tmp_path):
+    path = tmp_path / 'corpus.jsonl'
+    write_corpus(path, days_ago=30)
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    assert replay(session, str(path), min_confidence=50.0).counts['new'] == 0
+    assert replay(session, str(path), min_confidence=50.0, max_age_days=60).counts['new'] == 5
@@ -0,0 +1,53 @@
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from models import OpportunityRecord, ProcessedTweet, TweetRecord, bulk_save, init_db
+from retention import (archive_old_tweets, delete_old_tombstones, enable_incremental_vacuum,
+                       incremental_vacuum)
+
+def test_old_text_is_archived_and_tombstones_pruned(tmp_path):
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    now = datetime.utcnow()
+    days = [1, 8, 9, 20]
+    tweets = [TweetRecord(tweet_id=str(day), author_id='1', text=f'tweet {day}',
+                          processed_text=f'tweet {day}', created_at=now - timedelta(days=day))
+              for day in days]
+    bulk_save(session, tweets, [OpportunityRecord(tweet_id='9', project_name='Zeta', confidence_score=70.0)])
+    for day in days:
+        session.query(ProcessedTweet).filter_by(tweet_id=str(day)).update(
+            {'processed_at': now - timedelta(days=day)})
+    session.commit()
+    
+    assert archive_old_tweets(session, str(tmp_path), older_than_days=7) == 2
+    archived = []
+    for path in sorted(tmp_path.iterdir()):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            archived.extend(json.loads(line)['text'] for line in f)
+    assert sorted(archived) == ['tweet 20', 'tweet 8']
+    texts = {row.tweet_id: row.text for row in session.query(ProcessedTweet)}
+    assert texts == {'1': 'tweet 1', '8': None, '9': 'tweet 9', '20': None}
+    
+    assert delete_old_tombstones(session, older_than_days=14) == 1
+    assert sorted(row.tweet_id for row in session.query(ProcessedTweet)) == ['1', '8', '9']
+
+def test_tombstones_inside_the_fetch_window_are_kept():
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    with pytest.raises(ValueError):
+        delete_old_tombstones(session, older_than_days=3)
+
+def test_incremental_vacuum_enabled_on_an_older_database(tmp_path):
+    path = tmp_path / 'airdrops.db'
+    # A database created before init_db set auto_vacuum
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE twitter_accounts (id INTEGER PRIMARY KEY)')
+    engine = init_db(f'sqlite:///{path}')
+    assert not incremental_vacuum(engine)
+    
+    enable_incremental_vacuum(engine)
+    assert incremental_vacuum(engine)
+    engine.dispose()
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from models import AirdropOpportunity, OpportunityRecord, TweetRecord, TwitterAccount, bulk_save, init_db
+from scoring import ScoringEngine, rescore_opportunities
+
+NOW = datetime(2026, 10, 17, 12, 0)
+
+def tweet(tweet_id, text='claim the $zeta airdrop', author='someone', hours_ago=0.0):
+    return TweetRecord(tweet_id=tweet_id, author_id='1', author_username=author, text=text,
+                       processed_text=text, created_at=NOW - timedelta(hours=hours_ago))
+
+def opportunity(tweet_id, **fields):
+    defaults = {'project_name': 'Zeta', 'token_symbol': 'ZETA', 'deadline': NOW + timedelta(days=3),
+                'participation_steps': 'follow and retweet'}
+    return OpportunityRecord(tweet_id=tweet_id, created_at=NOW, **{**defaults, **fields})
+
+def scores(engine, opportunities, tweets, **options):
+    engine.score_opportunities(opportunities, tweets, now=NOW, **options)
+    return [o.confidence_score for o in opportunities]
+
+def test_default_weights_reproduce_the_original_score():
+    opportunities = [opportunity('1'), opportunity('2', deadline=None, participation_steps=None),
+                     opportunity('3'), opportunity('4', project_name=None, token_symbol=None)]
+    tweets = [tweet('1'), tweet('2'), tweet('3', 'guaranteed 100x, hurry'), tweet('4', 'scam')]
+    assert scores(ScoringEngine(), opportunities, tweets) == [70.0, 40.0, 55.0, 25.0]
+
+def test_scores_are_clipped():
+    engine = ScoringEngine({'token_symbol': 200.0}, bias=-50.0)
+    assert scores(engine, [opportunity('1'), opportunity('2', project_name=None, token_symbol=None,
+                                                           deadline=None, participation_steps=None)],
+                  [tweet('1'), tweet('2')]) == [100.0, 0.0]
+
+def test_optional_features():
+    engine = ScoringEngine({'trusted_author': 10.0, 'cluster_size': 2.0, 'age_hours': -0.5})
+    trusted = opportunity('1')
+    clustered = opportunity('2', cluster_size=8)
+    old = opportunity('3')
+    tweets = [tweet('1', author='ZetaOfficial'), tweet('2'), tweet('3', hours_ago=10)]
+    assert scores(engine, [trusted, clustered, old], tweets,
+                  trusted_authors={'zetaofficial'}) == [80.0, 76.0, 65.0]
+
+def test_unknown_features_are_rejected():
+    with pytest.raises(ValueError):
+        ScoringEngine({'followers': 1.0})
+
+def test_weights_from_file(tmp_path):
+    path = tmp_path / 'weights.json'
+    path.write_text(json.dumps({'weights': {'deadline': 30.0}, 'bias': 5.0}))
+    engine = ScoringEngine.from_file(str(path))
+    assert scores(engine, [opportunity('1')], [tweet('1')]) == [90.0]
+
+def test_max_possible_score_bounds_every_score():
+    engine = ScoringEngine({'trusted_author': 10.0, 'age_hours': -0.5})
+    assert engine.max_possible_score({}) == 80.0
+    assert engine.max_possible_score({'token_symbol': 0.0, 'spam_terms': 2.0}) == 50.0
+
+def test_rescore_updates_only_changed_scores():
+    session = sessionmaker(bind=init_db('sqlite://'))()
+    session.add(TwitterAccount(username='ZetaOfficial', is_trusted=True))
+    tweets = [tweet(str(i), author='ZetaOfficial' if i % 2 else 'someone') for i in range(5)]
+    opportunities = [opportunity(str(i)) for i in range(5)]
+    ScoringEngine().score_opportunities(opportunities, tweets, now=NOW)
+    bulk_save(session, tweets, opportunities)
+    session.commit()
+    
+    assert rescore_opportunities(session, ScoringEngine({'trusted_author': 10.0}), batch_size=2) == 2
+    session.commit()
+    stored = {row.tweet_id: row.confidence_score for row in session.query(AirdropOpportunity)}
+    assert stored == {'0': 70.0, '1': 80.0, '2': 70.0, '3': 80.0, '4': 70.0}
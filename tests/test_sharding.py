@@ -0,0 +1,40 @@
+from sharding import HashRing
+
+KEYS = [f"account:user{i}" for i in range(2000)]
+
+def test_every_key_has_one_owner():
+    ring = HashRing(['w1', 'w2', 'w3'])
+    assignment = ring.assign(KEYS)
+    assert set(assignment) == {'w1', 'w2', 'w3'}
+    assert sorted(key for keys in assignment.values() for key in keys) == sorted(KEYS)
+    # Roughly even with the default replicas
+    assert all(400 < len(keys) < 950 for keys in assignment.values())
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = HashRing(['w1', 'w2', 'w3'])
+    before = {key: ring.owner(key) for key in KEYS}
+    ring.add('w4')
+    moved = {key for key in KEYS if ring.owner(key) != before[key]}
+    assert moved and all(ring.owner(key) == 'w4' for key in moved)
+    assert len(moved) < len(KEYS) / 2
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(['w1', 'w2', 'w3'])
+    before = {key: ring.owner(key) for key in KEYS}
+    ring.remove('w2')
+    assert len(ring) == 2
+    for key in KEYS:
+        if before[key] != 'w2':
+            assert ring.owner(key) == before[key]
+        else:
+            assert ring.owner(key) in ('w1', 'w3')
+
+def test_owners_do_not_depend_on_insertion_order():
+    first = HashRing(['w1', 'w2', 'w3'])
+    second = HashRing(['w3', 'w1', 'w2'])
+    assert all(first.owner(key) == second.owner(key) for key in KEYS)
+
+def test_empty_ring_has_no_owner():
+    ring = HashRing(['w1'])
+    ring.remove('w1')
+    assert ring.owner('account:user1') is None
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+import extract_info
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def imported_after(statement, cwd):
+    """Run statement in a fresh interpreter and return the heavy modules it loaded."""
+    child = (f"import json, sys\n{statement}\n"
+             "print(json.dumps(sorted(name for name in ('spacy', 'tweepy', 'telegram') "
+             "if name in sys.modules)))")
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    output = subprocess.run([sys.executable, '-c', child], cwd=cwd, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def test_importing_main_does_not_load_the_model_or_clients(tmp_path):
+    # main creates its database in the working directory
+    assert imported_after('import main', tmp_path) == []
+
+def test_model_is_loaded_once_on_first_use(monkeypatch):
+    import spacy
+    loads = []
+    
+    def load(name, disable=()):
+        loads.append((name, list(disable)))
+        return spacy.blank('en')
+    
+    monkeypatch.setattr(spacy, 'load', load)
+    monkeypatch.setattr(extract_info, '_nlp', None)
+    thread = extract_info.warm_up_in_background()
+    thread.join()
+    nlp = extract_info.get_nlp()
+    
+    assert extract_info.get_nlp() is nlp
+    assert loads == [(extract_info.MODEL_NAME, extract_info.UNUSED_PIPES)]
@@ -0,0 +1,103 @@
+import re
+from typing import List, Optional
+
+# URLs, plus the @ and # of mentions and hashtags (their words are kept).
+# The lookaheads reproduce the old three-pass order, where URLs were
+# removed before mentions and mentions before hashtags.
+CLEAN_PATTERN = re.compile(r'http\S+|www\S+|@(?=\w)(?!http\S|www\S)|#(?=@?\w)(?!@?(?:http\S|www\S))')
+
+# $SYMBOL cashtags, matched in the original casing
+CASHTAG_PATTERN = re.compile(r'\$([A-Z]{2,10})')
+
+# "<SYMBOL> token" or "<SYMBOL> coin". The hint is a much cheaper search
+# that rules the full pattern out for most tweets.
+TOKEN_HINT = re.compile(r'token|coin', re.IGNORECASE)
+TOKEN_WORD_PATTERN = re.compile(r'([A-Z][A-Z0-9]{2,9})\s+(?:token|coin)', re.IGNORECASE)
+
+# Common deadline patterns. The trigger words must be whole words ("ends"
+# is in "friends"), and a period only ends the match when no digit follows,
+# so "20.10.2024" and "12.30" stay whole.
+DEADLINE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'\bdeadline:?\s*(.+?)(?:\.(?!\d)|$)',
+    r'\bends?\b(?:\son)?:?\s*(.+?)(?:\.(?!\d)|$)',
+    r'\buntil\b:?\s*(.+?)(?:\.(?!\d)|$)',
+    r'\bcloses?\b(?:\son)?:?\s*(.+?)(?:\.(?!\d)|$)'
+]]
+
+# Common patterns for participation instructions
+STEPS_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'(?:how to participate|steps?|to participate):\s*(.+?)(?:\n|$)',
+    r'(?:1\.|\*)(.+?)(?:\n|$)'
+]]
+
+# Words that lower the confidence score
+SPAM_KEYWORDS = ['fake', 'scam', 'hurry', '100x', 'guaranteed']
+SPAM_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in SPAM_KEYWORDS))
+
+class ScannedText:
+    """Regex-derived fields of one tweet's text."""
+    
+    def __init__(self, processed_text: str, token_symbol: Optional[str],
+                 deadline_candidates: List[str], participation_steps: Optional[str],
+                 spam_count: int):
+        self.processed_text = processed_text
+        self.token_symbol = token_symbol
+        # Text after each deadline pattern that matched, in pattern order
+        self.deadline_candidates = deadline_candidates
+        self.participation_steps = participation_steps
+        self.spam_count = spam_count
+
+def clean_text(text: str) -> str:
+    """Remove URLs and mention/hashtag symbols, collapse whitespace and lowercase."""
+    return ' '.join(CLEAN_PATTERN.sub('', text).split()).lower()
+
+def find_token_symbol(text: str, raw_text: Optional[str] = None) -> Optional[str]:
+    """$SYMBOL cashtag (from raw_text when given), else a word followed by token/coin."""
+    cashtag = CASHTAG_PATTERN.search(raw_text if raw_text is not None else text)
+    if cashtag:
+        return cashtag.group(1)
+    if TOKEN_HINT.search(text):
+        token_word = TOKEN_WORD_PATTERN.search(text)
+        if token_word:
+            return token_word.group(1)
+    return None
+
+def count_spam(text: str) -> int:
+    """Count how many distinct spam keywords appear in the text."""
+    text = text.lower()
+    # One combined scan rules out the common case of no spam at all
+    if not SPAM_PATTERN.search(text):
+        return 0
+    return sum(1 for keyword in SPAM_KEYWORDS if keyword in text)
+
+def scan_text(text: str, raw_text: Optional[str] = None) -> ScannedText:
+    """Find every regex-derived field of a cleaned tweet.
+    
+    Cashtags are looked up in raw_text when given, since cleaning
+    lowercases them. Deadline candidates are only parsed by the caller,
+    as dateutil costs more than all of the scanning together.
+    """
+    deadline_candidates = []
+    for pattern in DEADLINE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            deadline_candidates.append(match.group(1))
+    
+    participation_steps = None
+    for pattern in STEPS_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            participation_steps = match.group(1).strip()
+            break
+    
+    return ScannedText(
+        text,
+        find_token_symbol(text, raw_text),
+        deadline_candidates,
+        participation_steps,
+        count_spam(text)
+    )
+
+def scan_tweet(raw_text: str) -> ScannedText:
+    """Clean a raw tweet and scan it."""
+    return scan_text(clean_text(raw_text), raw_text)